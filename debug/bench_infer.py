@@ -0,0 +1,111 @@
+"""Benchmark type inference.
+
+Usage:
+  python -m debug.bench_infer [-n REPEAT]
+
+Runs the parse, resolve and infer steps on a few synthetic programs of the
+size of the programs in tests/test_infer.py and larger, and prints the best
+time for each.
+"""
+
+import linecache
+import sys
+import time
+
+from myia.abstract import from_value
+from myia.macros import grad
+from myia.pipeline import scalar_pipeline
+
+infer_pipeline = scalar_pipeline.select('parse', 'resolve', 'infer')
+
+
+def _make(name, lines, params='x, y'):
+    """Create a function from the lines of its body."""
+    src = f'def {name}({params}):\n'
+    src += ''.join(f'    {line}\n' for line in lines)
+    filename = f'<bench:{name}>'
+    # The parser reads the source code through inspect, i.e. linecache
+    linecache.cache[filename] = (len(src), None, src.splitlines(True),
+                                 filename)
+    glob = {'__name__': __name__}
+    exec(compile(src, filename, 'exec'), glob)
+    return glob[name]
+
+
+def chain(n):
+    """A single graph with n arithmetic statements."""
+    lines = ['a = x']
+    for i in range(n):
+        lines.append(f'a = a * y + {i % 7}' if i % 2 else f'a = a - x * {i}')
+    lines.append('return a')
+    return _make(f'chain{n}', lines)
+
+
+def calls(n):
+    """A graph that calls n distinct closures, each with a branch."""
+    lines = []
+    for i in range(n):
+        lines += [f'def f{i}(a):',
+                  f'    if a > {i}:',
+                  f'        return a * y',
+                  f'    else:',
+                  f'        return a + x',
+                  f'x = f{i}(x)']
+    lines.append('return x')
+    return _make(f'calls{n}', lines)
+
+
+def loop(n):
+    """A graph with n nested while loops."""
+    lines = []
+    indent = ''
+    for i in range(n):
+        lines += [f'{indent}i{i} = 0',
+                  f'{indent}while i{i} < y:',
+                  f'{indent}    x = x * 2 + i{i}',
+                  f'{indent}    i{i} = i{i} + 1']
+        indent += '    '
+    lines.append('return x')
+    return _make(f'loop{n}', lines)
+
+
+def grad_chain(n):
+    """The gradient of chain(n)."""
+    fn = chain(n)
+
+    def grad_chain(x, y):
+        return grad(fn)(x, y)
+
+    return grad_chain
+
+
+programs = {
+    'chain(20)': chain(20),
+    'chain(500)': chain(500),
+    'calls(50)': calls(50),
+    'calls(200)': calls(200),
+    'loop(6)': loop(6),
+    'grad_chain(50)': grad_chain(50),
+}
+
+
+def bench(fn, repeat):
+    """Return the best time to infer fn over repeat runs."""
+    argspec = [from_value(1.0, broaden=True), from_value(2.0, broaden=True)]
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        infer_pipeline.run(input=fn, argspec=argspec)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main(argv):
+    """Run the benchmarks."""
+    repeat = int(argv[argv.index('-n') + 1]) if '-n' in argv else 5
+    for name, fn in programs.items():
+        print(f'{name:20}{bench(fn, repeat) * 1000:10.1f} ms')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,129 @@
+"""Benchmark the rebuilding of PyTorch modules returned by myia.
+
+Usage:
+  python -m debug.bench_module [-n REPEAT]
+
+Runs an update step on models of the size of the ones in
+tests/frontends/test_pytorch.py and larger, and prints the best time for the
+step and for rebuilding the updated module from its parameters, along with
+the growth of the peak memory of the process during the rebuild, which is
+measured through /proc and only works on Linux.
+"""
+
+import ctypes
+import sys
+import time
+
+import torch
+from torch import nn
+
+from myia import myia, value_and_grad
+from myia.abstract import from_value
+from myia.frontends import activate_frontend
+
+activate_frontend('pytorch')
+
+
+class MLP(nn.Module):
+    """Multi-layer perceptron with tanh activations."""
+
+    def __init__(self, i_size, h_size, o_size):
+        """Initialize the layers."""
+        super().__init__()
+        self.f1 = nn.Linear(i_size, h_size)
+        self.a = nn.Tanh()
+        self.f2 = nn.Linear(h_size, o_size)
+
+    def forward(self, x):
+        """Apply the layers."""
+        return self.a(self.f2(self.a(self.f1(x))))
+
+
+def cost(model, inp, target):
+    """Sum of squared errors."""
+    diff = model(inp) - target
+    return sum(diff * diff)
+
+
+def step(model, inp, target):
+    """Gradient descent step."""
+    _cost, dmodel = value_and_grad(cost, 'model')(model, inp, target)
+    return _cost, model - dmodel
+
+
+def _parameters(abstract, model):
+    """Return the arguments to rebuild model with abstract.constructor."""
+    args = []
+    for k, a in abstract.attributes.items():
+        v = getattr(model, k)
+        if hasattr(a, 'constructor'):
+            v = _parameters(a, v)
+        elif isinstance(v, torch.Tensor):
+            v = v.detach()
+        args.append(v)
+    return args
+
+
+def _rebuild(abstract, args):
+    """Rebuild a model from the arguments given by _parameters."""
+    return abstract.constructor(*[
+        _rebuild(a, arg) if hasattr(a, 'constructor') else arg
+        for a, arg in zip(abstract.attributes.values(), args)
+    ])
+
+
+def _peak_memory():
+    """Return the peak resident memory of the process, in bytes."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM'):
+                return int(line.split()[1]) * 1024
+
+
+def _reset_peak_memory():
+    """Reset the peak resident memory to the current one (Linux only).
+
+    The memory freed by the process is released first, otherwise it could be
+    reused by the rebuild without changing the peak.
+    """
+    ctypes.CDLL('libc.so.6').malloc_trim(0)
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def bench(sizes, repeat):
+    """Return the best step and rebuild times and the memory allocated."""
+    model = MLP(*sizes)
+    inp = torch.ones(2, sizes[0])
+    target = torch.ones(sizes[2])
+    abstract = from_value(model)
+    args = _parameters(abstract, model)
+    fn = myia(step, backend='pytorch')
+    fn(model, inp, target)
+
+    step_times, rebuild_times, allocs = [], [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(model, inp, target)
+        step_times.append(time.perf_counter() - t0)
+        _reset_peak_memory()
+        before = _peak_memory()
+        t0 = time.perf_counter()
+        _rebuild(abstract, args)
+        rebuild_times.append(time.perf_counter() - t0)
+        allocs.append(_peak_memory() - before)
+    return min(step_times), min(rebuild_times), max(allocs)
+
+
+def main(argv):
+    """Run the benchmarks."""
+    repeat = int(argv[argv.index('-n') + 1]) if '-n' in argv else 20
+    for sizes in [(4, 2, 3), (256, 512, 10), (1024, 2048, 10)]:
+        step_time, rebuild_time, alloc = bench(sizes, repeat)
+        print(f'MLP{sizes!s:20}step {step_time * 1000:8.2f} ms'
+              f'    rebuild {rebuild_time * 1e6:8.1f} us'
+              f'    peak memory +{alloc:10} bytes')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
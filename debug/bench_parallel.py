@@ -0,0 +1,93 @@
+"""Benchmark the data-parallel execution of a training step.
+
+Usage:
+  python -m debug.bench_parallel [-n STEPS] [-b BATCH]
+
+Computes the gradient of an MLP on minibatches of BATCH examples, with a
+single MyiaFunction and with DataParallel on 1, 2, 4... workers up to the
+number of cores, and prints the number of examples processed per second.
+"""
+
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from myia import ArithmeticData, myia, value_and_grad
+from myia.parallel import DataParallel
+from myia.prim.py_implementations import dot
+
+
+@dataclass(frozen=True)
+class Linear(ArithmeticData):
+    """Linear layer."""
+
+    W: np.ndarray
+    b: np.ndarray
+
+    def apply(self, x):
+        """Apply the layer."""
+        return dot(x, self.W) + self.b
+
+
+@dataclass(frozen=True)
+class MLP(ArithmeticData):
+    """Two layer perceptron."""
+
+    l1: Linear
+    l2: Linear
+
+    def apply(self, x):
+        """Apply the layers."""
+        return self.l2.apply(np.tanh(self.l1.apply(x)))
+
+
+def cost(model, x, y):
+    """Sum of squared errors."""
+    diff = model.apply(x) - y
+    return sum(diff * diff)
+
+
+def grads(model, x, y):
+    """Cost and gradient of the model."""
+    return value_and_grad(cost, 'model')(model, x, y)
+
+
+def _linear(i, o):
+    return Linear(np.random.randn(i, o).astype('float32') * 0.1,
+                  np.zeros((1, o), 'float32'))
+
+
+def bench(fn, model, x, y, steps):
+    """Return the number of examples per second."""
+    fn(model, x, y)
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        fn(model, x, y)
+    return steps * len(x) / (time.perf_counter() - t0)
+
+
+def main(argv):
+    """Run the benchmarks."""
+    steps = int(argv[argv.index('-n') + 1]) if '-n' in argv else 20
+    batch = int(argv[argv.index('-b') + 1]) if '-b' in argv else 1024
+    model = MLP(_linear(256, 512), _linear(512, 10))
+    x = np.random.randn(batch, 256).astype('float32')
+    y = np.random.randn(batch, 10).astype('float32')
+
+    rate = bench(myia(grads, backend='pytorch'), model, x, y, steps)
+    print(f'{"single process":20}{rate:10.0f} examples/s')
+    workers = 1
+    while workers <= os.cpu_count():
+        with DataParallel(grads, workers=workers, reduce='sum',
+                          batched=[False, True, True],
+                          backend='pytorch') as dp:
+            rate = bench(dp, model, x, y, steps)
+        print(f'{f"{workers} workers":20}{rate:10.0f} examples/s')
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+"""Benchmark the batching of requests by myia.serve.BatchServer.
+
+Usage:
+  python -m debug.bench_serve [-n REQUESTS] [-c CLIENTS]
+
+A load generator runs CLIENTS concurrent clients that each send requests
+to a small MLP one after the other, until REQUESTS were answered. This is
+done with a BatchServer for a few maximum batch sizes, and by calling the
+function directly for each request. The throughput and the server metrics
+are printed for each.
+"""
+
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from myia import myia
+from myia.prim.py_implementations import dot
+from myia.serve import BatchServer
+
+
+@myia(backend='pytorch')
+def mlp(w1, b1, w2, b2, x):
+    """Two layer perceptron."""
+    return dot(np.tanh(dot(x, w1) + b1), w2) + b2
+
+
+params = [np.random.rand(32, 64), np.random.rand(1, 64),
+          np.random.rand(64, 10), np.random.rand(1, 10)]
+batched = [False] * len(params) + [True]
+
+
+def example():
+    """Return the input for a request."""
+    return np.random.rand(32)
+
+
+async def client(call, n):
+    """Send n requests one after the other."""
+    for _ in range(n):
+        await call(*params, example())
+
+
+async def load(call, requests, clients):
+    """Run the clients and return the time they take."""
+    t0 = time.perf_counter()
+    await asyncio.gather(*[client(call, requests // clients)
+                           for _ in range(clients)])
+    return time.perf_counter() - t0
+
+
+async def direct(*args):
+    """Call the function on a single request, as a batch of one."""
+    *params, x = args
+    return mlp(*params, x[None])[0]
+
+
+async def bench(requests, clients):
+    """Run the benchmarks."""
+    # Compile the specializations beforehand
+    for size in (1, 2, 4, 8, 16, 32, 64):
+        mlp(*params, np.stack([example()] * size))
+
+    t = await load(direct, requests, clients)
+    print(f'{"direct":20}{requests / t:10.0f} requests/s')
+    for max_batch_size in (8, 64):
+        server = BatchServer(mlp, batched=batched,
+                             max_batch_size=max_batch_size)
+        async with server:
+            t = await load(server, requests, clients)
+        m = server.metrics
+        print(f'{"batch size <= " + str(max_batch_size):20}'
+              f'{requests / t:10.0f} requests/s'
+              f'    mean batch {m.mean_batch_size:5.1f}'
+              f'    latency {m.mean_latency * 1000:6.2f} ms'
+              f'    queued {m.mean_queue_time * 1000:6.2f} ms'
+              f'    max queue {m.max_queue_size}')
+
+
+def main(argv):
+    """Run the benchmarks."""
+    requests = int(argv[argv.index('-n') + 1]) if '-n' in argv else 2000
+    clients = int(argv[argv.index('-c') + 1]) if '-c' in argv else 64
+    asyncio.get_event_loop().run_until_complete(bench(requests, clients))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
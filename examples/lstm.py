@@ -11,6 +11,7 @@ import numpy
 from numpy.random import RandomState
 
 from myia import ArithmeticData, myia, value_and_grad
+from myia.api import Prefetcher
 # The following import installs custom tracebacks for inference errors
 from myia.debug import traceback  # noqa
 from myia.dtype import Array
@@ -226,7 +227,8 @@ def run_helper(epochs, n, batch_size, layer_sizes):
     for _ in range(epochs):
         costs = []
         t0 = time.time()
-        for inp, target in data:
+        batches = Prefetcher(data, 'pytorch', {'device': device_type})
+        for inp, target in batches:
             cost, model = step(model, lr, inp, target)
             if isinstance(cost, numpy.ndarray):
                 cost = float(cost)
@@ -11,7 +11,7 @@ import numpy
 from numpy.random import RandomState
 
 from myia import ArithmeticData, myia, value_and_grad
-from myia.api import to_device
+from myia.api import Prefetcher, to_device
 # The following import installs custom tracebacks for inference errors
 from myia.debug import traceback  # noqa
 
@@ -167,7 +167,7 @@ def run_helper(epochs, n, batch_size, layer_sizes):
     for _ in range(epochs):
         costs = []
         t0 = time.time()
-        for inp, target in data:
+        for inp, target in Prefetcher(data, backend, backend_options):
             cost, model = step(model, inp, target, lr)
             cost = cost.array
             if isinstance(cost, numpy.ndarray):
@@ -1,7 +1,60 @@
-"""Myia."""
+"""Myia.
 
+The public functions below are imported on first access, so that
+`import myia` stays fast and does not load the inference machinery, the
+pipelines or the backends until they are needed.
+"""
 
-from .api import myia  # noqa
-from .composite import ArithmeticData  # noqa
-from .hypermap import hyper_map  # noqa
-from .macros import grad, value_and_grad  # noqa
+import importlib
+import sys
+import types
+
+_lazy = {
+    'myia': '.api',
+    'export': '.api',
+    'ArithmeticData': '.composite',
+    'checkpoint': '.grad',
+    'hyper_map': '.hypermap',
+    'grad': '.macros',
+    'hvp': '.macros',
+    'jvp': '.macros',
+    'value_and_grad': '.macros',
+    'vmap': '.macros',
+}
+
+__all__ = [
+    'ArithmeticData',
+    'checkpoint',
+    'export',
+    'grad',
+    'hvp',
+    'hyper_map',
+    'jvp',
+    'myia',
+    'value_and_grad',
+    'vmap',
+]
+
+
+class _Module(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Importing the submodules myia.grad or myia.jvp would otherwise hide
+        # the functions of the same name.
+        if name in _lazy and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError(f"module 'myia' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_lazy[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
+
+
+sys.modules[__name__].__class__ = _Module
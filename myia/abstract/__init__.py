@@ -37,6 +37,7 @@ from .data import (  # noqa
     DummyFunction,
     GraphFunction,
     JTransformedFunction,
+    JVPTransformedFunction,
     Macro,
     MetaGraphFunction,
     PartialApplication,
@@ -47,6 +48,7 @@ from .data import (  # noqa
     TrackDict,
     TypedPrimitive,
     VirtualFunction,
+    VMapTransformedFunction,
     empty,
     format_abstract,
     listof,
@@ -92,6 +94,7 @@ from .utils import (  # noqa
     concretize_abstract,
     force_through,
     hastype_helper,
+    memo_statistics,
     sensitivity_transform,
     split_type,
     type_to_abstract,
@@ -179,6 +179,35 @@ class JTransformedFunction(Function):
     fn: object
 
 
+@dataclass(frozen=True)
+class JVPTransformedFunction(Function):
+    """Represents a Function transformed through the application of jvp.
+
+    Attributes:
+        fn: A Function
+
+    """
+
+    fn: object
+
+
+@dataclass(frozen=True)
+class VMapTransformedFunction(Function):
+    """Represents a Function transformed through the application of vmap.
+
+    Attributes:
+        fn: A Function
+        in_axes: A tuple with 0 for each batched argument and None for
+            each argument that is shared by the whole batch
+        size: The size of the batch
+
+    """
+
+    fn: object
+    in_axes: tuple
+    size: int
+
+
 @dataclass(frozen=True)
 class VirtualFunction(Function):
     """Represents some function with an explicitly given type signature.
@@ -1,6 +1,5 @@
 """Algorithms for inference."""
 
-import asyncio
 import typing
 from dataclasses import is_dataclass, replace as dc_replace
 from functools import reduce
@@ -14,6 +13,7 @@ from ..prim import Primitive, ops as P
 from ..utils import (
     ADT,
     InferenceError,
+    MyiaShapeError,
     MyiaTypeError,
     Overload,
     Partializable,
@@ -50,6 +50,7 @@ from .data import (
     Function,
     GraphFunction,
     JTransformedFunction,
+    JVPTransformedFunction,
     Macro,
     MacroFunction,
     MetaGraphFunction,
@@ -57,16 +58,19 @@ from .data import (
     PrimitiveFunction,
     TypedPrimitive,
     VirtualFunction,
+    VMapTransformedFunction,
     empty,
     listof,
 )
 from .loop import InferenceLoop, Pending, force_pending
 from .ref import Context, EvaluationCache, Reference, VirtualReference
 from .utils import (
+    abstract_check,
     amerge,
     bind,
     broaden as _broaden,
     concretize_abstract,
+    force_through,
     normalize_adt,
     sensitivity_transform,
     type_to_abstract,
@@ -100,6 +104,9 @@ class InferenceEngine:
             to inferrer classes, which will be instantiated automatically
             by the InferenceEngine.
         context_class: The class to use to instantiate contexts.
+        max_contexts: The maximal number of contexts to create for each
+            graph before its arguments are broadened, or None for no
+            limit.
 
     """
 
@@ -107,7 +114,8 @@ class InferenceEngine:
                  pipeline,
                  *,
                  constructors,
-                 context_class=Context):
+                 context_class=Context,
+                 max_contexts=None):
         """Initialize the InferenceEngine."""
         self.loop = InferenceLoop(InferenceError)
         self.pipeline = pipeline
@@ -115,6 +123,7 @@ class InferenceEngine:
         self._constructors = constructors
         self.errors = []
         self.context_class = context_class
+        self.max_contexts = max_contexts
         self.reset()
 
     def reset(self):
@@ -164,6 +173,19 @@ class InferenceEngine:
 
         return concretize_abstract(output_ref.get_sync()), root_context
 
+    def widening_report(self):
+        """Return the graphs whose arguments were broadened.
+
+        The result maps each graph that reached max_contexts to the number
+        of distinct argument tuples that were broadened for it.
+        """
+        report = {}
+        for inf in self.constructors.values():
+            if isinstance(inf, GraphInferrer) and inf.widened:
+                g = inf._graph
+                report[g] = report.get(g, 0) + inf.widened
+        return report
+
     def ref(self, node, context):
         """Return a Reference to the node in the given context."""
         if node.is_constant_graph():
@@ -217,25 +239,21 @@ class InferenceEngine:
     def run_coroutine(self, coro, throw=True):
         """Run an async function using this inferrer's loop."""
         errs_before = len(self.errors)
-        try:
-            fut = self.loop.schedule(coro)
-            self.loop.run_forever()
-            self.errors.extend(self.loop.collect_errors())
-            for err in self.errors[errs_before:]:
-                err.engine = self
-            if errs_before < len(self.errors):
-                if throw:  # pragma: no cover
-                    for err in self.errors:
-                        if isinstance(err, InferenceError):
-                            raise err
-                    else:
+        fut = self.loop.schedule(coro)
+        self.loop.run_forever()
+        self.errors.extend(self.loop.collect_errors())
+        for err in self.errors[errs_before:]:
+            err.engine = self
+        if errs_before < len(self.errors):
+            if throw:  # pragma: no cover
+                for err in self.errors:
+                    if isinstance(err, InferenceError):
                         raise err
                 else:
-                    return None  # pragma: no cover
-            return fut.result()
-        finally:
-            for task in asyncio.all_tasks(self.loop):
-                task._log_destroy_pending = False
+                    raise err
+            else:
+                return None  # pragma: no cover
+        return fut.result()
 
     get_inferrer_for = Overload()
 
@@ -258,7 +276,9 @@ class InferenceEngine:
     @get_inferrer_for.register
     def get_inferrer_for(self, g: GraphFunction):
         if g not in self.constructors:
-            self.constructors[g] = GraphInferrer(g.graph, g.context)
+            self.constructors[g] = GraphInferrer(
+                g.graph, g.context, max_contexts=self.max_contexts
+            )
         return self.constructors[g]
 
     @get_inferrer_for.register
@@ -275,6 +295,21 @@ class InferenceEngine:
             j.fn
         )
 
+    @get_inferrer_for.register
+    def get_inferrer_for(self, j: JVPTransformedFunction):
+        return JVPInferrer(
+            self.get_inferrer_for(j.fn),
+            j.fn
+        )
+
+    @get_inferrer_for.register
+    def get_inferrer_for(self, v: VMapTransformedFunction):
+        return VMapInferrer(
+            self.get_inferrer_for(v.fn),
+            v.in_axes,
+            v.size
+        )
+
     @get_inferrer_for.register
     def get_inferrer_for(self, vf: (VirtualFunction, TypedPrimitive)):
         return VirtualInferrer(
@@ -289,7 +324,9 @@ class InferenceEngine:
     @get_inferrer_for.register
     def get_inferrer_for(self, mg: MetaGraphFunction):
         if mg not in self.constructors:
-            self.constructors[mg] = GraphInferrer(mg.metagraph, None)
+            self.constructors[mg] = GraphInferrer(
+                mg.metagraph, None, max_contexts=self.max_contexts
+            )
         return self.constructors[mg]
 
     @get_inferrer_for.register
@@ -702,15 +739,34 @@ class MacroInferrer(Inferrer):
         return await self.macro.reroute(engine, outref, argrefs)
 
 
+_widen_through = (AbstractScalar, AbstractTuple, AbstractArray,
+                  AbstractClassBase, AbstractDict)
+
+
+@abstract_check.variant
+def _resolved(self, x: Pending):
+    return x.done() and self(x.result())
+
+
+def _concrete_argkey(args):
+    """Concretize args, or return None if they are still pending."""
+    if not all(_resolved(arg) for arg in args):
+        return None
+    return tuple(concretize_abstract(arg) for arg in args)
+
+
 class GraphInferrer(Inferrer):
     """Base Inferrer for Graph and MetaGraph.
 
     Attributes:
         context: The context in which the Graph/MetaGraph is.
+        max_contexts: The number of distinct argument tuples after which
+            new arguments are broadened, or None for no limit.
+        widened: The number of argument tuples that were broadened.
 
     """
 
-    def __init__(self, graph, context):
+    def __init__(self, graph, context, max_contexts=None):
         """Initialize a GraphInferrer."""
         super().__init__()
         self._graph = graph
@@ -719,14 +775,77 @@ class GraphInferrer(Inferrer):
         else:
             self.context = Context.empty()
         self.graph_cache = {}
+        self.max_contexts = max_contexts
+        self.widened = 0
+        self._argkeys = set()
+        self._widen_cache = {}
 
     async def normalize_args(self, args):
         """Return normalized versions of the arguments."""
-        return await self._graph.normalize_args(args)
+        args = await self._graph.normalize_args(args)
+        if self._must_widen(args):
+            # Types may still be pending, which would make each broadened
+            # tuple of arguments different, so we wait for them
+            forced = [await force_through(arg, _widen_through)
+                      for arg in args]
+            self._add_argkey(args, tuple(_broaden(arg) for arg in forced))
+        return self._widen(args)
 
     def normalize_args_sync(self, args):
         """Return normalized versions of the arguments."""
-        return self._graph.normalize_args_sync(args)
+        return self._widen(self._graph.normalize_args_sync(args))
+
+    def _can_widen(self, args):
+        return (self.max_contexts is not None
+                and args is not None
+                and isinstance(self._graph, Graph)
+                and not self._graph.flags.get('core', False))
+
+    def _must_widen(self, args):
+        """Check whether args should be broadened.
+
+        That is the case if they are new and if max_contexts different
+        argument tuples were already seen. Core graphs, such as getitem,
+        often need the values of their arguments, so they are never widened.
+        """
+        if not self._can_widen(args):
+            return False
+        args = tuple(args)
+        return (args not in self._widen_cache
+                and args not in self._argkeys
+                and len(self._argkeys) >= self.max_contexts)
+
+    def _add_argkey(self, args, argkey):
+        self._widen_cache[args] = argkey
+        self._argkeys.add(argkey)
+        if argkey != args:
+            self.widened += 1
+
+    def _widen(self, args):
+        """Return the argument tuple to use for args.
+
+        The result is cached, so that monomorphization sees the same
+        arguments as inference did.
+        """
+        if not self._can_widen(args):
+            return args
+        args = tuple(args)
+        if args in self._widen_cache:
+            return self._widen_cache[args]
+        elif args in self._argkeys:
+            return args
+        elif not self._must_widen(args):
+            self._add_argkey(args, args)
+            return args
+        # Monomorphization gives concrete versions of the arguments
+        # inference saw, which must map to the same contexts.
+        concrete = _concrete_argkey(args)
+        for argkey in self._argkeys:
+            if concrete is not None and _concrete_argkey(argkey) == concrete:
+                self._widen_cache[args] = argkey
+                return argkey
+        self._add_argkey(args, tuple(_broaden(arg) for arg in args))
+        return self._widen_cache[args]
 
     def get_graph(self, engine, args):
         """Generate the graph for the given args."""
@@ -787,6 +906,9 @@ class PartialInferrer(Inferrer):
 
     async def reroute(self, engine, outref, argrefs):
         """Reroute partial(f, ...)(...) to f(..., ...)."""
+        if outref is None:
+            # Called through engine.execute, there is no node to reroute
+            return None
         ctx = outref.context
         fn, *args = outref.node.inputs
         collapse = False
@@ -888,6 +1010,113 @@ class JInferrer(Inferrer):
         return self.cache[args]
 
 
+class JVPInferrer(Inferrer):
+    """Inferrer for a function transformed through jvp.
+
+    The transformed function takes each argument followed by its tangent,
+    and returns the pair of the output and of its tangent.
+    """
+
+    def __init__(self, fn, orig_fn):
+        """Initialize a JVPInferrer."""
+        super().__init__()
+        self.fn = fn
+        self.orig_fn = orig_fn
+
+    async def _primal(self, x):
+        if isinstance(x, AbstractFunction):
+            v = await x.get()
+            return AbstractFunction(*[poss.fn for poss in v
+                                      if isinstance(poss,
+                                                    JVPTransformedFunction)])
+        return x
+
+    async def _jvp_tag(self, x):
+        if isinstance(x, AbstractFunction):
+            v = await x.get()
+            return AbstractFunction(*[JVPTransformedFunction(poss)
+                                      for poss in v])
+        return x
+
+    async def run(self, engine, outref, argrefs):
+        """Run the inference."""
+        args = tuple([await ref.get() for ref in argrefs])
+        if len(args) % 2 != 0:
+            raise MyiaTypeError(
+                'A jvp-transformed function takes a tangent for each argument'
+            )
+        if args not in self.cache:
+            primal_args = [await self._primal(a) for a in args[::2]]
+            primal_argrefs = tuple(VirtualReference(arg)
+                                   for arg in primal_args)
+            res = await self.fn.run(engine, None, primal_argrefs)
+            res_wrapped = await self._jvp_tag(res)
+            tangent = _broaden(sensitivity_transform(res))
+            self.cache[args] = AbstractTuple([res_wrapped, tangent])
+        return self.cache[args]
+
+
+class VMapInferrer(Inferrer):
+    """Inferrer for a function transformed through vmap.
+
+    Batched arguments have an extra leading dimension for the batch, which
+    is removed before the original function is inferred, and added back to
+    every scalar and array in the output.
+    """
+
+    def __init__(self, fn, in_axes, size):
+        """Initialize a VMapInferrer."""
+        super().__init__()
+        self.fn = fn
+        self.in_axes = in_axes
+        self.size = size
+
+    def _unbatch(self, x):
+        if isinstance(x, AbstractArray):
+            shp = x.values[SHAPE]
+            if len(shp) == 0 or shp[0] != self.size:
+                raise MyiaShapeError(
+                    f'Expected a batch of size {self.size}, got shape {shp}'
+                )
+            if len(shp) == 1:
+                return x.element
+            return type(x)(x.element, {SHAPE: shp[1:]})
+        elif isinstance(x, AbstractTuple):
+            return AbstractTuple([self._unbatch(e) for e in x.elements])
+        else:
+            raise MyiaTypeError(f'vmap can only batch arrays, not {x}')
+
+    def _batch(self, x):
+        if isinstance(x, AbstractScalar):
+            if issubclass(x.values[TYPE], (dtype.Number, dtype.Bool)):
+                return AbstractArray(_broaden(x), {SHAPE: (self.size,)})
+            return x
+        elif isinstance(x, AbstractArray):
+            shp = (self.size,) + x.values[SHAPE]
+            return type(x)(x.element, {SHAPE: shp})
+        elif isinstance(x, AbstractTuple):
+            return AbstractTuple([self._batch(e) for e in x.elements])
+        elif isinstance(x, AbstractFunction):
+            raise MyiaTypeError('A vmap-transformed function cannot '
+                                'return a function')
+        else:
+            return x
+
+    async def run(self, engine, outref, argrefs):
+        """Run the inference."""
+        args = tuple([await ref.get() for ref in argrefs])
+        if len(args) != len(self.in_axes):
+            raise type_error_nargs('vmap', len(self.in_axes), len(args))
+        if args not in self.cache:
+            inner_args = [a if axis is None else self._unbatch(a)
+                          for a, axis in zip(args, self.in_axes)]
+            inner_argrefs = tuple(VirtualReference(arg)
+                                  for arg in inner_args)
+            res = await self.fn.run(engine, None, inner_argrefs)
+            self.cache[args] = self._batch(res)
+        return self.cache[args]
+
+
 async def _inf_helper(engine, inf, outref, argrefs, p):
     result = await inf.run(engine, outref, argrefs)
     p.set_result(result)
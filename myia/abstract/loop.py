@@ -3,6 +3,7 @@
 import asyncio
 from collections import deque
 from contextvars import copy_context
+from operator import itemgetter
 
 from .. import dtype
 from ..utils import InferenceError
@@ -37,15 +38,22 @@ class InferenceLoop(asyncio.AbstractEventLoop):
         be determined by variables it interacts with, but if there is nothing
         else to do, we may force it to Float[64].
         """
-        # Filter out all done tasks
-        varlist = [fut for fut in self._vars if not fut.done()]
-        # Filter out priority-less tasks, which cannot be forced
-        later = [fut for fut in varlist if fut.priority() is None]
-        varlist = [fut for fut in varlist if fut.priority() is not None]
+        # Filter out done tasks and priority-less tasks, which cannot be
+        # forced. The priority of each task is computed only once.
+        later = []
+        varlist = []
+        for fut in self._vars:
+            if not fut.done():
+                prio = fut.priority()
+                if prio is None:
+                    later.append(fut)
+                else:
+                    varlist.append((prio, fut))
         self._vars = later
         if not varlist:
             return False
-        varlist.sort(key=lambda x: x.priority())
+        varlist.sort(key=itemgetter(0))
+        varlist = [fut for _, fut in varlist]
         found = False
         while varlist:
             v1 = varlist.pop()
@@ -61,10 +69,12 @@ class InferenceLoop(asyncio.AbstractEventLoop):
 
     def run_forever(self):
         """Run this loop until there is no more work to do."""
+        todo = self._todo
         while True:
-            while self._todo:
-                h = self._todo.popleft()
-                h._run()
+            while todo:
+                h = todo.popleft()
+                if not h.cancelled():
+                    h._run()
             # If some literals weren't forced to a concrete type by some
             # operation, we sort by priority (i.e. floats first) and we
             # force the first one to take its default concrete type. Then
@@ -84,9 +94,9 @@ class InferenceLoop(asyncio.AbstractEventLoop):
         if context_map:
             ctx = copy_context()
             ctx.run(lambda: [k.set(v) for k, v in context_map.items()])
-            fut = ctx.run(asyncio.ensure_future, x, loop=self)
+            fut = ctx.run(self.create_task, x)
         else:
-            fut = asyncio.ensure_future(x, loop=self)
+            fut = self.create_task(x)
         self._tasks.append(fut)
         return fut
 
@@ -124,9 +134,16 @@ class InferenceLoop(asyncio.AbstractEventLoop):
             '_InferenceLoop does not allow time-based scheduling.'
         )
 
+    def create_future(self):
+        """Create a Future associated to this loop."""
+        return asyncio.Future(loop=self)
+
     def create_task(self, coro):
         """Create a task from the given coroutine."""
-        return asyncio.Task(coro, loop=self)
+        task = asyncio.Task(coro, loop=self)
+        # Tasks left pending when inference fails are expected
+        task._log_destroy_pending = False
+        return task
 
     def create_pending(self, resolve, priority):
         """Create a Pending associated to this loop."""
@@ -41,14 +41,17 @@ from .data import (
     DummyFunction,
     GraphFunction,
     JTransformedFunction,
+    JVPTransformedFunction,
     PartialApplication,
     Possibilities,
     PrimitiveFunction,
+    VMapTransformedFunction,
 )
 from .infer import Inferrer
 from .loop import force_pending
 from .ref import Context
 from .utils import (
+    amerge,
     broaden,
     build_value,
     hastype_helper,
@@ -463,6 +466,22 @@ async def _inf_array_len(self, engine, xs: AbstractArray):
     })
 
 
+def _array_row(xs):
+    """Return the type of the rows of xs, along its first axis."""
+    shp = xs.values[SHAPE]
+    if len(shp) == 0:
+        raise MyiaShapeError('Cannot index an array of shape ()')
+    elif len(shp) == 1:
+        return xs.element
+    return type(xs)(xs.element, {SHAPE: shp[1:]})
+
+
+@standard_prim(P.array_getitem)
+async def _inf_array_getitem(self, engine, xs: AbstractArray,
+                             idx: dtype.Int[64]):
+    return _array_row(xs)
+
+
 ##########
 # Arrays #
 ##########
@@ -484,6 +503,15 @@ async def _inf_array_to_scalar(self, engine, a: AbstractArray):
     return a.element
 
 
+@standard_prim(P.array_cast)
+async def _inf_array_cast(self, engine, a: AbstractArray, typ: AbstractType):
+    scal = type_to_abstract(typ.values[VALUE])
+    t = type_token(scal)
+    engine.check(Number, t)
+    e_values = {**a.element.values, TYPE: t}
+    return type(a)(AbstractScalar(e_values), a.values)
+
+
 @standard_prim(P.broadcast_shape)
 async def _inf_broadcast_shape(self, engine, xs: _shape_type, ys: _shape_type):
     shp_x = tuple(x.values[VALUE] for x in xs.elements)
@@ -525,8 +553,7 @@ async def _inf_shape(self, engine, a: AbstractArray):
     return AbstractTuple(values)
 
 
-@standard_prim(P.array_map)
-async def _inf_array_map(self, engine, fn: AbstractFunction, *arrays):
+async def _array_map_result(engine, fn, arrays):
     if len(arrays) < 1:
         raise MyiaTypeError('array_map requires at least one array')
     for arr in arrays:
@@ -563,15 +590,7 @@ async def _inf_array_map(self, engine, fn: AbstractFunction, *arrays):
     return type(arrays[0])(result, {SHAPE: tuple(rshape)})
 
 
-# TODO: array_scan
-
-
-@standard_prim(P.array_reduce)
-async def _inf_array_reduce(self, engine,
-                            fn: AbstractFunction,
-                            a: AbstractArray,
-                            shp: _shape_type):
-
+async def _array_reduce_result(engine, fn, a, shp):
     shp_i = await force_pending(a.values[SHAPE])
     shp_v = build_value(shp, default=ANYTHING)
     if shp_v == ANYTHING:
@@ -592,6 +611,42 @@ async def _inf_array_reduce(self, engine,
     return type(a)(res, {SHAPE: shp_v})
 
 
+@standard_prim(P.array_map)
+async def _inf_array_map(self, engine, fn: AbstractFunction, *arrays):
+    return await _array_map_result(engine, fn, arrays)
+
+
+# TODO: array_scan
+
+
+@standard_prim(P.array_fold)
+async def _inf_array_fold(self, engine,
+                          fn: AbstractFunction,
+                          init,
+                          xs: AbstractArray):
+    state = broaden(init)
+    res = await engine.execute(fn, state, _array_row(xs))
+    return amerge(state, broaden(res), forced=True)
+
+
+@standard_prim(P.array_reduce)
+async def _inf_array_reduce(self, engine,
+                            fn: AbstractFunction,
+                            a: AbstractArray,
+                            shp: _shape_type):
+    return await _array_reduce_result(engine, fn, a, shp)
+
+
+@standard_prim(P.map_reduce)
+async def _inf_map_reduce(self, engine,
+                          fn_reduce: AbstractFunction,
+                          fn_map: AbstractFunction,
+                          shp: _shape_type,
+                          *arrays):
+    mapped = await _array_map_result(engine, fn_map, arrays)
+    return await _array_reduce_result(engine, fn_reduce, mapped, shp)
+
+
 @standard_prim(P.distribute)
 async def _inf_distribute(self, engine, a: AbstractArray, _shp: _shape_type):
     shp = tuple(x.values[VALUE] for x in _shp.elements)
@@ -662,6 +717,30 @@ async def _inf_dot(self, engine, a: AbstractArray, b: AbstractArray):
     return type(a)(a.element, {SHAPE: c_shp})
 
 
+@standard_prim(P.batch_dot)
+async def _inf_batch_dot(self, engine, a: AbstractArray, b: AbstractArray):
+    a_shp = a.values[SHAPE]
+    b_shp = b.values[SHAPE]
+    if len(a_shp) != 3 or len(b_shp) != 3:
+        raise MyiaShapeError("batch_dot needs batches of matrices")
+    for i, j in ((0, 0), (2, 1)):
+        if (a_shp[i] != b_shp[j] and
+                a_shp[i] is not ANYTHING and b_shp[j] is not ANYTHING):
+            raise MyiaShapeError(
+                f"Incompatible shapes in batch_dot: {a_shp} and {b_shp}"
+            )
+    engine.abstract_merge(a.element, b.element)
+    batch = a_shp[0] if a_shp[0] is not ANYTHING else b_shp[0]
+    c_shp = (batch, a_shp[1], b_shp[2])
+
+    if type(a) != type(b):
+        raise MyiaTypeError(
+            f'Expect array of type {type(a)} '
+            f'to have same type as array of type {type(b)}')
+
+    return type(a)(a.element, {SHAPE: c_shp})
+
+
 @standard_prim(P.conv2d)
 async def _inf_conv2d(self, engine, input: AbstractArray,
                       weight: AbstractArray, stride: _shape_type_pair,
@@ -911,6 +990,22 @@ async def _inf_J(self, engine, x):
     return AbstractJTagged(x)
 
 
+@standard_prim(P.jvp)
+async def _inf_jvp(self, engine, x: AbstractFunction):
+    v = await x.get()
+    return AbstractFunction(*[JVPTransformedFunction(poss)
+                              for poss in v])
+
+
+@standard_prim(P.vmap)
+async def _inf_vmap(self, engine, x: AbstractFunction, in_axes, size):
+    v = await x.get()
+    in_axes = build_value(in_axes)
+    size = build_value(size)
+    return AbstractFunction(*[VMapTransformedFunction(poss, in_axes, size)
+                              for poss in v])
+
+
 @standard_prim(P.Jinv)
 async def _inf_Jinv(self, engine, x):
     if isinstance(x, AbstractFunction):
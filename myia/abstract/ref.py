@@ -1,6 +1,5 @@
 """Tools to handle contexts and references in inference."""
 
-import asyncio
 from dataclasses import dataclass
 
 from .loop import force_pending
@@ -186,6 +185,6 @@ class EvaluationCache:
 
         This will wrap the value in a Future.
         """
-        fut = asyncio.Future(loop=self.loop)
+        fut = self.loop.create_future()
         fut.set_result(value)
         self.cache[key] = fut
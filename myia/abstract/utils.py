@@ -1,6 +1,7 @@
 """Utilities for abstract values and inference."""
 
 import typing
+import weakref
 from dataclasses import dataclass
 from functools import reduce
 from itertools import chain
@@ -44,10 +45,12 @@ from .data import (
     AbstractUnion,
     AbstractValue,
     JTransformedFunction,
+    JVPTransformedFunction,
     PartialApplication,
     Possibilities,
     TaggedPossibilities,
     TrackDict,
+    VMapTransformedFunction,
 )
 from .loop import (
     Pending,
@@ -343,6 +346,16 @@ def abstract_check(self, t: JTransformedFunction, *args):
     return self(t.fn, *args)
 
 
+@overload  # noqa: F811
+def abstract_check(self, t: JVPTransformedFunction, *args):
+    return self(t.fn, *args)
+
+
+@overload  # noqa: F811
+def abstract_check(self, t: VMapTransformedFunction, *args):
+    return self(t.fn, *args)
+
+
 @overload  # noqa: F811
 def abstract_check(self, x: Pending, *args):
     return False
@@ -515,6 +528,16 @@ def abstract_clone(self, x: JTransformedFunction, *args):
     return JTransformedFunction(self(x.fn, *args))
 
 
+@overload  # noqa: F811
+def abstract_clone(self, x: JVPTransformedFunction, *args):
+    return JVPTransformedFunction(self(x.fn, *args))
+
+
+@overload  # noqa: F811
+def abstract_clone(self, x: VMapTransformedFunction, *args):
+    return VMapTransformedFunction(self(x.fn, *args), x.in_axes, x.size)
+
+
 @overload  # noqa: F811
 def abstract_clone(self, x: Pending, *args):
     if x.done():
@@ -679,9 +702,10 @@ async def force_through(__call__, self, x, through):
 # Uncomment and test the other implementations if/when needed:
 
 
-# @overload  # noqa: F811
-# async def force_through(self, x: AbstractScalar, through):
-#     return AbstractScalar(await self(x.values, through))
+@overload  # noqa: F811
+async def force_through(self, x: AbstractScalar, through):
+    return AbstractScalar({k: (await self(v, through))
+                           for k, v in x.values.items()})
 
 
 # @overload  # noqa: F811
@@ -1331,3 +1355,136 @@ def _finalize_adt(self, x: AbstractUnion):
     else:
         yield None
         return self(x)
+
+
+###############
+# Memoization #
+###############
+
+
+@abstract_check.variant(
+    initial_state=lambda: CheckState(cache={}, prop='_no_pending')
+)
+def _no_pending(self, x: Pending):
+    return False
+
+
+class _MemoTable:
+    """Table of results, indexed by the identity of abstract values.
+
+    The abstract values are held weakly. Results are also held weakly, since
+    they are often one of the keys.
+    """
+
+    def __init__(self):
+        self.table = weakref.WeakKeyDictionary()
+
+    def get(self, keys, options):
+        table = self.table
+        for key in keys:
+            table = table.get(key, None)
+            if table is None:
+                return None
+        ref = table.get(options, None)
+        return ref and ref()
+
+    def set(self, keys, options, result):
+        *keys, last = keys
+        table = self.table
+        for key in keys:
+            table = table.setdefault(key, weakref.WeakKeyDictionary())
+        table = table.setdefault(last, {})
+        table[options] = weakref.ref(result)
+
+
+def _is_memoizable(x):
+    if not isinstance(x, AbstractValue):
+        return False
+    try:
+        return getattr(x, '_no_pending', None) is x or _no_pending(x)
+    except TypeError:
+        # Some abstract values, e.g. from type_to_abstract(typing.Tuple),
+        # have ANYTHING in place of their elements
+        return False
+
+
+class MemoizedTransform:
+    """Memoize a transform on interned abstract values.
+
+    AbstractValues are interned, so the result of a transform can be looked
+    up by the identity of its arguments, which skips the setup of the
+    transform's state and the interning of its result. Only calls on
+    AbstractValues that contain no Pending are memoized.
+
+    Other attributes, e.g. variant, are those of the transform.
+
+    Attributes:
+        fn: The transform.
+        name: The name of the transform.
+        nargs: The number of AbstractValue arguments that form the key.
+        hits: The number of calls that were served from the table.
+        misses: The number of memoizable calls that were not.
+
+    """
+
+    def __init__(self, fn, name, nargs=1):
+        """Initialize a MemoizedTransform."""
+        self.fn = fn
+        self.name = name
+        self.nargs = nargs
+        self.hits = 0
+        self.misses = 0
+        self._table = _MemoTable()
+        _memoized_transforms.append(self)
+
+    def __call__(self, *args, **kwargs):
+        """Return fn(*args, **kwargs), from the table if possible."""
+        keys = args[:self.nargs]
+        options = (args[self.nargs:], tuple(sorted(kwargs.items())))
+        try:
+            hash(options)
+        except TypeError:
+            return self.fn(*args, **kwargs)
+        if len(keys) != self.nargs or not all(map(_is_memoizable, keys)):
+            return self.fn(*args, **kwargs)
+        result = self._table.get(keys, options)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self.fn(*args, **kwargs)
+        if isinstance(result, AbstractValue):
+            self._table.set(keys, options, result)
+        return result
+
+    def __getattr__(self, attr):
+        return getattr(self.fn, attr)
+
+    def clear(self):
+        """Clear the table and the statistics."""
+        self.hits = 0
+        self.misses = 0
+        self._table = _MemoTable()
+
+
+_memoized_transforms = []
+
+
+def memo_statistics(reset=False):
+    """Return the hits and misses of the memoized abstract transforms.
+
+    The result maps the name of each transform to a (hits, misses) pair.
+    If reset is True, the tables and the statistics are cleared.
+    """
+    stats = {m.name: (m.hits, m.misses) for m in _memoized_transforms}
+    if reset:
+        for m in _memoized_transforms:
+            m.clear()
+    return stats
+
+
+abstract_clone = MemoizedTransform(abstract_clone, 'abstract_clone')
+broaden = MemoizedTransform(broaden, 'broaden')
+concretize_abstract = MemoizedTransform(concretize_abstract,
+                                        'concretize_abstract')
+amerge = MemoizedTransform(amerge, 'amerge', nargs=2)
@@ -1,22 +1,35 @@
 """User-friendly interfaces to Myia machinery."""
 
+import asyncio
 import inspect
+import os
+import pickle
+import queue
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
 import numpy as np
 
 from . import dtype
 from .abstract import (
+    SHAPE,
     TYPE,
     AbstractArray,
     AbstractClassBase,
+    AbstractDict,
     AbstractScalar,
     AbstractTuple,
+    AbstractValue,
     ArrayWrapper,
     find_aliases,
     from_value,
 )
-from .compile.backends import Backend, load_backend
-from .pipeline import standard_pipeline
+from .compile.backends import Backend, load_backend, parse_default
+from .info import NoDebugInfo
+from .pipeline import optimization_levels, standard_pipeline
+from .runtime import EXPORT_VERSION
 from .utils import (
     Cons,
     Empty,
@@ -42,21 +55,35 @@ class MyiaFunction:
         fn: The root function to compile.
         specialize_values: Set of arguments for which we should specialize the
             function based on their values (list of argument names).
+        opt_level: The optimization level (0 to 3).
+        debug_info: Whether to record debug information while compiling.
+        compute_type: The type in which matrix products and convolutions
+            are computed, or None to compute them in the type of their
+            inputs.
 
     """
 
     def __init__(self, fn, specialize_values=[], return_backend=False,
-                 backend=None, backend_options=None, alias_tracker=None):
+                 backend=None, backend_options=None, alias_tracker=None,
+                 opt_level=1, debug_info=True, compute_type=None):
         """Initialize a MyiaFunction."""
+        if opt_level not in optimization_levels:
+            raise ValueError(f'Invalid optimization level: {opt_level}')
         self.fn = fn
         self.alias_tracker = alias_tracker
         self.specialize_values = set(specialize_values)
+        self.opt_level = opt_level
+        self.debug_info = debug_info
+        self.compute_type = compute_type
         self.pip = standard_pipeline.configure({
+            **optimization_levels[opt_level],
+            'mixed_precision.compute_type': compute_type,
             'compile.backend': backend,
             'compile.backend_options': backend_options,
             'wrap.return_backend': return_backend,
         })
         self._cache = {}
+        self._executor = None
         self.latest = None
 
     def specialize(self, args):
@@ -83,11 +110,12 @@ class MyiaFunction:
         )
 
         if argspec not in self._cache:
-            self._cache[argspec] = self.pip.run(
-                input=self.fn,
-                argspec=argspec,
-                aliasspec=(self.alias_tracker, aid_to_paths),
-            )
+            with (nullcontext() if self.debug_info else NoDebugInfo()):
+                self._cache[argspec] = self.pip.run(
+                    input=self.fn,
+                    argspec=argspec,
+                    aliasspec=(self.alias_tracker, aid_to_paths),
+                )
         return self._cache[argspec]
 
     def compile(self, args):
@@ -104,10 +132,71 @@ class MyiaFunction:
                 pass
         return self.compile(args)(*args)
 
+    def call_async(self, *args):
+        """Call the function on the given args without waiting for it.
+
+        The arguments are converted in the calling thread, then the function
+        runs on a worker thread, one call after the other. This lets the
+        caller prepare the arguments of the next call while the current one
+        runs.
+
+        Returns a MyiaFuture, whose result can be waited for with result()
+        or awaited in a coroutine. The result is only converted from the
+        backend's format then.
+        """
+        if self.latest:
+            try:
+                return self._submit(self.latest, args)
+            except MyiaInputTypeError:
+                pass
+        return self._submit(self.compile(args), args)
+
+    def _submit(self, fn, args):
+        """Convert args for fn and run it on the worker thread."""
+        args = fn.convert_args(args)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return MyiaFuture(self._executor.submit(fn.run, args),
+                          fn.convert_result)
+
+
+class MyiaFuture:
+    """The pending result of MyiaFunction.call_async."""
+
+    def __init__(self, future, convert):
+        """Initialize a MyiaFuture.
+
+        Arguments:
+            future: A concurrent.futures.Future for the output of the VM.
+            convert: The function to convert that output to the result.
+        """
+        self._future = future
+        self._convert = convert
+        self._result = None
+
+    def done(self):
+        """Return whether the call has finished."""
+        return self._future.done()
+
+    def result(self, timeout=None):
+        """Wait for the call to finish and return its result.
+
+        Exceptions raised by the call are raised again here.
+        """
+        if self._convert is not None:
+            self._result = self._convert(self._future.result(timeout))
+            self._convert = None
+        return self._result
+
+    def __await__(self):
+        yield from asyncio.wrap_future(self._future).__await__()
+        return self.result()
+
 
 @keyword_decorator
 def myia(fn, *, specialize_values=[], backend=None, backend_options=None,
-         return_backend=False, alias_tracker=None):
+         return_backend=False, alias_tracker=None, opt_level=1,
+         debug_info=True, compute_type=None):
     """Create a function using Myia's runtime.
 
     `@myia` can be used as a simple decorator. If custom options are needed,
@@ -128,11 +217,157 @@ def myia(fn, *, specialize_values=[], backend=None, backend_options=None,
         backend: the backend to use for compilation
         backend_options: backend-specific options.
         return_backend: return backend values (avoids copies to CPU).
+        opt_level: The optimization level. 0 only applies the
+            transformations required for correctness and compiles fastest,
+            1 is the default, 2 and 3 apply costlier optimizations and fuse
+            elementwise operations into single kernels.
+        debug_info: Whether to record debug information while compiling.
+            Turning it off reduces compile time and memory use, but error
+            messages will not point to the source code.
+        compute_type: If given, e.g. Float[16], the matrix products and
+            convolutions on arrays of a wider float type are computed on
+            arrays of this type, and their results are cast back. This
+            halves the memory traffic of these operations on backends that
+            support half precision. Use it with grad(..., loss_scale=s) to
+            keep small gradients from vanishing.
     """
     return MyiaFunction(fn, specialize_values, backend=backend,
                         backend_options=backend_options,
                         return_backend=return_backend,
-                        alias_tracker=alias_tracker)
+                        alias_tracker=alias_tracker,
+                        opt_level=opt_level,
+                        debug_info=debug_info,
+                        compute_type=compute_type)
+
+
+##########
+# Export #
+##########
+
+@overload(bootstrap=True)
+def _export_spec(self, t: AbstractTuple):
+    return ('tuple', tuple(self(e) for e in t.elements))
+
+
+@overload  # noqa: F811
+def _export_spec(self, t: AbstractDict):
+    return ('dict', tuple(t.entries.keys()),
+            tuple(self(e) for e in t.entries.values()))
+
+
+@overload  # noqa: F811
+def _export_spec(self, t: AbstractClassBase):
+    if t.tag in (Empty, Cons):
+        raise MyiaTypeError(f'Cannot export a value of type {t}')
+    return ('class', t.tag, t.constructor, tuple(t.attributes.keys()),
+            tuple(self(e) for e in t.attributes.values()))
+
+
+@overload  # noqa: F811
+def _export_spec(self, t: AbstractArray):
+    return ('array', dtype.type_to_np_dtype(t.element.dtype()),
+            t.values[SHAPE])
+
+
+@overload  # noqa: F811
+def _export_spec(self, t: AbstractScalar):
+    typ = t.values[TYPE]
+    if typ is dtype.Nil:
+        return ('scalar', None)
+    elif issubclass(typ, (dtype.Number, dtype.Bool)):
+        return ('scalar', dtype.type_to_np_dtype(typ))
+    else:
+        raise MyiaTypeError(f'Cannot export a value of type {t}')
+
+
+@overload  # noqa: F811
+def _export_spec(self, t: AbstractValue):
+    raise MyiaTypeError(f'Cannot export a value of type {t}')
+
+
+class _ExportPickler(pickle.Pickler):
+    """Pickle the kernels of a backend through their recipe.
+
+    The backend itself is not saved, it is created again when the program
+    is loaded.
+    """
+
+    def __init__(self, file, backend):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.backend = backend
+
+    def persistent_id(self, obj):
+        if obj is self.backend:
+            return 'backend'
+        elif isinstance(obj, types.FunctionType) and hasattr(obj, 'recipe'):
+            return obj.recipe
+        return None
+
+
+def export(fn, args, path, *, backend=None, backend_options=None,
+           opt_level=1, compute_type=None):
+    """Compile fn for the types of args and save the program to path.
+
+    The program can be loaded with myia.runtime.load, which only needs the
+    VM and the backend: the parser, the inference engine and the optimizer
+    are not imported and nothing is compiled again.
+
+    Arguments, and results, may be scalars, arrays, tuples, dicts and
+    instances of dataclasses defined at the top level of a module. The
+    kernels of the backend must be module-level functions, or have a
+    recipe attribute with a module-level factory and the arguments to give
+    it, which is the case for the pytorch backend.
+
+    Arguments:
+        fn: The Python function to compile.
+        args: Example arguments, which give the types and shapes of the
+            arguments of the program.
+        path: The file to write. It is only replaced once the program was
+            written completely.
+        backend: The backend to compile for. The default backend is used if
+            it is None.
+        backend_options: backend-specific options.
+        opt_level: The optimization level.
+        compute_type: The type in which matrix products and convolutions
+            are computed, as for myia.
+    """
+    if backend is None:
+        assert backend_options is None
+        backend, backend_options = parse_default()
+    mf = MyiaFunction(fn, backend=backend, backend_options=backend_options,
+                      opt_level=opt_level, compute_type=compute_type)
+    argspec = tuple(from_value(arg, broaden=True) for arg in args)
+    res = mf.pip['compile'].run(input=fn, argspec=argspec)
+    vm = res['output']
+    program = {
+        'code': vm.code,
+        'argspec': tuple(_export_spec(t) for t in
+                         res['orig_argspec'] or res['argspec']),
+        'outspec': _export_spec(res['orig_outspec'] or res['outspec']),
+    }
+    header = {
+        'version': EXPORT_VERSION,
+        'backend': backend,
+        'backend_options': backend_options or {},
+    }
+    # The program is written next to path and moved over it once complete,
+    # so that a failure does not leave a truncated file at path
+    tmp = os.fspath(path) + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(header, f)
+            try:
+                _ExportPickler(f, vm.backend).dump(program)
+            except (pickle.PicklingError, AttributeError, TypeError) as exc:
+                raise MyiaTypeError(
+                    f'Cannot export {fn.__qualname__} with the {backend} '
+                    f'backend: {exc}'
+                ) from exc
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
 
 
 ######################################################################
@@ -192,3 +427,87 @@ def to_device(model, backend, backend_options=None):
         backend
     )
     return model
+
+
+class Prefetcher:
+    """Move batches to target accelerator hardware ahead of their use.
+
+    A background thread calls to_device on the next batches of an iterator
+    while the caller works on the current one, so that the batches given to
+    a compiled function are already converted:
+
+        for inp, target in Prefetcher(data, 'pytorch'):
+            cost, model = step(model, inp, target)
+
+    At most depth batches are converted ahead of the caller. Exceptions
+    raised by the iterator or by the conversion are raised again when the
+    batch they concern is reached.
+    """
+
+    _end = object()
+
+    def __init__(self, batches, backend, backend_options=None, *, depth=2):
+        """Initialize a Prefetcher and start converting batches.
+
+        Arguments:
+            batches: An iterable of batches, e.g. tuples of numpy arrays.
+            backend: The backend to convert the batches for, or its name.
+            backend_options: backend-specific options.
+            depth: The number of batches to convert ahead.
+        """
+        if not isinstance(backend, Backend):
+            backend = load_backend(backend, backend_options)
+        self.backend = backend
+        self._batches = iter(batches)
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._done = False
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        """Put item in the queue, unless the Prefetcher is closed."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _work(self):
+        """Convert the batches, in the background thread."""
+        try:
+            for batch in self._batches:
+                if not self._put((True, to_device(batch, self.backend))):
+                    return
+        except Exception as exc:
+            self._put((False, exc))
+        else:
+            self._put((True, self._end))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        ok, item = self._queue.get()
+        if not ok:
+            self.close()
+            raise item
+        if item is self._end:
+            self.close()
+            raise StopIteration
+        return item
+
+    def close(self):
+        """Stop converting batches."""
+        self._done = True
+        self._stop.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
@@ -160,6 +160,19 @@ class Backend:
         """An empty grad environment for the backend."""
         return ()
 
+    def array_rows(self, v):
+        """Return the list of the rows of the array v, along its first axis.
+
+        The rows of an array with a single dimension are scalars. This goes
+        through numpy, so backends that can index their arrays directly
+        should override it.
+        """
+        a = self.to_numpy(v)
+        if a.ndim == 1:
+            t = dtype.np_dtype_to_type(str(a.dtype))
+            return [self.from_scalar(x.item(), t) for x in a]
+        return [self.from_numpy(row.copy()) for row in a]
+
     def convert_value(self, v, t):
         """Convert a value to the appropriate backend representation."""
         if (isinstance(t, (abstract.AbstractError, abstract.AbstractType))
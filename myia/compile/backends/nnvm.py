@@ -9,8 +9,9 @@ import tvm
 from nnvm.compiler import graph_attr
 from tvm.contrib import graph_runtime
 
-from ...abstract import AbstractArray
+from ...abstract import AbstractArray, type_to_abstract
 from ...dtype import Nil, type_to_np_dtype
+from ...ir import toposort
 from ...prim import Primitive, ops as P
 from ..transform import CompileGraphs, nonlinear_ops
 from ..utils import get_outputs
@@ -71,6 +72,13 @@ def nnvm_distribute(c, v, shp):
     return sym.broadcast_to(nv, shape=shp)
 
 
+def nnvm_array_cast(c, x, t):
+    """Implementation of array_cast."""
+    assert t.is_constant()
+    dtype = type_to_np_dtype(type_to_abstract(t.value).dtype())
+    return sym.cast(c.ref(x), dtype=dtype)
+
+
 def nnvm_dot(c, a, b):
     """Implementation of dot."""
     na = c.ref(a)
@@ -79,22 +87,37 @@ def nnvm_dot(c, a, b):
                      use_bias=False)
 
 
+def nnvm_fused_map(c, g, *array):
+    """Inline an elementwise graph applied on arrays.
+
+    NNVM fuses the resulting operations into a single kernel.
+    """
+    eqv = {p: c.ref(a) for p, a in zip(g.parameters, array)}
+    like = eqv[g.parameters[0]]
+    for node in toposort(g.output):
+        if node.is_apply():
+            eqv[node] = SIMPLE_MAP[node.inputs[0].value](
+                *[eqv[i] for i in node.inputs[1:]])
+        elif node.is_constant() and not node.is_constant(Primitive):
+            eqv[node] = sym.full_like(like, fill_value=node.value)
+    return eqv[g.output]
+
+
 def nnvm_array_map(c, fn, *array):
     """Implementation of array_map."""
+    if fn.is_constant_graph():
+        return nnvm_fused_map(c, fn.value, *array)
     assert fn.is_constant(Primitive)
     fn = fn.value
     return SIMPLE_MAP[fn](*[c.ref(a) for a in array])
 
 
-def nnvm_array_reduce(c, fn, array, shape):
-    """Implementation of array_reduce."""
+def _nnvm_reduce(fn, ary, ashp, shape):
     assert fn.is_constant(Primitive)
     assert shape.is_constant(tuple)
     fn = fn.value
     tshp = shape.value
-    ary = c.ref(array)
     if fn == P.scalar_add:
-        ashp = ashape(array)
         if len(tshp) < len(ashp):
             ts = (1,) * (len(ashp) - len(tshp)) + tshp
         else:
@@ -112,6 +135,20 @@ def nnvm_array_reduce(c, fn, array, shape):
         raise NotImplementedError(f"reduce with {fn}")
 
 
+def nnvm_array_reduce(c, fn, array, shape):
+    """Implementation of array_reduce."""
+    return _nnvm_reduce(fn, c.ref(array), ashape(array), shape)
+
+
+def nnvm_map_reduce(c, fn_reduce, fn_map, shape, *array):
+    """Implementation of map_reduce.
+
+    NNVM fuses the map into the reduction kernel.
+    """
+    mapped = nnvm_array_map(c, fn_map, *array)
+    return _nnvm_reduce(fn_reduce, mapped, ashape(array[0]), shape)
+
+
 def nnvm_transpose(c, a, ax):
     """Implementation of transpose."""
     na = c.ref(a)
@@ -136,9 +173,11 @@ COMPLEX_MAP = {
     P.dot: nnvm_dot,
     P.array_map: nnvm_array_map,
     P.array_reduce: nnvm_array_reduce,
+    P.map_reduce: nnvm_map_reduce,
     P.transpose: nnvm_transpose,
     P.scalar_to_array: lambda c, x, t: c.ref(x),
     P.reshape: nnvm_reshape,
+    P.array_cast: nnvm_array_cast,
 }
 
 
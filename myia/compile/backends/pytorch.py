@@ -4,7 +4,8 @@ import numpy as np
 import torch
 import torch.utils.dlpack
 
-from ...dtype import Bool, Float, Int, UInt, type_to_np_dtype
+from ...dtype import Bool, Float, Int, UInt, np_dtype_to_type, type_to_np_dtype
+from ...ir import toposort
 from ...prim import Primitive, ops as P
 from ..transform import CompileGraphs, nonlinear_ops
 from . import Backend
@@ -39,6 +40,14 @@ def pytorch_array_to_scalar(v):
     return v.detach().numpy()
 
 
+def pytorch_array_getitem(v, i):
+    """Implementation of array_getitem for pytorch."""
+    row = v[int(i)]
+    if v.dim() == 1:
+        return pytorch_array_to_scalar(row)
+    return row
+
+
 simple_mapping = {
     P.scalar_add: lambda a, b: a + b,
     P.scalar_sub: lambda a, b: a - b,
@@ -70,8 +79,11 @@ simple_mapping = {
     P.transpose: lambda a, perm: a.permute(*perm),
     P.reshape: lambda a, shp: a.reshape(shp),
     P.dot: torch.mm,
+    P.batch_dot: torch.bmm,
 
     P.array_to_scalar: pytorch_array_to_scalar,
+    P.array_len: lambda a: np.int64(a.shape[0]),
+    P.array_getitem: pytorch_array_getitem,
 }
 
 
@@ -101,37 +113,136 @@ scalar_mapping = {
     P.bool_or: lambda a, b: a | b,
     P.bool_eq: torch.eq,
     P.bool_not: lambda a: ~a,
+
+    P.switch: torch.where,
 }
 
 
-def pytorch_array_map(op):
-    """Implementation of array_map for pytorch."""
-    fn = op.inputs[1]
-    assert fn.is_constant(Primitive)
-    fn = fn.value
+def _scalar_impl(fn):
     if fn in scalar_mapping:
-        impl = scalar_mapping[fn]
+        return scalar_mapping[fn]
     else:
         raise NotImplementedError(f'array_map of {fn}')
 
+
+def _kernel(factory, *data):
+    """Make a kernel with factory(*data).
+
+    The data must be picklable. The factory and the data are kept in the
+    recipe attribute of the kernel, so that it can be rebuilt when a program
+    exported with myia.export is loaded.
+    """
+    impl = factory(*data)
+    impl.recipe = (factory, data)
+    return impl
+
+
+def _simple_kernel(fn):
+    impl = simple_mapping[fn]
+
     def _impl(*args):
         return (impl(*args),)
-    return _impl, op.inputs[2:]
+    return _impl
 
 
-def pytorch_array_reduce(op):
-    """Implementation of array_reduce for pytorch."""
-    fn = op.inputs[1]
-    shape = op.inputs[3]
+def _scalar_to_array_kernel(backend):
+    def _impl(v):
+        # Operations on scalars return numpy scalars rather than arrays
+        return (backend.from_numpy(np.asarray(v)),)
+    return _impl
+
+
+def _fused_program(g):
+    """Return the data for _fused_map_kernel to map g elementwise.
+
+    The operations are applied in order and each intermediate tensor is
+    released as soon as it is no longer needed.
+    """
+    slots = {p: i for i, p in enumerate(g.parameters)}
+    nodes = [n for n in toposort(g.output) if n.is_apply()]
+    for n in nodes:
+        slots[n] = len(slots)
+
+    last_use = {}
+    for i, n in enumerate(nodes):
+        for inp in n.inputs[1:]:
+            if inp in slots:
+                last_use[slots[inp]] = i
+
+    program = []
+    for i, n in enumerate(nodes):
+        fn = n.inputs[0].value
+        _scalar_impl(fn)
+        args = [(True, slots[inp]) if inp in slots else (False, inp.value)
+                for inp in n.inputs[1:]]
+        free = [k for k, j in last_use.items() if j == i]
+        program.append((fn, args, slots[n], free))
+
+    if g.output not in slots:
+        raise NotImplementedError('array_map of a constant graph')
+    return program, slots[g.output], len(slots)
+
+
+def _fused_map_kernel(program, out, nslots):
+    program = [(_scalar_impl(fn), args, dest, free)
+               for fn, args, dest, free in program]
+
+    def _impl(*args):
+        env = list(args) + [None] * (nslots - len(args))
+        for impl, iargs, dest, free in program:
+            env[dest] = impl(*[env[x] if is_slot else x
+                               for is_slot, x in iargs])
+            for k in free:
+                if k != out:
+                    env[k] = None
+        return (env[out],)
+    return _impl
+
+
+def pytorch_fused_map(g):
+    """Make a single kernel that maps an elementwise graph over tensors."""
+    return _kernel(_fused_map_kernel, *_fused_program(g))
+
+
+# Largest number of elements of the arrays stacked by array_map_group
+_STACK_MAX_SIZE = 4096
+
+
+def _map_spec(fn):
+    """Return the data for _map_kernel to map fn elementwise."""
+    if fn.is_constant_graph():
+        return _fused_program(fn.value)
+    assert fn.is_constant(Primitive)
+    _scalar_impl(fn.value)
+    return fn.value
+
+
+def _map_kernel(spec):
+    if isinstance(spec, Primitive):
+        impl = _scalar_impl(spec)
+
+        def _impl(*args):
+            return (impl(*args),)
+        return _impl
+    return _fused_map_kernel(*spec)
+
+
+def pytorch_array_map(op):
+    """Implementation of array_map for pytorch."""
+    return _kernel(_map_kernel, _map_spec(op.inputs[1])), op.inputs[2:]
+
+
+def _reduce_spec(fn, shape):
+    """Return the data for _reduce_kernel."""
     assert fn.is_constant(Primitive)
     assert shape.is_constant(tuple)
-    fn = fn.value
-    tshp = shape.value
+    if fn.value != P.scalar_add:
+        raise NotImplementedError(f"reduce with {fn.value}")
+    return fn.value, shape.value
 
-    if fn == P.scalar_add:
-        impl = torch.sum
-    else:
-        raise NotImplementedError(f"reduce with {fn}")
+
+def _reduce_kernel(fn, tshp):
+    impl = torch.sum
 
     def _impl(array):
         ashp = array.shape
@@ -147,7 +258,79 @@ def pytorch_array_reduce(op):
         if len(tshp) < len(ashp):
             res = torch.reshape(res, shape=tshp)
         return (res,)
-    return _impl, (op.inputs[2],)
+    return _impl
+
+
+def pytorch_array_reduce(op):
+    """Implementation of array_reduce for pytorch."""
+    spec = _reduce_spec(op.inputs[1], op.inputs[3])
+    return _kernel(_reduce_kernel, *spec), (op.inputs[2],)
+
+
+def _map_reduce_kernel(reduce_spec, map_spec):
+    map_impl = _map_kernel(map_spec)
+    reduce_impl = _reduce_kernel(*reduce_spec)
+    is_dot = (map_spec == P.scalar_mul and reduce_spec[1] == ())
+
+    def _impl(*args):
+        if is_dot and args[0].is_floating_point():
+            a, b = args
+            return (torch.dot(a.reshape(-1), b.reshape(-1)),)
+        mapped, = map_impl(*args)
+        return reduce_impl(mapped)
+    return _impl
+
+
+def pytorch_map_reduce(op):
+    """Implementation of map_reduce for pytorch.
+
+    The mapped tensor only lives for the duration of the call. A full sum of
+    a product of two floating point tensors is computed with `torch.dot`,
+    which does not allocate it at all.
+    """
+    fn_reduce, fn_map, shape, *arrays = op.inputs[1:]
+    return _kernel(_map_reduce_kernel, _reduce_spec(fn_reduce, shape),
+                   _map_spec(fn_map)), arrays
+
+
+def _map_group_kernel(map_spec, arity):
+    map_impl = _map_kernel(map_spec)
+
+    def _impl(*arrays):
+        if arrays[0].numel() > _STACK_MAX_SIZE:
+            return (tuple(map_impl(*arrays[i:i + arity])[0]
+                          for i in range(0, len(arrays), arity)),)
+        out, = map_impl(*[torch.stack(arrays[i::arity])
+                          for i in range(arity)])
+        return (out.unbind(0),)
+    return _impl
+
+
+def pytorch_array_map_group(op):
+    """Implementation of array_map_group for pytorch.
+
+    The arrays all have the same shape. Small arrays are stacked, so that the
+    function is applied once on all of them, and the result is unbound into
+    the results for each group. Larger arrays are mapped one group at a time,
+    since copying them costs more than the separate calls.
+    """
+    return _kernel(_map_group_kernel, _map_spec(op.inputs[1]),
+                   op.inputs[2].value), op.inputs[3:]
+
+
+def _array_cast_kernel(np_dtype):
+    t = type_to_pytorch_type(np_dtype_to_type(np_dtype))
+
+    def _impl(a):
+        return (a.to(t),)
+    return _impl
+
+
+def pytorch_array_cast(op):
+    """Implementation of array_cast for pytorch."""
+    np_dtype = type_to_np_dtype(op.abstract.element.dtype())
+    return _kernel(_array_cast_kernel, np_dtype), (op.inputs[1],)
+
 
 #############################################################################
 
@@ -207,14 +390,17 @@ def pytorch_conv2d_weight_grad(op):
 _mapping = {
     P.array_map: pytorch_array_map,
     P.array_reduce: pytorch_array_reduce,
+    P.map_reduce: pytorch_map_reduce,
+    P.array_map_group: pytorch_array_map_group,
+    P.array_cast: pytorch_array_cast,
     P.conv2d: pytorch_conv2d,
     P.conv2d_input_grad: pytorch_conv2d_input_grad,
     P.conv2d_weight_grad: pytorch_conv2d_weight_grad,
 
 }
 
-for k, v in simple_mapping.items():
-    _mapping[k] = lambda op, v=v: (lambda *args: (v(*args),), op.inputs[1:])
+for k in simple_mapping:
+    _mapping[k] = lambda op, k=k: (_kernel(_simple_kernel, k), op.inputs[1:])
 
 
 def pytorch_convert(lst, backend):
@@ -228,7 +414,8 @@ def pytorch_convert(lst, backend):
     fn = op.inputs[0].value
     if fn == P.scalar_to_array:
         # Hack because we need the runtime context here.
-        return lambda v: (backend.from_numpy(v),), [op.inputs[1]], [op]
+        return (_kernel(_scalar_to_array_kernel, backend), [op.inputs[1]],
+                [op])
 
     mapper = _mapping.get(fn, None)
     if mapper is None:
@@ -251,7 +438,8 @@ class PyTorchBackend(Backend):
             device = 'cuda:0'
         self.device = torch.device(device)
         self.compiler = CompileGraphs(lambda lst: pytorch_convert(lst, self),
-                                      nonlinear_ops, self, split_linear=True)
+                                      nonlinear_ops, self, split_linear=True,
+                                      group_maps=True)
 
     def compile(self, graph, *others):
         """Compile a graph."""
@@ -264,8 +452,16 @@ class PyTorchBackend(Backend):
         return v.detach().numpy()
 
     def from_numpy(self, a):
-        """Make a torch tensor from a numpy array."""
-        return torch.from_numpy(a).to(self.device)
+        """Make a torch tensor from a numpy array.
+
+        Arrays for a GPU are copied through page-locked memory, which the
+        caching host allocator of PyTorch reuses from one call to the next,
+        so that the copy does not block.
+        """
+        t = torch.from_numpy(a)
+        if self.device.type == 'cuda':
+            return t.pin_memory().to(self.device, non_blocking=True)
+        return t.to(self.device)
 
     def to_scalar(self, v):
         """Convert a torch tensor to a scalar."""
@@ -281,6 +477,10 @@ class PyTorchBackend(Backend):
         dt = type_to_np_dtype(t)
         return np.asarray(s, dtype=dt)
 
+    def array_rows(self, v):
+        """Return the rows of a torch tensor, without copying them."""
+        return [pytorch_array_getitem(v, i) for i in range(v.shape[0])]
+
     def to_dlpack(self, v):
         """Make a dlpack capsule from a torch tensor."""
         return torch.utils.dlpack.to_dlpack(v)
@@ -288,7 +488,9 @@ class PyTorchBackend(Backend):
     def from_dlpack(self, dlp):
         """Make a torch tensor from a dlpack capsule."""
         v = torch.utils.dlpack.from_dlpack(dlp)
-        return v.to(self.device)
+        if v.device != self.device:
+            v = v.to(self.device)
+        return v
 
     def check_array(self, v, t):
         """Check if the value is a torch tensor of the right dtype."""
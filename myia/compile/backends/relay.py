@@ -15,6 +15,7 @@ from ...abstract import (
     PartialApplication,
     TypedPrimitive,
     VirtualFunction,
+    type_to_abstract,
 )
 from ...dtype import Bool, Nil, type_to_np_dtype
 from ...graph_utils import toposort
@@ -113,6 +114,8 @@ SIMPLE_MAP = {
 
     P.array_to_scalar: lambda x: x,
     P.dot: lambda x, y: relay.op.nn.dense(x, relay.op.transpose(y)),
+    P.batch_dot: lambda x, y: relay.op.nn.batch_matmul(
+        x, relay.op.transpose(y, (0, 2, 1))),
 
     P.make_tuple: lambda *args: relay.Tuple(args),
     P.switch: relay.If,
@@ -137,6 +140,13 @@ def relay_distribute(c, array, shape):
     return relay.op.broadcast_to(c.ref(array), shape.value)
 
 
+def relay_array_cast(c, x, t):
+    """Implementation of array_cast for Relay."""
+    assert t.is_constant()
+    dtype = type_to_np_dtype(type_to_abstract(t.value).dtype())
+    return relay.op.cast(c.ref(x), dtype)
+
+
 def relay_transpose(c, a, ax):
     """Implementation of transpose for Relay."""
     na = c.ref(a)
@@ -160,22 +170,37 @@ def relay_reshape(c, v, shp):
     return res
 
 
+def relay_fused_map(c, g, *array):
+    """Inline an elementwise graph applied on arrays.
+
+    Relay fuses the resulting operations into a single kernel.
+    """
+    eqv = {p: c.ref(a) for p, a in zip(g.parameters, array)}
+    for node in toposort(g.output, lambda n: n.inputs[1:]):
+        if node.is_apply():
+            eqv[node] = SIMPLE_MAP[node.inputs[0].value](
+                *[eqv[i] for i in node.inputs[1:]])
+        elif node.is_constant():
+            dtype = type_to_np_dtype(node.abstract.values[TYPE])
+            eqv[node] = relay.const(node.value, dtype=dtype)
+    return eqv[g.output]
+
+
 def relay_array_map(c, fn, *array):
     """Implementation of array_map for Relay."""
+    if fn.is_constant_graph():
+        return relay_fused_map(c, fn.value, *array)
     assert fn.is_constant(Primitive)
     fn = fn.value
     return SIMPLE_MAP[fn](*[c.ref(a) for a in array])
 
 
-def relay_array_reduce(c, fn, array, shape):
-    """Implementation of array_reduce for Relay."""
+def _relay_reduce(fn, ary, ashp, shape):
     assert fn.is_constant(Primitive)
     assert shape.is_constant(tuple)
     fn = fn.value
     tshp = shape.value
-    ary = c.ref(array)
     if fn == P.scalar_add:
-        ashp = ashape(array)
         if len(tshp) < len(ashp):
             ts = (1,) * (len(ashp) - len(tshp)) + tshp
         else:
@@ -194,6 +219,44 @@ def relay_array_reduce(c, fn, array, shape):
         raise NotImplementedError(f"reduce with {fn}")
 
 
+def relay_array_reduce(c, fn, array, shape):
+    """Implementation of array_reduce for Relay."""
+    return _relay_reduce(fn, c.ref(array), ashape(array), shape)
+
+
+def relay_map_reduce(c, fn_reduce, fn_map, shape, *array):
+    """Implementation of map_reduce for Relay.
+
+    The map is emitted inline as the input of the sum, which TVM fuses into
+    the reduction kernel.
+    """
+    mapped = relay_array_map(c, fn_map, *array)
+    return _relay_reduce(fn_reduce, mapped, ashape(array[0]), shape)
+
+
+def relay_array_fold(c, fn, init, array):
+    """Implementation of array_fold for Relay.
+
+    The fold becomes a local recursive function, which Relay compiles to a
+    loop.
+    """
+    state_t = to_relay_type(init.abstract)
+    index_t = relay.ty.TensorType((), 'int64')
+    loop = relay.var('loop', relay.ty.FuncType([index_t, state_t], state_t))
+    i = relay.var('i', type_annotation=index_t)
+    state = relay.var('state', type_annotation=state_t)
+    ary = c.ref(array)
+    n = relay.const(ashape(array)[0], dtype='int64')
+    row = relay.op.take(ary, i, axis=0)
+    step = relay.Call(c.ref(fn), [state, row])
+    body = relay.If(relay.op.less(i, n),
+                    relay.Call(loop, [i + relay.const(1, dtype='int64'),
+                                      step]),
+                    state)
+    start = relay.Call(loop, [relay.const(0, dtype='int64'), c.ref(init)])
+    return relay.Let(loop, relay.Function([i, state], body, state_t), start)
+
+
 COMPLEX_MAP = {
     P.partial: relay_partial,
     P.distribute: relay_distribute,
@@ -201,7 +264,10 @@ COMPLEX_MAP = {
     P.reshape: relay_reshape,
     P.array_map: relay_array_map,
     P.array_reduce: relay_array_reduce,
+    P.map_reduce: relay_map_reduce,
+    P.array_fold: relay_array_fold,
     P.scalar_to_array: lambda c, x, t: c.ref(x),
+    P.array_cast: relay_array_cast,
 }
 
 
@@ -1,6 +1,15 @@
 """Transforms a graph into lower-level code."""
 
-from ..abstract import VALUE, to_abstract
+from collections import defaultdict
+
+from ..abstract import (
+    ANYTHING,
+    SHAPE,
+    VALUE,
+    AbstractArray,
+    AbstractTuple,
+    to_abstract,
+)
 from ..ir import Apply, Constant, Graph, toposort
 from ..prim import Primitive, ops as P
 from ..utils import SymbolicKeyInstance
@@ -28,6 +37,21 @@ def convert_grad(graph):
     return graph
 
 
+_kernel_positions = {
+    P.array_map: (1,),
+    P.array_map_group: (1,),
+    P.array_reduce: (1,),
+    P.map_reduce: (1, 2),
+}
+
+
+def _is_kernel_use(node, key):
+    """Check if node's input at key is the function of an array operation."""
+    return (node.is_apply()
+            and node.inputs[0].is_constant(Primitive)
+            and key in _kernel_positions.get(node.inputs[0].value, ()))
+
+
 def wrap_primitives(graph):
     """Helper function to wrap primitives.
 
@@ -60,10 +84,7 @@ def wrap_primitives(graph):
             if ct.is_constant(Primitive):
                 for node, key in mng.uses[ct]:
                     if key != 0:
-                        if (key == 1 and
-                            node.inputs[0].is_constant() and
-                            node.inputs[0].value in (P.array_map,
-                                                     P.array_reduce)):
+                        if _is_kernel_use(node, key):
                             continue
                         g = get_prim_graph(ct.value, ct.abstract)
                         tr.set_edge(node, key, Constant(g))
@@ -71,10 +92,115 @@ def wrap_primitives(graph):
     return graph
 
 
+def _is_kernel_graph(g):
+    """Check if g is only used as the function of an array operation.
+
+    The backends implement these graphs directly as part of the array
+    operation, so they do not need to be compiled separately.
+    """
+    mng = g.manager
+    for ct in mng.graph_constants[g]:
+        for node, key in mng.uses[ct]:
+            if not _is_kernel_use(node, key):
+                return False
+    return True
+
+
+def _kernel_key(fn):
+    """Return a key that is the same for equivalent array_map functions.
+
+    The elementwise graphs made by fusion are distinct for each array, even
+    when they compute the same thing, so they are compared by structure.
+    """
+    if fn.is_constant(Primitive):
+        return fn.value
+    elif not fn.is_constant_graph():
+        return None
+    g = fn.value
+    index = {p: i for i, p in enumerate(g.parameters)}
+    key = []
+    for node in toposort(g.output):
+        if node.is_apply() and node.inputs[0].is_constant(Primitive):
+            args = []
+            for inp in node.inputs[1:]:
+                if inp in index:
+                    args.append(index[inp])
+                elif inp.is_constant((int, float, bool)):
+                    args.append((inp.value, inp.abstract))
+                else:
+                    return None
+            index[node] = len(index)
+            key.append((node.inputs[0].value, tuple(args)))
+        elif not (node.is_constant() or node in index):
+            return None
+    if g.output not in index:
+        return None
+    return (len(g.parameters), tuple(key), index[g.output])
+
+
+def _group_key(node):
+    """Return the key to group an array_map with others, or None."""
+    fn, *args = node.inputs[1:]
+    if not all(isinstance(a.abstract, AbstractArray) for a in args):
+        return None
+    shp = node.abstract.values[SHAPE]
+    if shp is ANYTHING or ANYTHING in shp:
+        return None
+    fkey = _kernel_key(fn)
+    if fkey is None:
+        return None
+    return (fkey, shp, tuple(a.abstract.element for a in args))
+
+
+def group_array_maps(graph):
+    """Group the array_map applications of the same function in each graph.
+
+    Applications that do not depend on each other are replaced by a single
+    array_map_group, which returns the tuple of their results, so that the
+    backend can run them together. This is the case, for example, of the
+    updates to each parameter of a model.
+
+    Two applications are grouped if they map the same function over arrays
+    of the same shape and element types, and if they are at the same depth,
+    i.e. the same number of array_map applications precede them in the graph,
+    which guarantees that one does not depend on the other.
+    """
+    mng = graph.manager
+    for g in list(mng.graphs):
+        depth = {}
+        groups = defaultdict(list)
+        for node in toposort(g.output):
+            d = max((depth.get(inp, 0) for inp in node.inputs), default=0)
+            if node.is_apply(P.array_map) and node.graph is g:
+                d += 1
+                key = _group_key(node)
+                if key is not None:
+                    groups[d, key].append(node)
+            depth[node] = d
+
+        for nodes in groups.values():
+            if len(nodes) < 2:
+                continue
+            fn = nodes[0].inputs[1]
+            arity = Constant(len(nodes[0].inputs) - 2)
+            arity.abstract = to_abstract(arity.value)
+            args = [inp for node in nodes for inp in node.inputs[2:]]
+            group = g.apply(P.array_map_group, fn, arity, *args)
+            group.abstract = AbstractTuple([node.abstract for node in nodes])
+            for i, node in enumerate(nodes):
+                idx = Constant(i)
+                idx.abstract = to_abstract(i)
+                new_node = g.apply(P.tuple_getitem, group, idx)
+                new_node.abstract = node.abstract
+                mng.replace(node, new_node)
+
+    return graph
+
+
 nonlinear_ops = (
     P.return_, P.partial, P.switch, P.make_tuple, P.bool_and,
     P.tuple_getitem, P.tuple_setitem, P.env_getitem, P.env_setitem, P.env_add,
-    P.tagged, P.hastag, P.casttag, P.unsafe_static_cast,
+    P.tagged, P.hastag, P.casttag, P.unsafe_static_cast, P.array_fold,
 )
 
 
@@ -275,6 +401,11 @@ class CompileGraph:
                         self.add_instr('unsafe_static_cast',
                                        self.ref(split.inputs[1]),
                                        self.ref(split.inputs[2]))
+                    elif fn.value == P.array_fold:
+                        self.add_instr('array_fold',
+                                       self.ref(split.inputs[1]),
+                                       self.ref(split.inputs[2]),
+                                       self.ref(split.inputs[3]))
                     elif fn.value == P.env_getitem:
                         self.add_instr('env_getitem',
                                        self.ref(split.inputs[1]),
@@ -333,15 +464,20 @@ class CompileGraphs:
 
     """
 
-    def __init__(self, lin_convert, cut_list, backend, *, split_linear=False):
+    def __init__(self, lin_convert, cut_list, backend, *, split_linear=False,
+                 group_maps=False):
         """Create a compiler.
 
         This use the specifed implementation for linear parts and a
         list of excluded ops that will be covered by the built-in VM.
 
+        If group_maps is True, the independent applications of array_map
+        are grouped with group_array_maps.
+
         """
         self.transform = CompileGraph(lin_convert, cut_list, backend,
                                       split_linear=split_linear)
+        self.group_maps = group_maps
         self._reset()
 
     def _reset(self):
@@ -364,6 +500,8 @@ class CompileGraphs:
         """Convert all graphs to unlinked instructions and map them."""
         self._reset()
 
+        if self.group_maps:
+            graph = group_array_maps(graph)
         graph = wrap_primitives(graph)
         graph = convert_grad(graph)
 
@@ -371,7 +509,8 @@ class CompileGraphs:
 
         graphs = graph.manager.graphs
         for g in (graphs - set([graph])):
-            self.compile(g)
+            if not _is_kernel_graph(g):
+                self.compile(g)
 
         self.link()
 
@@ -88,6 +88,24 @@ class FinalVM:
         """Shortcut to eval()."""
         return self.eval(args)
 
+    def _run_call(self, fn, args):
+        """Call fn on args and run until it returns, then return its value.
+
+        This is used by instructions that need to call a function several
+        times, like array_fold.
+        """
+        depth = len(self.retp)
+        self.inst_pad_stack(len(args))
+        for a in reversed(args):
+            self._push(a)
+        self._pushp()
+        self._do_jmp(fn)
+        while len(self.retp) > depth:
+            instr = self.code[self.pc]
+            self.pc += 1
+            getattr(self, f'inst_{instr[0]}')(*instr[1:])
+        return self._pop()
+
     def eval(self, args):
         """Evalute the code for this vm with the passed-in arguments."""
         # reset the runtime to initial values
@@ -291,6 +309,25 @@ class FinalVM:
         """
         self._push(self._ref(x))
 
+    def inst_array_fold(self, fn, init, array):
+        """Fold a function over the rows of an array.
+
+        The function is called on the state and on each row in turn, in a
+        loop, and the final state is pushed on the stack. The rows are
+        given by the backend's array_rows.
+
+        Arguments:
+            fn: callable reference
+            init: reference to the initial state
+            array: reference to the array
+
+        """
+        fn = self._ref(fn)
+        state = self._ref(init)
+        for row in self.backend.array_rows(self._ref(array)):
+            state = self._run_call(fn, (state, row))
+        self._push(state)
+
     def inst_env_getitem(self, env, idx, default):
         """Get an item from a grad environment."""
         env = self._ref(env)
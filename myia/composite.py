@@ -54,6 +54,7 @@ from .prim.py_implementations import (
     scalar_div,
     scalar_exp,
     scalar_log,
+    scalar_mul,
     scalar_sin,
     scalar_tan,
     scalar_tanh,
@@ -406,6 +407,37 @@ class SequenceIterator:
         return self.seq[self.idx], SequenceIterator(self.idx + 1, self.seq)
 
 
+@dataclass(frozen=True)
+class RangeIterator:
+    """Iterator for a range that is too long to be unrolled."""
+
+    start: int
+    stop: int
+    step: int
+
+    @core(ignore_values=True)
+    def __myia_iter__(self):
+        """Return the iterator itself."""
+        return self
+
+    @core(ignore_values=True)
+    def __myia_hasnext__(self):
+        """Whether start is still on the same side of stop."""
+        return (self.stop - self.start) * self.step > 0
+
+    @core(ignore_values=True)
+    def __myia_next__(self):
+        """Return the next integer and a new iterator."""
+        return self.start, RangeIterator(self.start + self.step,
+                                         self.stop, self.step)
+
+
+@core
+def range_iter(start, stop, step):
+    """Iterator for range(start, stop, step)."""
+    return RangeIterator(start, stop, step)
+
+
 @core
 def array_iter(xs):
     """Iterator for Array."""
@@ -665,6 +697,44 @@ zeros_like = HyperMap(
 )
 
 
+_leaf_scale = MultitypeGraph('gscale')
+
+
+@_leaf_scale.register(Number, Number)
+@core
+def _scalar_scale(x, factor):
+    return scalar_mul(x, scalar_cast(factor, typeof(x)))
+
+
+@_leaf_scale.register(Array, Number)
+@core
+def _array_scale(xs, factor):
+    factor = to_array(scalar_cast(factor, typeof(xs).element), typeof(xs))
+    return array_map(scalar_mul, xs, distribute(factor, shape(xs)))
+
+
+@_leaf_scale.register(Bool, Number)
+@core
+def _bool_scale(x, factor):
+    return x
+
+
+@_leaf_scale.register(Nil, Number)
+@core
+def _nil_scale(x, factor):
+    return None
+
+
+# Multiply the gradients in a structure by a scalar factor
+gscale = HyperMap(
+    name='gscale',
+    nonleaf=(AbstractTuple, AbstractClassBase,
+             AbstractUnion, AbstractTaggedUnion, AbstractDict),
+    fn_leaf=_leaf_scale,
+    broadcast=False
+)
+
+
 class IsCompare(MetaGraph):
     """Implementation of Is Compare (i.e. 'is' and 'is not')."""
 
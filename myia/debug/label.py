@@ -31,6 +31,10 @@ short_relation_symbols = {
     'grad_fprop': '▶',
     'grad_bprop': '◀',
     'grad_sens': '∇',
+    'jvp': '▷',
+    'jvp_app': '',
+    'jvp_tangent': '∂',
+    'vmap': '⧉',
 }
 
 
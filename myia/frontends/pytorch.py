@@ -1,6 +1,5 @@
 """PyTorch Frontend."""
 
-import copy
 from collections import OrderedDict
 
 import torch
@@ -17,6 +16,7 @@ from ..abstract.data import (
 )
 from ..abstract.infer import ArrayWrapper, to_abstract
 from ..api import _convert_arg_init
+from ..compile.backends.pytorch import PyTorchBackend
 from ..composite import core
 from ..dtype import Bool, Float, Int, Number, UInt
 from ..hypermap import hyper_map
@@ -142,6 +142,31 @@ blacklist = ('_backend', '_buffers', '_backward_hooks', '_forward_hooks',
              )
 
 
+# Dictionaries of a module that are copied by _module_shell
+_module_dicts = ('_parameters', '_buffers', '_backward_hooks',
+                 '_forward_hooks', '_forward_pre_hooks', '_state_dict_hooks',
+                 '_load_state_dict_pre_hooks')
+
+
+def _module_shell(module):
+    """Create a copy of module that shares all of its attributes.
+
+    The dictionaries of parameters, buffers and hooks are copied, so that
+    entries can be replaced or added in the copy without changing module,
+    and the submodules are copied the same way. No tensor is copied.
+    """
+    shell = module.__class__.__new__(module.__class__)
+    shell.__dict__.update(module.__dict__)
+    for k in _module_dicts:
+        if k in module.__dict__:
+            shell.__dict__[k] = OrderedDict(module.__dict__[k])
+    shell.__dict__['_modules'] = OrderedDict(
+        (k, None if m is None else _module_shell(m))
+        for k, m in module._modules.items()
+    )
+    return shell
+
+
 @to_abstract.register
 def _to_abstract(self, v: torch.nn.Module, **kwargs):
     fwd_fn = getattr(type(v), 'forward')
@@ -177,10 +202,9 @@ def _to_abstract(self, v: torch.nn.Module, **kwargs):
     names = list(attrs.keys())
 
     def new_module(*args):
-        nonlocal v
-        # TODO: Figure out something more memory efficient than deepcopy.
-        #       P.S. We tried copy.copy(v) and it is not sufficiently deep.
-        v = copy.deepcopy(v)
+        # The new module is a shell that shares the attributes of v which are
+        # not tracked by myia. The others are replaced by args, by reference.
+        mod = _module_shell(v)
         for k, a in zip(names, args):
             if isinstance(a, ArrayWrapper):
                 # Pre_conversion from backend to PyTorch seems to only be
@@ -195,10 +219,10 @@ def _to_abstract(self, v: torch.nn.Module, **kwargs):
                     a = a.array
 
             if isinstance(getattr(v, k), torch.nn.Parameter):
-                setattr(v, k, torch.nn.Parameter(a))
+                setattr(mod, k, torch.nn.Parameter(a))
             else:
-                setattr(v, k, a)
-        return v
+                setattr(mod, k, a)
+        return mod
 
     return AbstractModule(v.__class__, attrs, {'__call__': fwd_fn,
                           '__sub__': mod_sub}, constructor=new_module)
@@ -246,6 +270,21 @@ def _to_abstract(self, v: PyTorchTensorWrapper, **kwargs):
 ##############################################################################
 
 
+def _tensor_to_backend(arg, backend):
+    """Convert a torch tensor to an array of the backend.
+
+    The tensor is passed through as is when the backend is PyTorch, unless
+    it is on another device. It is never copied otherwise.
+    """
+    if isinstance(backend, PyTorchBackend):
+        if arg.requires_grad:
+            arg = arg.detach()
+        if arg.device != backend.device:
+            arg = arg.to(backend.device)
+        return arg
+    return backend.from_dlpack(torch.utils.dlpack.to_dlpack(arg))
+
+
 @_convert_arg_init.register
 def _pt__convert_arg_init(self, arg, orig_t: AbstractPyTorchTensor, backend):
     et = orig_t.element
@@ -254,7 +293,7 @@ def _pt__convert_arg_init(self, arg, orig_t: AbstractPyTorchTensor, backend):
     assert issubclass(et, Number)
     if isinstance(arg, torch.Tensor):
         arg = PyTorchTensorWrapper(
-            backend.from_dlpack(torch.utils.dlpack.to_dlpack(arg)),
+            _tensor_to_backend(arg, backend),
             arg.dtype, arg.shape, backend,
             # arg.requires_grad, arg.retain_grad
         )
@@ -272,7 +311,7 @@ def _convert_arg(self, arg, orig_t: AbstractPyTorchTensor, backend):
     if isinstance(arg, ArrayWrapper):
         arg = arg.array
     if isinstance(arg, torch.Tensor):
-        arg = backend.from_dlpack(torch.utils.dlpack.to_dlpack(arg))
+        arg = _tensor_to_backend(arg, backend)
     backend.check_array(arg, et)
     return arg
 
@@ -453,6 +453,64 @@ class SensRemapper(GradRemapper):
                 ng.add_parameter()
 
 
+def checkpoint(fn):
+    """Mark a function as a checkpoint for reverse mode.
+
+    The backpropagator of a checkpointed function only keeps the function's
+    arguments: the intermediate values of the forward computation are
+    computed again when the backpropagator is called. This trades compute
+    for memory, e.g. when checkpointing the step of a long recurrent loop.
+
+    Only graphs without free variables can be checkpointed. The flag is
+    ignored on closures, which are transformed along with their parent.
+    """
+    fn._myia_flags = {**getattr(fn, '_myia_flags', {}), 'checkpoint': True}
+    return fn
+
+
+def _grad_checkpoint(mng, root):
+    """Generate the forward graph for a checkpointed graph.
+
+    We generate the regular gradient graph for root, and wrap it:
+
+        def fprop(*args):
+            return fprop_root(*args)[0], bprop
+
+        def bprop(dout):
+            return fprop_root(*args)[1](dout)
+    """
+    fprop_root = _grad(mng, root)
+
+    with About(root.debug, 'grad_fprop'):
+        fprop = Graph()
+    for p in root.parameters:
+        with About(p.debug, 'grad_fprop'):
+            fprop.add_parameter()
+
+    with About(root.debug, 'grad_bprop'):
+        bprop = Graph()
+    with About(root.output.debug, 'grad_sens'):
+        dout = bprop.add_parameter()
+    replay = bprop.apply(fprop_root, *fprop.parameters)
+    bprop.output = bprop.apply(
+        bprop.apply(primops.tuple_getitem, replay, 1),
+        dout
+    )
+
+    out = fprop.apply(fprop_root, *fprop.parameters)
+    fprop.output = fprop.apply(
+        primops.make_tuple,
+        fprop.apply(primops.tuple_getitem, out, 0),
+        bprop
+    )
+
+    root.transforms['grad'] = fprop
+    fprop.transforms['primal'] = root
+    fprop.set_flags('reference')
+    bprop.set_flags('reference')
+    return fprop
+
+
 def _grad(mng, root):
     graphs = root.scope
 
@@ -490,6 +548,8 @@ def J(graph: Graph, resources):
         return graph.transforms['grad']
     manager = resources.manager
     manager.add_graph(graph)
+    if graph.has_flags('checkpoint') and not graph.free_variables_total:
+        return _grad_checkpoint(manager, graph)
     return _grad(manager, graph)
 
 
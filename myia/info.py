@@ -9,6 +9,7 @@ from typing import Any, Set
 # We use per-thread storage for the about stack.
 _about = threading.local()
 _about.stack = [None]
+_about.enabled = True
 
 
 def _stack():
@@ -22,6 +23,34 @@ def current_info():
     return _stack()[-1]
 
 
+def debug_info_enabled():
+    """Return whether new objects should record debug information."""
+    return getattr(_about, 'enabled', True)
+
+
+def capture_info():
+    """Return the `DebugInfo` a new object should inherit from.
+
+    This is the same as `current_info()`, unless debug information is
+    disabled, in which case it is None.
+    """
+    return _stack()[-1] if debug_info_enabled() else None
+
+
+def make_debug_info(obj, inherit):
+    """Create a `NamedDebugInfo` for obj that inherits from `inherit`.
+
+    This makes it possible to create debug information lazily, outside of
+    the context obj was created in, using the result of `capture_info()`.
+    """
+    stack = _stack()
+    stack.append(inherit)
+    try:
+        return NamedDebugInfo(obj)
+    finally:
+        stack.pop()
+
+
 class DebugInfo(types.SimpleNamespace):
     """Debug information for an object.
 
@@ -171,3 +200,27 @@ class About:
         top = _stack()[-1]
         assert isinstance(top, DebugInfo) and top.about is self
         _stack().pop()
+
+
+class NoDebugInfo:
+    """Context manager to disable the collection of debug information.
+
+    Apply and Constant nodes created in this context do not inherit from
+    the current `DebugInherit` or `About`, and do not save traces. This
+    saves memory and time when compiling for production, at the cost of
+    less informative error messages. Graphs and parameters, which are few,
+    keep their debug information because their names are meaningful.
+
+    >>> with NoDebugInfo():
+    ...     with About(DebugInfo(), 'copy'):
+    ...         assert capture_info() is None
+    """
+
+    def __enter__(self):
+        """Disable debug information in this context."""
+        self.previous = debug_info_enabled()
+        _about.enabled = False
+
+    def __exit__(self, type, value, tb):
+        """Restore the previous setting."""
+        _about.enabled = self.previous
@@ -13,7 +13,13 @@ returning a nested function creates a closure.
 from copy import copy
 from typing import Any, Dict, Iterable, List, Union
 
-from ..info import About, NamedDebugInfo
+from ..info import (
+    About,
+    NamedDebugInfo,
+    capture_info,
+    current_info,
+    make_debug_info,
+)
 from ..prim import Primitive, ops as primops
 from ..utils import Named, list_str, repr_
 from ..utils.unify import expandlist, noseq
@@ -416,18 +422,36 @@ class ANFNode(Node):
             attribute, creating a doubly linked graph structure. Note that this
             container is updated automatically; do not manipulate it manually.
         debug: An object with debug information about this node e.g. a
-            human-readable name and the Python source code.
+            human-readable name and the Python source code. It is created
+            the first time it is accessed.
 
     """
 
+    __slots__ = ('inputs', 'value', 'graph', 'abstract', '_debug',
+                 '__weakref__')
+
+    _capture_info = staticmethod(capture_info)
+
     def __init__(self, inputs: Iterable['ANFNode'], value: Any,
                  graph: Graph) -> None:
         """Construct a node."""
         self.inputs = list(inputs)
         self.value = value
         self.graph = graph
-        self.debug = NamedDebugInfo(self)
         self.abstract = None
+        info = self._capture_info()
+        if info is not None and getattr(info, 'save_trace', False):
+            # The trace must be taken where the node is created
+            info = NamedDebugInfo(self)
+        self._debug = info
+
+    @property
+    def debug(self):
+        """Return the node's debug information."""
+        debug = self._debug
+        if not isinstance(debug, NamedDebugInfo):
+            debug = self._debug = make_debug_info(self, debug)
+        return debug
 
     @property
     def shape(self):
@@ -480,6 +504,8 @@ class Apply(ANFNode):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, inputs: List[ANFNode], graph: 'Graph') -> None:
         """Construct an application."""
         super().__init__(inputs, APPLY, graph)
@@ -513,6 +539,12 @@ class Parameter(ANFNode):
 
     """
 
+    __slots__ = ()
+
+    # Parameter names are used to match keyword arguments, so parameters
+    # always keep their debug information
+    _capture_info = staticmethod(current_info)
+
     def __init__(self, graph: Graph) -> None:
         """Construct the parameter."""
         super().__init__([], PARAMETER, graph)
@@ -539,6 +571,9 @@ class Constant(ANFNode):
 
     """
 
+    # force_abstract may be set by the monomorphizer
+    __slots__ = ('force_abstract',)
+
     def __init__(self, value: Any) -> None:
         """Construct a literal."""
         super().__init__([], value, None)
@@ -575,6 +610,8 @@ class Special(ANFNode):
 
     """
 
+    __slots__ = ('special',)
+
     def __init__(self, special: Any, graph: Graph) -> None:
         """Initialize a special node."""
         super().__init__([], SPECIAL, graph)
@@ -595,6 +632,8 @@ class Special(ANFNode):
 class VarNode(Special):
     """Graph node that represents a variable."""
 
+    __slots__ = ()
+
     @property
     def __var__(self):
         return self.special
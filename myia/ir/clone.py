@@ -4,9 +4,10 @@ GraphRemapper/BasicRemapper are the core remapping classes that can be extended
 by graph transformers.
 """
 
+from contextlib import nullcontext
 from dataclasses import dataclass
 
-from ..info import About
+from ..info import About, debug_info_enabled
 from ..utils import Partializable
 from .anf import ANFNode, Apply, Constant, Graph, Parameter
 from .manager import manage
@@ -201,6 +202,15 @@ class GraphRemapper(Partializable):
         self.finalize()
 
 
+def _about(node, relation):
+    # Avoids creating the debug information of the original node when it
+    # would not be used
+    if debug_info_enabled():
+        return About(node.debug, relation)
+    else:
+        return nullcontext()
+
+
 class BasicRemapper(GraphRemapper):
     """Basic Remapper.
 
@@ -221,13 +231,13 @@ class BasicRemapper(GraphRemapper):
 
     def gen_apply(self, graph, new_graph, node):
         """Makes an empty Apply node (to link later)."""
-        with About(node.debug, self.relation):
+        with _about(node, self.relation):
             new = Apply([], new_graph)
             self.remap_node(node, graph, node, new_graph, new)
 
     def gen_constant(self, graph, new_graph, constant):
         """Makes a copy of the constant with the same value."""
-        with About(constant.debug, self.relation):
+        with _about(constant, self.relation):
             new = Constant(constant.value)
             self.remap_node(constant, graph, constant, new_graph, new)
 
@@ -306,7 +316,7 @@ class CloneRemapper(BasicRemapper):
         g = constant.value
         if g not in self.inlines and g in self.graph_repl:
             target_graph = self.get_graph(g)
-            with About(constant.debug, self.relation):
+            with _about(constant, self.relation):
                 new = Constant(target_graph)
                 self.remap_node(constant, graph, constant, new_graph, new)
 
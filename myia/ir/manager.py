@@ -4,7 +4,7 @@
 from collections import Counter, defaultdict
 
 from ..graph_utils import EXCLUDE, FOLLOW, dfs
-from ..utils import Events, OrderedSet, Partializable
+from ..utils import MISSING, Events, OrderedSet, Partializable
 from .utils import succ_deeper
 
 
@@ -202,12 +202,12 @@ class GDepProxStatistic(CounterStatistic):
         if inp.is_constant_graph():
             ig = inp.value
             if self.mod(g1, ParentProxy(ig), direction):
-                self.manager.events.invalidate_nesting()
+                self.manager.events.invalidate_nesting(g1)
         else:
             g2 = inp.graph
             if g1 and g2 and g1 is not g2:
                 if self.mod(g1, g2, direction):
-                    self.manager.events.invalidate_nesting()
+                    self.manager.events.invalidate_nesting(g1)
 
 
 class GDepProxInvStatistic(CounterStatistic):
@@ -245,62 +245,22 @@ class GraphUsersStatistic(CounterStatistic):
 class NestingStatistic(PerGraphStatistic):
     """Represents a statistic about nesting.
 
-    These statistics become invalid when the `invalidate_nesting` event
-    is fired.
+    The `invalidate_nesting` event is fired with a graph whenever the
+    proximal dependencies of that graph change. Nesting statistics are
+    then brought up to date incrementally the next time one of them is
+    requested (see `GraphManager._update_nesting`).
     """
 
-    def __init__(self, manager):
-        """Initialize a NestingStatistic."""
-        super().__init__(manager)
-        evts = self.manager.events
-        evts.invalidate_nesting.register(self._on_invalidate_nesting)
-        self.valid = False
-
-    def _on_invalidate_nesting(self, event):
-        self.reset()
-
     def _on_add_graph(self, event, graph):
-        self.reset()
+        pass
 
     def _on_drop_graph(self, event, graph):
-        self.reset()
-
-
-class NestingStatisticWholesale(NestingStatistic):
-    """Statistic about nesting, computed for all graphs at once."""
-
-    def __init__(self, manager):
-        """Initialize a NestingStatistic."""
-        super().__init__(manager)
-        self.valid = False
-
-    def reset(self):
-        """Reset this graph's information.
-
-        This makes the statistic invalid, so it must be recomputed.
-        """
-        super().reset()
-        self.valid = False
-
-    def recompute(self):
-        """Recompute the information from scratch."""
-        self._recompute()
-        self.valid = True
-
-    def _recompute(self):
-        raise NotImplementedError()
-
-
-class NestingStatisticGraphWise(NestingStatistic):
-    """Statistic about nesting, computed on demand."""
+        pass
 
     def __getitem__(self, g):
-        if g in self:
-            return super().__getitem__(g)
-        else:
-            res = self._compute(g)
-            self[g] = res
-            return res
+        if self.manager._nesting_dirty:
+            self.manager._update_nesting()
+        return super().__getitem__(g)
 
 
 class UsesStatistic(PerGraphStatistic):
@@ -334,38 +294,93 @@ class UsesStatistic(PerGraphStatistic):
             return res
 
 
-class GDepTotalStatistic(NestingStatisticGraphWise):
-    """Implements `GraphManager.graph_dependencies_total`."""
+class GDepTotalStatistic(NestingStatistic):
+    """Implements `GraphManager.graph_dependencies_total`.
+
+    The total dependencies are the least fixpoint of::
+
+        total[g] = (direct[g] | union(total[h] for each h used by g)) - {g}
+
+    When the proximal dependencies of some graphs change, only the graphs
+    that can reach them through graph constants are recomputed.
+    """
+
+    def __init__(self, manager):
+        """Initialize a GDepTotalStatistic."""
+        super().__init__(manager)
+        evts = self.manager.events
+        evts.invalidate_nesting.register(self._on_invalidate_nesting)
+
+    def _on_invalidate_nesting(self, event, graph):
+        self.manager._nesting_dirty.add(graph)
+
+    def _on_add_graph(self, event, graph):
+        self.manager._nesting_dirty.add(graph)
+
+    def _on_drop_graph(self, event, graph):
+        self.pop(graph, None)
 
     def _compute(self, g):
-        if g not in self:
-            self[g] = self._compute_nocache(g, set())
-        return self[g]
-
-    def _compute_nocache(self, g, path):
-        if g in path:
-            return OrderedSet()
-        all_deps = self.manager.graph_dependencies_prox
-        deps = all_deps[g]
-        parents = OrderedSet()
-        for dep in deps:
+        deps = OrderedSet()
+        for dep in self.manager.graph_dependencies_prox[g]:
             if isinstance(dep, ParentProxy):
-                parents |= self._compute_nocache(dep.graph, path | {g})
+                deps.update(self.get(dep.graph, ()))
             else:
-                parents.add(dep)
-        parents.discard(g)
-        return parents
+                deps.add(dep)
+        deps.discard(g)
+        return deps
 
+    def _update(self, graphs):
+        """Recompute the dependencies of graphs and of their users.
 
-class ParentStatistic(NestingStatisticGraphWise):
+        Return the set of graphs for which the result changed.
+        """
+        mng = self.manager
+        users = mng.graph_users
+        region = OrderedSet()
+        todo = [g for g in graphs if g in mng.graphs]
+        while todo:
+            g = todo.pop()
+            if g not in region:
+                region.add(g)
+                todo.extend(users.get(g, ()))
+
+        old = {g: self.get(g) for g in region}
+        for g in region:
+            self[g] = OrderedSet()
+
+        # Starting from empty sets, the results can only grow until they
+        # reach the least fixpoint.
+        work = OrderedSet(region)
+        while work:
+            g = work.pop()
+            deps = self._compute(g)
+            if len(deps) != len(self.get(g)):
+                self[g] = deps
+                work.update(u for u in users[g] if u in region)
+
+        return OrderedSet(g for g in region if self.get(g) != old[g])
+
+
+class ParentStatistic(NestingStatistic):
     """Implements `GraphManager.parents`."""
 
+    def __init__(self, manager):
+        """Initialize a ParentStatistic."""
+        super().__init__(manager)
+        self.dropped = {}
+
+    def _on_drop_graph(self, event, graph):
+        if graph in self:
+            self.dropped[graph] = self.pop(graph)
+            self.manager._nesting_dirty.add(graph)
+
     def _compute(self, g):
         if g in self:
             return self.get(g)
         all_deps = self.manager.graph_dependencies_total
-        todo = OrderedSet(all_deps[g])
-        deps = OrderedSet(all_deps[g])
+        todo = OrderedSet(all_deps.get(g, ()))
+        deps = OrderedSet(todo)
         while todo:
             # We eliminate all grandparents
             g2 = todo.pop()
@@ -383,75 +398,167 @@ class ParentStatistic(NestingStatisticGraphWise):
             raise AssertionError(f'Too many parents for {g}')
         return self.get(g)
 
+    def _update(self, graphs):
+        """Recompute the parents of graphs and of their descendants.
 
-class ChildrenStatistic(NestingStatisticGraphWise):
+        Return the set of graphs that were recomputed, and a dictionary that
+        maps each graph whose parent changed (or that was dropped) to its
+        previous parent.
+        """
+        children = self.manager.children
+        affected = OrderedSet()
+        todo = list(graphs)
+        while todo:
+            g = todo.pop()
+            if g not in affected:
+                affected.add(g)
+                todo.extend(children.get(g, ()))
+
+        old = {g: self.pop(g, MISSING) for g in affected}
+        for g in affected:
+            self._compute(g)
+
+        moved = {g: p for g, p in old.items() if self.get(g) is not p}
+        moved.update(self.dropped)
+        affected.update(self.dropped)
+        self.dropped = {}
+        return affected, moved
+
+
+class ChildrenStatistic(NestingStatistic):
     """Implements `GraphManager.children`."""
 
-    def _compute(self, g):
+    constructor = set
+    include_graph_none = True
+
+    def _on_add_graph(self, event, graph):
+        self[graph] = set()
+
+    def _update(self, moved):
         parents = self.manager.parents
-        reach = self.manager.graphs_reachable
-        return {g2 for g2 in reach[g] if parents[g2] is g}
+        for g, old in moved.items():
+            if old is not MISSING and old in self:
+                self.get(old).discard(g)
+            if g in parents:
+                self.setdefault(parents.get(g), set()).add(g)
+            else:
+                self.pop(g, None)
 
 
-class ScopeStatistic(NestingStatisticGraphWise):
-    """Implements `GraphManager.scopes`."""
+class ScopeStatistic(NestingStatistic):
+    """Implements `GraphManager.scopes`.
+
+    Scopes are computed on demand. When graphs are moved, the scopes of
+    their previous and new ancestors are discarded.
+    """
+
+    def __getitem__(self, g):
+        if self.manager._nesting_dirty:
+            self.manager._update_nesting()
+        if g in self:
+            return self.get(g)
+        else:
+            return self._compute(g)
 
     def _compute(self, g):
         children = self.manager.children
         scope = {g}
         for child in children[g]:
-            scope.update(self._compute(child))
+            scope.update(self[child])
+        self[g] = scope
         return scope
 
+    def _update(self, moved):
+        parents = self.manager.parents
+        for g, old in moved.items():
+            self.pop(g, None)
+            p = old
+            while p is not MISSING and p is not None:
+                self.pop(p, None)
+                p = moved[p] if p in moved else parents.get(p)
+            p = parents.get(g)
+            while p is not None:
+                self.pop(p, None)
+                p = parents.get(p)
 
-class FVTotalStatistic(NestingStatisticWholesale, CounterStatistic):
-    """Implements `GraphManager.free_variables_total`."""
 
-    def _recompute(self):
-        mng = self.manager
+class FVTotalStatistic(NestingStatistic, CounterStatistic):
+    """Implements `GraphManager.free_variables_total`.
 
-        for g in mng.graphs:
-            self[g] = {}
-
-        for g in mng.graphs:
-            for node, count in mng.free_variables_direct[g].items():
-                curr = g
-                while curr:
-                    self.mod(curr, node, count)
-                    curr = mng.parents[curr]
-                    if node in mng.nodes[curr]:
-                        break
-
-            for g2, count in mng.graphs_used[g].items():
-                p = mng.parents[g2]
-                if p is None:
-                    continue
-                curr = g
-                while curr is not p:
-                    self.mod(curr, g2, count)
-                    curr = mng.parents[curr]
+    Each graph contributes its direct free variables to itself and to its
+    ancestors, up to the graph that owns each variable. The contributions
+    of each graph are recorded, so that they can be retracted and applied
+    again when the graph's ancestors change.
+    """
 
-    def _on_mod_edge(self, event, node, key, inp, direction):
-        if not self.valid:
-            return
+    def __init__(self, manager):
+        """Initialize a FVTotalStatistic."""
+        super().__init__(manager)
+        self.contributions = {}
+        self.dirty = OrderedSet()
+
+    def _apply(self, g, fv, qty, stop_graph):
+        parents = self.manager.parents
+        contrib = self.contributions.setdefault(g, Counter())
+        curr = g
+        while curr and curr is not stop_graph:
+            self.mod(curr, fv, qty)
+            contrib[curr, fv] += qty
+            if not contrib[curr, fv]:
+                del contrib[curr, fv]
+            curr = parents[curr]
+
+    def _retract(self, g):
+        for (curr, fv), count in self.contributions.pop(g, {}).items():
+            if curr in self:
+                self.mod(curr, fv, -count)
+
+    def _contribute(self, g):
+        mng = self.manager
+        for node, count in mng.free_variables_direct[g].items():
+            self._apply(g, node, count, node.graph)
+        for g2, count in mng.graphs_used[g].items():
+            p = mng.parents[g2]
+            if p is not None:
+                self._apply(g, g2, count, p)
+
+    def _update(self, affected, moved):
+        mng = self.manager
+        todo = self.dirty
+        self.dirty = OrderedSet()
+        todo.update(affected)
+        for g in moved:
+            todo.update(mng.graph_users.get(g, ()))
+
+        for g in todo:
+            self._retract(g)
+        for g in moved:
+            if g not in mng.graphs:
+                self.pop(g, None)
+            elif g not in self:
+                self[g] = {}
+        for g in todo:
+            if g in mng.graphs:
+                self._contribute(g)
 
+    def _on_mod_edge(self, event, node, key, inp, direction):
         g1 = node.graph
 
-        def _update(stop_graph, fv):
-            curr = g1
-            while curr and curr is not stop_graph:
-                self.mod(curr, fv, direction)
-                curr = self.manager.parents[curr]
+        if self.manager._nesting_dirty:
+            # The parents may be out of date, so the contributions of g1
+            # will be recomputed with the rest of the nesting statistics.
+            self.dirty.add(g1)
+            return
 
         if inp.is_constant_graph():
             ig = inp.value
             p = self.manager.parents[ig]
             if p:
-                _update(p, ig)
+                self._apply(g1, ig, direction, p)
 
         g2 = inp.graph
         if g1 and g2 and g1 is not g2:
-            _update(g2, inp)
+            self._apply(g1, inp, direction, g2)
 
 
 class GraphsReachableStatistic(UsesStatistic):
@@ -485,9 +592,12 @@ class GraphManager(Partializable):
 
     Attributes are updated incrementally when graph mutations are committed.
 
-    Properties are updated incrementally when possible, but may be invalidated
-    when graph dependencies change. In that case they will be recomputed lazily
-    the next time they are requested.
+    Nesting properties (dependencies, parents, children, scopes and total
+    free variables) are updated incrementally the next time they are
+    requested: only the graphs whose dependencies changed, and the graphs
+    that are affected by them, are recomputed. Other properties may be
+    invalidated when graph dependencies change. In that case they will be
+    recomputed lazily the next time they are requested.
 
     Attributes:
         all_nodes:
@@ -584,6 +694,7 @@ class GraphManager(Partializable):
         )
         roots = OrderedSet(self.roots) if self.roots else OrderedSet()
         self.roots = OrderedSet()
+        self._nesting_dirty = OrderedSet()
         self.graphs = OrderedSet()
         self.all_nodes = OrderedSet()
         self.uses = defaultdict(OrderedSet)
@@ -752,10 +863,21 @@ class GraphManager(Partializable):
 
         return graphs_to_check
 
-    def _ensure_statistic(self, stat):
-        if not stat.valid:
-            stat.recompute()
-        return stat
+    def _update_nesting(self):
+        """Update the nesting statistics.
+
+        Only the graphs whose dependencies changed since the last update, and
+        the graphs that depend on them, are recomputed.
+        """
+        dirty = self._nesting_dirty
+        if not dirty:
+            return
+        self._nesting_dirty = OrderedSet()
+        changed = self.graph_dependencies_total._update(dirty)
+        affected, moved = self.parents._update(changed)
+        self.children._update(moved)
+        self.scopes._update(moved)
+        self._free_variables_total._update(affected, moved)
 
     @property
     def free_variables_total(self):
@@ -765,7 +887,8 @@ class GraphManager(Partializable):
         variables needed by children graphs. Furthermore, graph Constants may
         figure as free variables.
         """
-        return self._ensure_statistic(self._free_variables_total)
+        self._update_nesting()
+        return self._free_variables_total
 
     def set_parameters(self, graph, parameters):
         """Replace a graph's parameters."""
@@ -1,7 +1,6 @@
 """Graph generation from number of arguments or type signatures."""
 
 
-from .. import abstract, parser
 from ..utils import MyiaTypeError
 
 
@@ -66,10 +65,13 @@ class MultitypeGraph(MetaGraph):
 
     def normalize_args_sync(self, args):
         """Return broadened arguments."""
+        from .. import abstract
         return tuple(abstract.broaden(a) for a in args)
 
     def register(self, *types):
         """Register a function for the given type signature."""
+        from .. import abstract
+
         def deco(fn):
             atypes = tuple(abstract.type_to_abstract(t) for t in types)
             self.entries.append((atypes, fn))
@@ -77,6 +79,7 @@ class MultitypeGraph(MetaGraph):
         return deco
 
     def _getfn(self, types):
+        from .. import abstract
         for sig, fn in self.entries:
             if abstract.typecheck(sig, types):
                 return fn
@@ -85,10 +88,12 @@ class MultitypeGraph(MetaGraph):
 
     def generate_graph(self, args):
         """Generate a Graph for the given abstract arguments."""
+        from .. import parser
         return parser.parse(self._getfn(tuple(args)))
 
     def __call__(self, *args):
         """Call like a normal function."""
+        from .. import abstract
         types = tuple(abstract.to_abstract(arg) for arg in args)
         fn = self._getfn(types)
         return fn(*args)
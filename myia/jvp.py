@@ -0,0 +1,283 @@
+"""Generate the graphs for forward mode differentiation.
+
+The jvp transform on a graph produces a graph that takes each argument
+followed by its tangent, and returns the pair of the output and of its
+tangent. Functions are represented by their jvp-transformed version, and their
+tangent is an empty Env. For each node `y = f(x)` of the graph, we generate
+three nodes, using one GraphRemapper and two SlaveRemappers:
+
+    temp = jvp_f(jvp_x, tangent_x)  # JVPAppRemapper     (slave)
+    jvp_y = temp[0]                 # JVPRemapper        (master)
+    tangent_y = temp[1]             # TangentRemapper    (slave)
+
+And the output of the graph is:
+
+    return jvp_y, tangent_y
+
+Constant functions and graphs outside of the transformed scope are wrapped
+with the `jvp` primitive, which is expanded later on by the optimizer. The
+tangent of a constant is zero.
+
+Since there is no backward pass, nothing is kept for later: the memory cost
+is that of the original computation, and the jvp of a function costs about
+as much as a second evaluation of it. Composing jvp with grad (forward over
+reverse) gives Hessian-vector products for about the cost of two gradients.
+"""
+
+from .abstract import (
+    TYPE,
+    AbstractError,
+    AbstractFunction,
+    AbstractScalar,
+    AbstractType,
+    abstract_check,
+)
+from .composite import zeros_like
+from .dtype import Bool, Nil, Number
+from .grad import GradRemapper, SlaveRemapper
+from .info import About
+from .ir import Constant, Graph, MetaGraph, RemapperSet, sexp_to_node
+from .prim import Primitive, ops as primops
+from .prim.jvp_implementations import jvp_graphs
+from .utils import newenv, overload
+
+
+@abstract_check.variant
+def _has_tangent(self, x: AbstractScalar):
+    return issubclass(x.values[TYPE], (Number, Bool, Nil))
+
+
+@overload  # noqa: F811
+def _has_tangent(self, x: (AbstractType, AbstractError)):
+    return False
+
+
+@overload  # noqa: F811
+def _has_tangent(self, x: AbstractFunction):
+    return True
+
+
+class JVPAppRemapper(SlaveRemapper):
+    """Generate applications in the transformed graph.
+
+    x = a(b, c) => A:x = (B:a)(B:b, T:b, B:c, T:c)
+    """
+
+    def link_apply(self, link):
+        """Link generated nodes to their inputs.
+
+        x = a(b, c) => A:x = (B:a)(B:b, T:b, B:c, T:c)
+        """
+        jvp = self.remappers['jvp']
+        tangent = self.remappers['jvp_tangent']
+        fn, *args = link.node.inputs
+        new_inputs = [jvp.get(link.graph, fn)]
+        for arg in args:
+            new_inputs.append(jvp.get(link.graph, arg))
+            new_inputs.append(tangent.get(link.graph, arg))
+        link.new_node.inputs = new_inputs
+
+
+class JVPRemapper(GradRemapper):
+    """Generate nodes in the transformed graph.
+
+    This is transform B.
+
+    x = a(b, c) => B:x = (A:x)[0]
+    """
+
+    def gen_parameter(self, g, ng, p):
+        """Generate a parameter and its tangent, next to each other."""
+        with About(p.debug, self.relation):
+            new = ng.add_parameter()
+        self.remap_node(p, g, p, ng, new)
+        with About(p.debug, 'jvp_tangent'):
+            tangent = ng.add_parameter()
+        self.remappers['jvp_tangent'].remap_node(p, g, p, ng, tangent)
+
+    def gen_constant(self, g, ng, ct):
+        """Functions are wrapped with jvp, other constants are kept."""
+        if isinstance(ct.value, (Graph, MetaGraph, Primitive)):
+            self.repl[(g, ct)] = sexp_to_node((primops.jvp, ct), ng)
+        else:
+            self.repl[(g, ct)] = ct
+
+    def gen_constant_graph(self, g, ng, ct):
+        """Constant graphs map to their remapped versions.
+
+        Graphs that are not remapped are wrapped with jvp.
+        """
+        if ct.value in self.graphs:
+            new_ct = Constant(self.get_graph(ct.value))
+            self.repl[ct] = new_ct
+            self.repl[ct.value] = new_ct
+        else:
+            self.gen_constant(g, ng, ct)
+
+    def gen_fv(self, g, ng, fv):
+        """Free variables outside the remapped scope are kept as they are.
+
+        Remapped free variables are remapped elsewhere.
+        """
+        if fv.graph not in self.graphs:
+            self.repl[(g, fv)] = fv
+
+    def gen_fv_graph(self, g, ng, fvg):
+        """Free variables that are graphs are handled like constants."""
+        if fvg in self.graphs:
+            self.gen_constant_graph(g, ng, Constant(fvg))
+        else:
+            self.repl[(g, fvg)] = sexp_to_node((primops.jvp, fvg), ng)
+
+    def link_apply(self, link):
+        """Link generated nodes to their inputs.
+
+        x = a(b, c) => B:x = (A:x)[0]
+        """
+        node = link.node
+        if node.is_apply(primops.embed):
+            # A key is identified by the node it embeds, so embed can't go
+            # through a jvp function shared by all its uses
+            _, x = node.inputs
+            new_inputs = [Constant(primops.embed), self.get(link.graph, x)]
+        else:
+            app = self.remappers['jvp_app'].get(link.graph, node)
+            new_inputs = sexp_to_node(
+                (primops.tuple_getitem, app, 0),
+                link.new_graph
+            ).inputs
+        link.new_node.inputs = new_inputs
+
+    def finalize_graph(self, g, ng):
+        """We generate the pair (B:output, T:output)."""
+        g.transforms['jvp'] = ng
+        g.set_flags('reference')
+        ng.set_flags('reference')
+        out = self.get(g, g.output)
+        tangent = self.remappers['jvp_tangent'].get(g, g.output)
+        ng.output = ng.apply(primops.make_tuple, out, tangent)
+
+
+class TangentRemapper(SlaveRemapper):
+    """Generate tangents in the transformed graph.
+
+    This is transform T.
+
+    x = a(b, c) => T:x = (A:x)[1]
+    """
+
+    def _zero(self, ng, node):
+        """Generate a zero tangent for node.
+
+        Values that can't be differentiated, like types or keys, are their
+        own tangent.
+        """
+        if node.abstract is None or _has_tangent(node.abstract):
+            return sexp_to_node((zeros_like, node), ng)
+        else:
+            return node
+
+    def gen_constant(self, g, ng, ct):
+        """The tangent of a constant is zero."""
+        if isinstance(ct.value, (Graph, MetaGraph, Primitive)):
+            self.repl[(g, ct)] = Constant(newenv)
+        else:
+            self.repl[(g, ct)] = self._zero(ng, ct)
+
+    def gen_constant_graph(self, g, ng, ct):
+        """The tangent of a function is an empty Env."""
+        self.repl[(g, ct)] = Constant(newenv)
+
+    def gen_fv(self, g, ng, fv):
+        """Free variables outside the remapped scope have a zero tangent.
+
+        Remapped free variables are remapped elsewhere.
+        """
+        if fv.graph not in self.graphs:
+            self.repl[(g, fv)] = self._zero(ng, fv)
+
+    def gen_fv_graph(self, g, ng, fvg):
+        """The tangent of a function is an empty Env."""
+        self.repl[(g, fvg)] = Constant(newenv)
+
+    def link_apply(self, link):
+        """Link generated nodes to their inputs.
+
+        x = a(b, c) => T:x = (A:x)[1]
+        """
+        node = link.node
+        if node.is_apply(primops.embed):
+            # The tangent of a key is the key itself
+            new_inputs = [Constant(primops.identity),
+                          self.remappers['jvp'].get(link.graph, node)]
+        else:
+            app = self.remappers['jvp_app'].get(link.graph, node)
+            new_inputs = sexp_to_node(
+                (primops.tuple_getitem, app, 1),
+                link.new_graph
+            ).inputs
+        link.new_node.inputs = new_inputs
+
+
+def _check_expanded(mng, graphs):
+    """Check that the J and jvp applications in graphs are expanded.
+
+    We must differentiate through the graphs that J and jvp produce, not
+    through J and jvp themselves, so we wait for the optimizer to expand
+    them first.
+    """
+    for g in graphs:
+        for node in mng.nodes[g]:
+            if (node.is_apply(primops.J)
+                    or node.is_apply(primops.Jinv)
+                    or node.is_apply(primops.jvp)):
+                _, x = node.inputs
+                if (isinstance(x.abstract, AbstractFunction)
+                        or x.is_constant((Graph, MetaGraph, Primitive))):
+                    raise NotImplementedError(
+                        f'{node} must be expanded before the jvp transform'
+                    )
+
+
+def _jvp(mng, root):
+    graphs = root.scope
+    _check_expanded(mng, graphs)
+
+    remappers = RemapperSet(
+        graphs,
+        jvp=JVPRemapper.partial(),
+        jvp_app=JVPAppRemapper.partial(
+            master='jvp'
+        ),
+        jvp_tangent=TangentRemapper.partial(
+            master='jvp'
+        ),
+    )
+    remappers.run()
+    return remappers['jvp'].get_graph(root)
+
+
+@overload
+def jvp(prim: Primitive, resources):
+    """Implement jvp on a Primitive."""
+    g = jvp_graphs.get(prim, None)
+    if g is None:
+        raise NotImplementedError(f'jvp({prim}) not implemented')
+    return resources.convert(g)
+
+
+@overload  # noqa: F811
+def jvp(graph: Graph, resources):
+    """Implement jvp on a Graph."""
+    if graph.transforms.get('jvp', None):
+        return graph.transforms['jvp']
+    manager = resources.manager
+    manager.add_graph(graph)
+    return _jvp(manager, graph)
+
+
+@overload  # noqa: F811
+def jvp(other: object, resources):
+    """We do not implement jvp on non-functions here."""
+    name = type(other).__qualname__
+    raise NotImplementedError(f'jvp(::{name}) not implemented')
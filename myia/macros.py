@@ -19,8 +19,8 @@ from .abstract import (
     type_token,
     union_simplify,
 )
-from .composite import gadd
-from .dtype import Array, Bool, Number
+from .composite import gadd, gscale, range_iter
+from .dtype import Array, Bool, Int, Number, UInt
 from .info import About, DebugInfo
 from .ir import (
     CloneRemapper,
@@ -45,6 +45,7 @@ from .utils import (
     Namespace,
     check_nargs,
     core,
+    type_error_nargs,
 )
 
 
@@ -245,6 +246,48 @@ async def dict_values(info):
     return info.graph.apply(P.make_tuple, *getters)
 
 
+#: Maximal number of elements of a range for loops over it to be unrolled
+MAX_RANGE_UNROLL = 64
+
+
+@macro
+async def range_(info):
+    """Implement range().
+
+    When the bounds are constant and the range has at most MAX_RANGE_UNROLL
+    elements, the range is replaced by the tuple of its elements, so that
+    loops over it are unrolled, like loops over tuples are: each iteration is
+    specialized separately and the optimizer inlines the resulting chain of
+    calls.
+
+    Otherwise, the range is an iterator over its elements, and loops over it
+    stay loops.
+    """
+    nargs = len(info.argrefs)
+    if not 1 <= nargs <= 3:
+        raise MyiaTypeError(f'range expected 1 to 3 arguments, got {nargs}')
+    bounds = []
+    for ref in info.argrefs:
+        a = await ref.get()
+        v = abstract.build_value(a, default=ANYTHING)
+        if v is ANYTHING:
+            t = (await abstract.force_pending(a.values[TYPE])
+                 if isinstance(a, abstract.AbstractScalar) else None)
+            if not (isinstance(t, type) and issubclass(t, (Int, UInt))):
+                raise MyiaTypeError(f'range expects integers, not {a}')
+        elif not isinstance(v, int) or isinstance(v, bool):
+            raise MyiaTypeError(f'range expects integers, not {v}')
+        bounds.append(v)
+    if ANYTHING not in bounds and len(range(*bounds)) <= MAX_RANGE_UNROLL:
+        return Constant(tuple(range(*bounds)))
+    nodes = [ref.node for ref in info.argrefs]
+    if nargs == 1:
+        nodes = [Constant(0), *nodes]
+    if nargs < 3:
+        nodes.append(Constant(1))
+    return info.graph.apply(range_iter, *nodes)
+
+
 class _CastRemapper(CloneRemapper):
 
     def __init__(self,
@@ -408,12 +451,19 @@ async def grad(info):
         grad(f, 'x', 'y')(x, y)    == (df/dx, df/dy)
         grad(f, return_value=True) == (f(x, y), df/dx)
         grad(f, dout=z)            == z * df/dx, if f(x, y) is a scalar
+        grad(f, loss_scale=s)      == (s * df/dx) / s
+
+    With loss_scale, backpropagation starts from s instead of 1 (or from
+    s * dout), and the gradients are divided by s at the end. The
+    intermediate gradients are then larger, which keeps them from
+    underflowing when they are computed in a low precision.
     """
     fn, *argtypes = [await ref.get() for ref in info.argrefs]
     wrt = []
 
     flags = {
         'return_value': False,
+        'loss_scale': 1,
     }
 
     for arg in argtypes:
@@ -431,6 +481,10 @@ async def grad(info):
             else:
                 raise MyiaTypeError(f'Invalid argument to grad, {arg}')
 
+    if (not isinstance(flags['loss_scale'], (int, float))
+            or flags['loss_scale'] <= 0):
+        raise MyiaTypeError('loss_scale must be a positive constant')
+
     fn = fn.get_unique()
     assert isinstance(fn, abstract.GraphFunction)
     return Constant(GradOperation(fn.graph, wrt, **flags))
@@ -469,7 +523,8 @@ class GradOperation(MetaGraph):
                  return_value=False,
                  always_return_tuple=False,
                  dout_parameter=False,
-                 sum_aliases=True):
+                 sum_aliases=True,
+                 loss_scale=1):
         """Initialize GradOperation."""
         super().__init__('grad')
         self.fn = fn
@@ -478,6 +533,7 @@ class GradOperation(MetaGraph):
         self.always_return_tuple = always_return_tuple
         self.dout_parameter = dout_parameter
         self.sum_aliases = sum_aliases
+        self.loss_scale = loss_scale
 
     def make_signature(self, args):
         """Make the signature.
@@ -589,8 +645,10 @@ class GradOperation(MetaGraph):
             bprop_arg.debug.name = 'dout'
             if dout == 'kw':
                 bprop_arg = df.apply(P.extract_kwarg, 'dout', bprop_arg)
+            if self.loss_scale != 1:
+                bprop_arg = df.apply(gscale, bprop_arg, self.loss_scale)
         else:
-            bprop_arg = df.apply(_cast_helper, 1, out)
+            bprop_arg = df.apply(_cast_helper, self.loss_scale, out)
 
         if isinstance(wrt, int):
             direct_return = not self.always_return_tuple
@@ -615,6 +673,10 @@ class GradOperation(MetaGraph):
                 node = sexp_to_node(setter, df, sub={ROOT: adjusted[i]})
                 adjusted[i] = node
 
+        if self.loss_scale != 1:
+            adjusted = {i: df.apply(gscale, adjusted[i], 1 / self.loss_scale)
+                        for i in wrt}
+
         elems = [out] if self.return_value else []
         elems += [adjusted[idx] for idx in wrt]
 
@@ -630,3 +692,186 @@ class GradOperation(MetaGraph):
 def value_and_grad(*args, **kwargs):
     """Return the value of the function along with the gradient."""
     return grad(*args, **kwargs, return_value=True)
+
+
+@macro
+async def jvp(info):
+    """Create a function for the forward-mode derivative of a function.
+
+    `jvp` must be called on a function, and returns a function that takes
+    the arguments of that function followed by one tangent for each of them.
+    It returns the output of the function along with the tangent of the
+    output, i.e. the product of the Jacobian with the tangents.
+
+    Usage:
+        jvp(f)(x, y, dx, dy) == (f(x, y), df/dx * dx + df/dy * dy)
+    """
+    fn, = check_nargs('jvp', 1, [await ref.get() for ref in info.argrefs])
+    fn = fn.get_unique()
+    if isinstance(fn, abstract.MetaGraphFunction):
+        return Constant(JVPOperation(fn.metagraph))
+    assert isinstance(fn, abstract.GraphFunction)
+    return Constant(JVPOperation(fn.graph))
+
+
+@macro
+async def hvp(info):
+    """Create a function for Hessian-vector products of a function.
+
+    The product is computed in forward mode over the gradient, which costs
+    about two gradient evaluations.
+
+    Usage:
+        hvp(f)(x, v)          == d2f/dx2 * v, if f(x) is a scalar
+        hvp(f)(x, y, dx, dy)  == jvp(grad(f, 'x', 'y'))(x, y, dx, dy)[1]
+    """
+    fn, = check_nargs('hvp', 1, [await ref.get() for ref in info.argrefs])
+    fn = fn.get_unique()
+    assert isinstance(fn, abstract.GraphFunction)
+    wrt = [0] if len(fn.graph.parameters) == 1 else ['*']
+    return Constant(JVPOperation(GradOperation(fn.graph, wrt),
+                                 tangent_only=True))
+
+
+class JVPOperation(MetaGraph):
+    """Implements the jvp(f) operation.
+
+    This MetaGraph is returned by a call to `jvp` or `hvp`.
+    """
+
+    def __init__(self, fn, *, tangent_only=False):
+        """Initialize JVPOperation."""
+        super().__init__('jvp')
+        self.fn = fn
+        self.tangent_only = tangent_only
+
+    def make_signature(self, args):
+        """Make the signature from the signature of the primal arguments."""
+        if len(args) % 2 != 0:
+            raise MyiaTypeError(
+                'A jvp-transformed function takes a tangent for each argument'
+            )
+        return self.fn.make_signature(args[:len(args) // 2])
+
+    def generate_graph(self, sig):
+        """Make the graph for the jvp.
+
+        The arguments are interleaved with their tangents before they are
+        given to the transformed function. If self.tangent_only is True,
+        only the tangent of the output is returned.
+        """
+        g = self.fn.generate_graph(sig)
+
+        with About(g.debug, 'jvp'):
+            df = Graph()
+            df.set_flags('core', 'reference')
+
+        params = []
+        for orig_p in g.parameters:
+            with About(orig_p.debug, 'jvp'):
+                params.append(df.add_parameter())
+        tangents = []
+        for orig_p in g.parameters:
+            with About(orig_p.debug, 'jvp_tangent'):
+                tangents.append(df.add_parameter())
+
+        jf = df.apply(P.jvp, g)
+        args = [x for pair in zip(params, tangents) for x in pair]
+        app = df.apply(jf, *args)
+        if self.tangent_only:
+            df.output = df.apply(P.tuple_getitem, app, 1)
+        else:
+            df.output = app
+        return df
+
+
+@macro
+async def vmap(info):
+    """Create a function that maps a function over a batch of arguments.
+
+    The arguments of the new function have an extra leading dimension for
+    the batch, and so do all the arrays in its output. Scalars are batched
+    as arrays of shape `(size,)`. Additional arguments to vmap give, for
+    each argument, either 0 if it is batched or None if it is shared by the
+    whole batch.
+
+    Usage:
+        vmap(f)(xs, ys)          == stack([f(x, y) for x, y in zip(xs, ys)])
+        vmap(f, 0, None)(xs, y)  == stack([f(x, y) for x in xs])
+    """
+    fn, *axes = [await ref.get() for ref in info.argrefs]
+    in_axes = tuple(abstract.build_value(ax, default=ANYTHING) for ax in axes)
+    for ax in in_axes:
+        if ax not in (0, None):
+            raise MyiaTypeError(f'vmap can only batch along axis 0, not {ax}')
+    fn = fn.get_unique()
+    if isinstance(fn, abstract.MetaGraphFunction):
+        return Constant(VMapOperation(fn.metagraph, in_axes or None))
+    assert isinstance(fn, abstract.GraphFunction)
+    return Constant(VMapOperation(fn.graph, in_axes or None))
+
+
+class VMapOperation(MetaGraph):
+    """Implements the vmap(f) operation.
+
+    This MetaGraph is returned by a call to `vmap`.
+    """
+
+    def __init__(self, fn, in_axes=None):
+        """Initialize VMapOperation."""
+        super().__init__('vmap')
+        self.fn = fn
+        self.in_axes = in_axes
+
+    def _get_in_axes(self, nargs):
+        if self.in_axes is None:
+            return (0,) * nargs
+        if len(self.in_axes) != nargs:
+            raise type_error_nargs('vmap', len(self.in_axes), nargs)
+        return self.in_axes
+
+    def _batch_size(self, arg):
+        if isinstance(arg, abstract.AbstractArray):
+            shp = arg.values[abstract.SHAPE]
+            if len(shp) > 0 and shp[0] is not ANYTHING:
+                return shp[0]
+        elif isinstance(arg, abstract.AbstractTuple):
+            for elem in arg.elements:
+                size = self._batch_size(elem)
+                if size is not None:
+                    return size
+        return None
+
+    def make_signature(self, args):
+        """Make the signature from the size of the batch.
+
+        The size of the batch is the leading dimension of the first batched
+        argument.
+        """
+        in_axes = self._get_in_axes(len(args))
+        sizes = [self._batch_size(arg)
+                 for arg, ax in zip(args, in_axes) if ax == 0]
+        sizes = [s for s in sizes if s is not None]
+        if not sizes:
+            raise MyiaTypeError('vmap needs at least one batched array '
+                                'of known size')
+        return self.fn.make_signature(args), sizes[0]
+
+    def generate_graph(self, sig):
+        """Make the graph for the vmap."""
+        fn_sig, size = sig
+        g = self.fn.generate_graph(fn_sig)
+
+        with About(g.debug, 'vmap'):
+            vg = Graph()
+            vg.set_flags('core', 'reference')
+
+        params = []
+        for orig_p in g.parameters:
+            with About(orig_p.debug, 'vmap'):
+                params.append(vg.add_parameter())
+
+        in_axes = self._get_in_axes(len(params))
+        vf = vg.apply(P.vmap, g, in_axes, size)
+        vg.output = vg.apply(vf, *params)
+        return vg
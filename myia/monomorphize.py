@@ -13,6 +13,7 @@ from warnings import warn
 from .abstract import (
     DEAD,
     POLY,
+    SHAPE,
     AbstractError,
     AbstractFunction,
     AbstractValue,
@@ -32,7 +33,7 @@ from .abstract import (
     build_value,
     concretize_abstract,
 )
-from .abstract.utils import CheckState, CloneState
+from .abstract.utils import CheckState, CloneState, MemoizedTransform
 from .graph_utils import dfs
 from .info import About
 from .ir import (
@@ -85,6 +86,9 @@ def _no_tracking_id(self, x: GraphFunction):
     return dc_replace(x, tracking_id=None)
 
 
+_no_tracking_id = MemoizedTransform(_no_tracking_id, '_no_tracking_id')
+
+
 @overload(bootstrap=True)
 def _refmap(self, fn, x: Context):
     return Context(
@@ -368,6 +372,30 @@ class Monomorphizer:
         todo.append(_TodoEntry(irefs[2], None, (ref, 2)))
         todo.append(_TodoEntry(irefs[3], None, (ref, 3)))
 
+    def _special_map_reduce(self, todo, ref, irefs, argvals):
+        todo.append(_TodoEntry(irefs[0], tuple(argvals), (ref, 0)))
+        # The reduction operates on the elements produced by the map, which
+        # have the same type as the elements of the result.
+        elem_t = concretize_abstract(ref.get_resolved()).element
+        todo.append(_TodoEntry(irefs[1], (elem_t, elem_t), (ref, 1)))
+        am_argvals = [a.element for a in argvals[3:]]
+        todo.append(_TodoEntry(irefs[2], tuple(am_argvals), (ref, 2)))
+        for i, iref in enumerate(irefs[3:]):
+            todo.append(_TodoEntry(iref, None, (ref, i + 3)))
+
+    def _special_array_fold(self, todo, ref, irefs, argvals):
+        todo.append(_TodoEntry(irefs[0], tuple(argvals), (ref, 0)))
+        # The function is called on the state, which has the type of the
+        # result, and on the rows of the array.
+        state_t = concretize_abstract(ref.get_resolved())
+        xs = argvals[2]
+        shp = xs.values[SHAPE]
+        row_t = (xs.element if len(shp) == 1
+                 else type(xs)(xs.element, {SHAPE: shp[1:]}))
+        todo.append(_TodoEntry(irefs[1], (state_t, row_t), (ref, 1)))
+        for i, iref in enumerate(irefs[2:]):
+            todo.append(_TodoEntry(iref, None, (ref, i + 2)))
+
     def collect(self, root_context):
         """Collect all the available contexts.
 
@@ -3,6 +3,7 @@
 from .clean import simplify_types, type_to_tag  # noqa
 from .cse import CSE, cse  # noqa
 from .dde import DeadDataElimination  # noqa
+from .loops import LowerArrayLoops, lower_array_loops  # noqa
 from .opt import (  # noqa
     GraphTransform,
     LocalPassOptimizer,
@@ -10,3 +11,4 @@ from .opt import (  # noqa
     PatternSubstitutionOptimization,
     pattern_replacer,
 )
+from .precision import mixed_precision  # noqa
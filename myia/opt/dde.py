@@ -122,8 +122,8 @@ class DeadDataElimination(Partializable):
                 rval = []
 
                 for f, *args1 in calls:
-                    if f is P.array_map:
-                        f = (*args1, *args)[0]
+                    if f in (P.array_map, P.map_reduce, P.array_fold):
+                        f = (*args1, *args)[1 if f is P.map_reduce else 0]
                         calls = [_flatten_call(f2) for f2 in f.get_sync()]
                         finish(node, (_graphs_from(calls),))
                     elif isinstance(f, Graph):
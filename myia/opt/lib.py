@@ -19,6 +19,7 @@ from ..ir import (
     Constant,
     Graph,
     GraphCloner,
+    toposort,
     transformable_clone,
 )
 from ..prim import Primitive, ops as P
@@ -210,6 +211,7 @@ gadd_switch = psub(
 
 
 _ArrayType = Var('ArrayType')
+_Shape = var(_is_c)
 
 
 @overload
@@ -226,7 +228,7 @@ def _transform(pattern: Var):
 @overload  # noqa: F811
 def _transform(pattern: (int, float)):
     return (P.distribute, (P.scalar_to_array, pattern, _ArrayType),
-            var(_is_c))
+            _Shape)
 
 
 def on_array_map(orig):
@@ -443,6 +445,132 @@ def unfuse_composite(optimizer, node, equiv):
     return node.graph.apply(ng, *xs)
 
 
+# Scalar primitives that may be grouped in a single elementwise kernel
+_elementwise_prims = {
+    P.scalar_add, P.scalar_sub, P.scalar_mul, P.scalar_div, P.scalar_mod,
+    P.scalar_pow, P.scalar_floor, P.scalar_trunc, P.scalar_max,
+    P.scalar_uadd, P.scalar_usub, P.scalar_exp, P.scalar_log,
+    P.scalar_sin, P.scalar_cos, P.scalar_tan, P.scalar_tanh,
+    P.scalar_eq, P.scalar_lt, P.scalar_gt, P.scalar_ne, P.scalar_le,
+    P.scalar_ge, P.bool_not, P.bool_and, P.bool_or, P.bool_eq,
+}
+
+
+def is_elementwise_graph(g):
+    """Check if g only applies elementwise primitives to its parameters.
+
+    Such a graph can be used as a single elementwise kernel by array_map.
+    """
+    for node in toposort(g.output):
+        if not node.is_apply():
+            continue
+        fn, *args = node.inputs
+        if not (fn.is_constant() and fn.value in _elementwise_prims):
+            return False
+        for arg in args:
+            if arg.is_parameter() and arg.graph is not g:
+                return False
+            elif arg.is_constant((Graph, Primitive)):
+                return False
+    return not g.output.is_parameter() or g.output.graph is g
+
+
+def _is_elementwise_fn(fn):
+    if fn.is_constant(Primitive):
+        return fn.value in _elementwise_prims
+    return fn.is_constant_graph() and is_elementwise_graph(fn.value)
+
+
+def _fusable_scalar(x):
+    """Return the scalar constant that x distributes, or None."""
+    if x.is_apply(P.distribute):
+        arr = x.inputs[1]
+        if arr.is_apply(P.scalar_to_array) and arr.inputs[1].is_constant():
+            return arr.inputs[1]
+    return None
+
+
+@pattern_replacer(P.array_map, X, Xs)
+def fuse_elementwise(optimizer, node, equiv):
+    """Fuse chains of elementwise operations into a single array_map.
+
+    The arguments of an array_map that are themselves array_maps used
+    nowhere else, or distributed scalar constants, are pulled into a new
+    scalar graph, so that the whole chain is computed by one kernel:
+
+        array_map(f, array_map(g, xs, ys), distribute(scalar_to_array(2)))
+            => array_map(lambda x, y: f(g(x, y), 2), xs, ys)
+
+    This is the inverse of unfuse_composite.
+    """
+    fn = equiv[X]
+    xs = equiv[Xs]
+    uses = node.graph.manager.uses
+
+    if not _is_elementwise_fn(fn):
+        return node
+
+    def fusable(x):
+        if _fusable_scalar(x) is not None:
+            return True
+        return (x.is_apply(P.array_map)
+                and _is_elementwise_fn(x.inputs[1])
+                and len(uses[x]) == 1)
+
+    if not any(fusable(x) for x in xs):
+        return node
+
+    ng = Graph()
+    ng.debug.name = 'fused'
+    params = {}
+    leaves = []
+
+    def param(x):
+        if x not in params:
+            params[x] = ng.add_parameter()
+            leaves.append(x)
+        return params[x]
+
+    def call(fn, args):
+        if fn.is_constant(Primitive):
+            return ng.apply(fn.value, *args)
+        g = fn.value
+        repl = dict(zip(g.parameters, args))
+        for n in toposort(g.output):
+            if n.is_apply():
+                repl[n] = ng.apply(n.inputs[0].value,
+                                   *[repl.get(i, i) for i in n.inputs[1:]])
+        return repl.get(g.output, g.output)
+
+    def arg(x):
+        scalar = _fusable_scalar(x)
+        if scalar is not None:
+            return scalar
+        elif fusable(x):
+            return call(x.inputs[1], [param(y) for y in x.inputs[2:]])
+        else:
+            return param(x)
+
+    ng.output = call(fn, [arg(x) for x in xs])
+    return node.graph.apply(P.array_map, ng, *leaves)
+
+
+@pattern_replacer(P.array_reduce, X, (P.array_map, Y, Xs), Z)
+def fuse_map_reduce(optimizer, node, equiv):
+    """Fuse a reduction over an array_map into a single map_reduce.
+
+        array_reduce(scalar_add, array_map(f, xs, ys), shp)
+            => map_reduce(scalar_add, f, shp, xs, ys)
+
+    The mapped array is then never materialized. This only applies if the
+    array_map is not used anywhere else.
+    """
+    if len(node.graph.manager.uses[node.inputs[2]]) != 1:
+        return node
+    return node.graph.apply(P.map_reduce, equiv[X], equiv[Y], equiv[Z],
+                            *equiv[Xs])
+
+
 @pattern_replacer(P.array_map, G, Xs)
 def simplify_array_map(optimizer, node, equiv):
     """Simplify array_map on certain graphs.
@@ -771,6 +899,10 @@ def replace_applicator(optimizer, node, equiv):
     """
     g = equiv[G].value
     out = g.output
+    uses = g.manager.uses.get(node, ())
+    if any(user.is_apply(P.vmap) for user, _ in uses):
+        # vmap needs a graph, to know the types of the arguments
+        return node
     if out.is_apply() and out.inputs[1:] == g.parameters:
         inner = out.inputs[0]
         # NOTE: it is likely correct to use `inner.value.parent is not g` as
@@ -1021,6 +1153,38 @@ def expand_J(optimizer, node, equiv):
     return Constant(newg)
 
 
+@pattern_replacer(P.jvp, C)
+def expand_jvp(optimizer, node, equiv):
+    """Replaces a call to jvp(f) by the graph for jvp(f).
+
+    This will not replace jvp(x) when x is not a constant graph, or before
+    the applications of J in x are expanded.
+    """
+    from ..jvp import jvp as jvpimpl
+    arg = equiv[C].value
+    try:
+        newg = jvpimpl(arg, optimizer.resources)
+    except NotImplementedError:
+        return None
+    return Constant(newg)
+
+
+@pattern_replacer(P.vmap, C, C1, C2)
+def expand_vmap(optimizer, node, equiv):
+    """Replaces a call to vmap(f) by the graph for vmap(f).
+
+    This will not replace vmap(x) before the graph of x is fully typed and
+    the functions it calls are known.
+    """
+    from ..vmap import vmap as vmapimpl
+    try:
+        newg = vmapimpl(equiv[C].value, equiv[C1].value, equiv[C2].value,
+                        optimizer.resources)
+    except NotImplementedError:
+        return None
+    return Constant(newg)
+
+
 @abstract_clone.variant
 def _jelim_retype(self, j: AbstractJTagged):
     return _jelim_retype_helper(j.element)
@@ -0,0 +1,240 @@
+"""Lower recursive loops over the rows of an array to array_fold.
+
+A loop such as:
+
+    for x in xs:
+        h = f(h, x)
+
+Is parsed into a recursive graph. After optimization, it looks like this:
+
+    def loop(it, h):
+        def body():
+            x = array_getitem(it[1], it[0])
+            return loop(make_tuple(it[0] + 1, it[1]), f(h, x))
+
+        def after():
+            return h
+
+        return switch(it[0] < array_len(it[1]), body, after)()
+
+    loop(make_tuple(0, xs), h0)
+
+Each step then costs a call, a switch and a tail call in the VM, besides the
+body of the loop. This module rewrites it into:
+
+    def step(state, x):
+        it, h = state[0], state[1]
+        return make_tuple(make_tuple(it[0] + 1, it[1]), f(h, x))
+
+    def exit(it, h):
+        return h
+
+    def loop(it, h):
+        final = array_fold(step, make_tuple(it, h), it[1])
+        return exit(final[0], final[1])
+
+Where the state of the fold is the tuple of the loop's parameters. The loop
+must start at index 0, increment its index by 1 and iterate over the same
+array at each step.
+
+This is out of scope for gradients: array_fold has no backpropagator, so
+the loops are only lowered in opt2, after the gradients are expanded. The
+body of the loop is also still compiled on its own and run once per row,
+rather than as a single kernel for the whole loop.
+"""
+
+from ..ir import Graph, GraphCloner, manage
+from ..prim import ops as P
+from ..utils import Partializable
+
+
+def _path(node, params):
+    """Return the path from a parameter to node, through tuple_getitem.
+
+    The path is a tuple whose first element is the index of the parameter,
+    followed by the successive indexes into it. If node is not of this form,
+    None is returned.
+    """
+    idx = []
+    while node.is_apply(P.tuple_getitem):
+        _, node, i = node.inputs
+        if not i.is_constant(int):
+            return None
+        idx.append(i.value)
+    if node not in params:
+        return None
+    return (params.index(node), *reversed(idx))
+
+
+def _argument(args, path):
+    """Return the argument at path in the arguments of a call, or None."""
+    i, *rest = path
+    node = args[i]
+    for i in rest:
+        if not node.is_apply(P.make_tuple):
+            return None
+        node = node.inputs[i + 1]
+    return node
+
+
+def _match_loop(manager, g):
+    """Check if g is a loop that can be lowered to array_fold.
+
+    Returns (ipath, xpath, body, exit, consts) if it is, where ipath and xpath
+    are the paths to the index and to the array in the parameters, body and
+    exit are the branches of the loop, and consts maps the indexes of the
+    parameters that are constant throughout the loop to their value.
+    """
+    out = g.output
+    if not (out.is_apply() and len(out.inputs) == 1
+            and out.inputs[0].is_apply(P.switch)):
+        return None
+    _, cond, body, exit = out.inputs[0].inputs
+    if not (cond.is_apply(P.scalar_lt)
+            and cond.inputs[2].is_apply(P.array_len)
+            and body.is_constant_graph()
+            and exit.is_constant_graph()):
+        return None
+    body, exit = body.value, exit.value
+    if (body.parent is not g or body.parameters
+            or exit.parent is not g or exit.parameters):
+        return None
+
+    params = g.parameters
+    ipath = _path(cond.inputs[1], params)
+    xpath = _path(cond.inputs[2].inputs[1], params)
+    tail = body.output
+    if (ipath is None or xpath is None
+            or not tail.is_apply()
+            or not tail.inputs[0].is_constant(Graph)
+            or tail.inputs[0].value is not g):
+        return None
+
+    # The index must be incremented by one and the array passed along
+    incr = _argument(tail.inputs[1:], ipath)
+    if not (incr is not None and incr.is_apply(P.scalar_add)
+            and _path(incr.inputs[1], params) == ipath
+            and incr.inputs[2].is_constant(int)
+            and incr.inputs[2].value == 1):
+        return None
+    arr = _argument(tail.inputs[1:], xpath)
+    if arr is None or _path(arr, params) != xpath:
+        return None
+
+    # g must only be called, and only the tail call may be recursive
+    calls = []
+    for ct in manager.graph_constants[g]:
+        for node, key in manager.uses[ct]:
+            if key != 0 or len(node.inputs) != len(params) + 1:
+                return None
+            calls.append(node)
+            if node is tail:
+                continue
+            if g in node.graph.scope:
+                return None
+            start = _argument(node.inputs[1:], ipath)
+            if not (start is not None and start.is_constant(int)
+                    and start.value == 0):
+                return None
+
+    # Parameters that are given the same constant by all calls are left out
+    # of the state of the loop
+    consts = {}
+    for i in range(len(params)):
+        args = [call.inputs[i + 1] for call in calls]
+        if (all(arg.is_constant() and arg.value == args[0].value
+                for arg in args)
+                and i not in (ipath[0], xpath[0])):
+            consts[i] = args[0]
+
+    return ipath, xpath, body, exit, consts
+
+
+def _loop_parameters(g, consts, state):
+    """Return the nodes that stand for the parameters of g in a clone.
+
+    The other parameters are taken successively from state.
+    """
+    state = iter(state)
+    return [consts[i] if i in consts else next(state)
+            for i in range(len(g.parameters))]
+
+
+def _step_graph(manager, g, ipath, xpath, body, consts):
+    """Generate the function for array_fold from the body of the loop."""
+    step = Graph()
+    step.debug.name = f'{g.debug.debug_name}_step'
+    state = step.add_parameter()
+    row = step.add_parameter()
+    nstate = len(g.parameters) - len(consts)
+    params = _loop_parameters(g, consts, [
+        step.apply(P.tuple_getitem, state, i) for i in range(nstate)
+    ])
+    cl = GraphCloner(inline=(g, step, params))
+    new_body = cl[body]
+    tail = new_body.output
+    new_body.output = new_body.apply(
+        P.make_tuple,
+        *[arg for i, arg in enumerate(tail.inputs[1:]) if i not in consts]
+    )
+    step.output = step.apply(new_body)
+
+    # The current row of the array is given to the step function
+    rows = {cl[node] for node in manager.nodes[body]
+            if node.is_apply(P.array_getitem)
+            and _path(node.inputs[1], g.parameters) == xpath
+            and _path(node.inputs[2], g.parameters) == ipath}
+    for node in manage(step, weak=True).all_nodes:
+        if node.is_apply():
+            node.inputs = [row if inp in rows else inp
+                           for inp in node.inputs]
+    return step
+
+
+def _exit_graph(g, exit, consts):
+    """Generate the function that computes the result of the loop."""
+    new_exit = Graph()
+    new_exit.debug.name = f'{g.debug.debug_name}_exit'
+    params = _loop_parameters(g, consts, [
+        new_exit.add_parameter()
+        for _ in range(len(g.parameters) - len(consts))
+    ])
+    cl = GraphCloner(inline=(g, new_exit, params))
+    new_exit.output = new_exit.apply(cl[exit])
+    return new_exit
+
+
+def lower_array_loops(root, manager):
+    """Lower the loops over arrays in root's scope to array_fold."""
+    manager.keep_roots(root)
+    changes = False
+    for g in list(manager.graphs):
+        if g not in manager.graphs:
+            continue
+        match = _match_loop(manager, g)
+        if match is None:
+            continue
+        ipath, xpath, body, exit, consts = match
+        step = _step_graph(manager, g, ipath, xpath, body, consts)
+        new_exit = _exit_graph(g, exit, consts)
+        xs = g.output.inputs[0].inputs[1].inputs[2].inputs[1]
+        state = [p for i, p in enumerate(g.parameters) if i not in consts]
+        init = g.apply(P.make_tuple, *state)
+        final = g.apply(P.array_fold, step, init, xs)
+        results = [g.apply(P.tuple_getitem, final, i)
+                   for i in range(len(state))]
+        manager.replace(g.output, g.apply(new_exit, *results))
+        changes = True
+    return changes
+
+
+class LowerArrayLoops(Partializable):
+    """Lower recursive loops over the rows of an array to array_fold."""
+
+    def __init__(self, optimizer):
+        """Initialize LowerArrayLoops."""
+        self.optimizer = optimizer
+
+    def __call__(self, root):
+        """Apply the lowering on root."""
+        return lower_array_loops(root, self.optimizer.resources.manager)
@@ -0,0 +1,92 @@
+"""Run the expensive array operations in a lower precision.
+
+Matrix products and convolutions dominate the cost of most models, and are
+limited by memory bandwidth. With a compute type of Float[16], this module
+rewrites:
+
+    dot(x, w)
+
+Where x and w are arrays of Float[32], into:
+
+    array_cast(dot(array_cast(x, f16), array_cast(w, f16)), f32)
+
+The parameters, the reductions and the elementwise operations are left in
+their original precision, and so is the result of the operation. This is
+done before the gradients are expanded, so that the backpropagator of
+array_cast casts the gradients back to the type of the parameters, and the
+products of the backward pass also run in the compute type.
+"""
+
+from ..abstract import (
+    ANYTHING,
+    TYPE,
+    VALUE,
+    AbstractArray,
+    AbstractScalar,
+    to_abstract,
+)
+from ..dtype import Float
+from ..ir import Constant
+from ..prim import ops as P
+
+
+def _with_type(a, t):
+    """Return the AbstractArray a with elements of type t."""
+    element = AbstractScalar({**a.element.values, VALUE: ANYTHING, TYPE: t})
+    return type(a)(element, a.values)
+
+
+def _cast(g, node, t):
+    """Cast node, which is an array, to elements of type t in graph g."""
+    typ = Constant(t)
+    typ.abstract = to_abstract(t)
+    res = g.apply(P.array_cast, node, typ)
+    res.abstract = _with_type(node.abstract, t)
+    return res
+
+
+def _lower(node, compute_type, operations):
+    """Check if node should be computed with compute_type.
+
+    Returns the original type of its arrays if it should, or None.
+    """
+    if not node.is_apply() or not any(node.is_apply(op)
+                                      for op in operations):
+        return None
+    arrays = [i.abstract for i in node.inputs[1:]
+              if isinstance(i.abstract, AbstractArray)]
+    types = {a.element.dtype() for a in arrays + [node.abstract]}
+    if len(types) != 1:
+        return None
+    t, = types
+    if (isinstance(t, type) and issubclass(t, Float)
+            and t.bits > compute_type.bits):
+        return t
+    return None
+
+
+def mixed_precision(root, manager, compute_type,
+                    operations=(P.dot, P.batch_dot, P.conv2d)):
+    """Compute the given operations on arrays of compute_type.
+
+    The graph must be typed. The inputs of the operations are cast to
+    compute_type and their result is cast back to the original type, if that
+    type is a wider float than compute_type.
+
+    Returns whether the graph was changed.
+    """
+    manager.add_graph(root)
+    changes = False
+    for node in list(manager.all_nodes):
+        t = _lower(node, compute_type, operations)
+        if t is None:
+            continue
+        fn, *args = node.inputs
+        args = [_cast(node.graph, a, compute_type)
+                if isinstance(a.abstract, AbstractArray) else a
+                for a in args]
+        new_node = node.graph.apply(fn, *args)
+        new_node.abstract = _with_type(node.abstract, compute_type)
+        manager.replace(node, _cast(node.graph, new_node, t))
+        changes = True
+    return changes
@@ -0,0 +1,461 @@
+"""Run a function compiled by Myia on several processes, data-parallel.
+
+DataParallel splits the batched arguments of each call along their first
+axis, runs the function on each part in a separate worker process, and
+reduces the results of all the workers, e.g. to average the gradients of a
+model:
+
+    def grads(model, x, y):
+        return value_and_grad(cost, 'model')(model, x, y)
+
+    with DataParallel(grads, batched=[False, True, True]) as dp:
+        for x, y in data:
+            cost, dmodel = dp(model, x, y)
+            model = model - dmodel * lr
+
+Each worker compiles the function once for each type of argument, like a
+MyiaFunction. The arrays are exchanged through shared memory: the inputs are
+written once and each worker reads its part in place, then the workers
+write their results in their slot of another buffer and reduce them
+together, each one summing a slice of every result (reduce-scatter), so
+that the parent process only reads the reduced result.
+"""
+
+import dataclasses
+import mmap
+import multiprocessing
+import os
+import pickle
+import tempfile
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from .compile.backends import parse_default
+
+# Shared memory files are created here when it exists
+_SHM_DIR = '/dev/shm'
+
+
+class _SharedBuffer:
+    """A buffer shared between processes, through a file in memory."""
+
+    def __init__(self, size, path=None):
+        self.size = size
+        if path is None:
+            fd, path = tempfile.mkstemp(
+                prefix='myia-', dir=_SHM_DIR if os.path.isdir(_SHM_DIR)
+                else None
+            )
+            os.ftruncate(fd, size)
+        else:
+            fd = os.open(path, os.O_RDWR)
+        self.path = path
+        self.mmap = mmap.mmap(fd, size)
+        os.close(fd)
+
+    def array(self, dtype, offset, shape):
+        """Return an array that is a view on the buffer."""
+        return np.ndarray(shape, dtype=dtype, buffer=self.mmap,
+                          offset=offset)
+
+    def close(self):
+        """Unmap the buffer."""
+        self.mmap.close()
+
+    def unlink(self):
+        """Remove the file of the buffer, once it is no longer needed."""
+        os.unlink(self.path)
+
+
+def _flatten(value, leaves):
+    """Return the structure of value, and add the arrays it contains to leaves.
+
+    Arrays and numbers are leaves, and are replaced in the structure by their
+    index in leaves. Tuples, lists, dicts and dataclasses are traversed, and
+    the other values are kept as is.
+    """
+    if isinstance(value, (np.ndarray, np.number, int, float)) \
+            and not isinstance(value, bool):
+        leaves.append(value)
+        return ('leaf', len(leaves) - 1)
+    elif isinstance(value, (tuple, list)):
+        return (type(value).__name__,
+                [_flatten(v, leaves) for v in value])
+    elif isinstance(value, dict):
+        return ('dict', list(value.keys()),
+                [_flatten(v, leaves) for v in value.values()])
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        fields = [f.name for f in dataclasses.fields(value)]
+        return ('dataclass', type(value),
+                [_flatten(getattr(value, f), leaves) for f in fields])
+    else:
+        return ('const', value)
+
+
+def _unflatten(struct, leaves):
+    """Rebuild a value from its structure and its leaves."""
+    kind = struct[0]
+    if kind == 'leaf':
+        return leaves[struct[1]]
+    elif kind == 'tuple':
+        return tuple(_unflatten(s, leaves) for s in struct[1])
+    elif kind == 'list':
+        return [_unflatten(s, leaves) for s in struct[1]]
+    elif kind == 'dict':
+        return dict(zip(struct[1], (_unflatten(s, leaves)
+                                    for s in struct[2])))
+    elif kind == 'dataclass':
+        return struct[1](*[_unflatten(s, leaves) for s in struct[2]])
+    else:
+        return struct[1]
+
+
+def _layout(leaves, offset=0):
+    """Return where each leaf goes in a buffer, and the size of the buffer.
+
+    The layout of a leaf is its offset, dtype, shape, and whether it is a
+    scalar, in which case it is read back as a scalar.
+    """
+    layout = []
+    for leaf in leaves:
+        is_scalar = not isinstance(leaf, np.ndarray)
+        leaf = np.asarray(leaf)
+        # Keep the arrays aligned
+        offset += -offset % 16
+        layout.append((offset, leaf.dtype.str, leaf.shape, is_scalar))
+        offset += leaf.nbytes
+    return layout, offset
+
+
+def _read(buffer, layout):
+    """Return the leaves laid out in buffer, as views on it."""
+    leaves = []
+    for offset, dtype, shape, is_scalar in layout:
+        leaf = buffer.array(dtype, offset, shape)
+        leaves.append(leaf[()] if is_scalar else leaf)
+    return leaves
+
+
+def _write(buffer, layout, leaves):
+    """Copy leaves in buffer."""
+    for (offset, dtype, shape, _), leaf in zip(layout, leaves):
+        buffer.array(dtype, offset, shape)[...] = leaf
+
+
+class _Worker:
+    """State of a worker process."""
+
+    def __init__(self, index, fn, barrier, backend, backend_options):
+        from .api import myia
+        self.index = index
+        self.fn = myia(fn, backend=backend, backend_options=backend_options)
+        self.barrier = barrier
+        self.buffers = {}
+
+    def buffer(self, role, path, size):
+        """Return the shared buffer for inputs or outputs.
+
+        The buffer is mapped again if it changed since the last call.
+        """
+        buf = self.buffers.get(role)
+        if buf is None or buf.path != path:
+            if buf is not None:
+                buf.close()
+            buf = self.buffers[role] = _SharedBuffer(size, path)
+        return buf
+
+    def run(self, inputs):
+        """Call the function on the part of the batch of this worker."""
+        path, size, struct, layout, rows = inputs
+        leaves = _read(self.buffer('inputs', path, size), layout)
+        for i, (start, stop) in rows.items():
+            leaves[i] = leaves[i][start:stop]
+        return self.fn(*_unflatten(struct, leaves))
+
+    def reduce(self, res, outputs):
+        """Write res in the slot of this worker and reduce a slice."""
+        path, size, layout, slot_size, weights = outputs
+        buffer = self.buffer('outputs', path, size)
+        nworkers = len(weights)
+        if res is not None:
+            leaves = []
+            _flatten(res, leaves)
+            _write(buffer, [(offset + self.index * slot_size, *rest)
+                            for offset, *rest in layout], leaves)
+        self.barrier.wait()
+        # The result goes in the slot after the ones of the workers
+        result_offset = nworkers * slot_size
+        for offset, dtype, shape, _ in layout:
+            n = int(np.prod(shape))
+            start = n * self.index // nworkers
+            stop = n * (self.index + 1) // nworkers
+            if start == stop:
+                continue
+            total = buffer.array(dtype, offset + result_offset, (n,))
+            parts = [(buffer.array(dtype, offset + j * slot_size, (n,)), w)
+                     for j, w in enumerate(weights) if w]
+            acc = sum(part[start:stop] * w for part, w in parts)
+            total[start:stop] = acc
+        self.barrier.wait()
+
+
+def _error_reply(exc):
+    """Return the reply of a worker for exc.
+
+    The exception is replaced by a RuntimeError if it cannot be pickled,
+    since the parent process would otherwise never get a reply.
+    """
+    try:
+        pickle.loads(pickle.dumps(exc))
+    except Exception:
+        exc = RuntimeError(repr(exc))
+    return ('error', exc)
+
+
+def _worker_main(index, conn, fn, barrier, backend, backend_options,
+                 threads):
+    """Main loop of a worker process."""
+    if backend == 'pytorch':
+        import torch
+        torch.set_num_threads(threads)
+    worker = _Worker(index, fn, barrier, backend, backend_options)
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        res = None
+        try:
+            if msg[0] is not None:
+                res = worker.run(msg[0])
+                leaves = []
+                struct = _flatten(res, leaves)
+                conn.send(('ok', (struct, _layout(leaves)[0])))
+            else:
+                conn.send(('ok', None))
+        except Exception as exc:
+            conn.send(_error_reply(exc))
+        outputs = conn.recv()
+        if outputs is not None:
+            worker.reduce(res, outputs)
+            conn.send(('ok', None))
+
+
+class DataParallel:
+    """Run a function compiled by Myia on several processes, data-parallel.
+
+    The batched arguments are split in parts of about the same size along
+    their first axis, and each part is given, with the other arguments, to
+    the function in a worker process. All the results must then have the
+    same structure and shapes, and they are reduced.
+
+    With reduce='mean', the results are averaged, weighted by the size of
+    the parts of the batch, which gives the same result as a single call
+    on the whole batch if the function returns a mean over the examples,
+    e.g. the gradient of a mean loss. The results must then be floats.
+    With reduce='sum', they are summed, for functions that return a sum
+    over the examples.
+
+    If a worker process dies, the others are stopped and the call raises a
+    RuntimeError.
+
+    Attributes:
+        fn: The Python function to compile and run.
+        workers: The number of worker processes.
+        batched: Whether each argument is batched. All the arguments are
+            batched by default.
+        reduce: 'mean' or 'sum'.
+        backend: The backend to compile the function for. The default
+            backend is used if it is None.
+        backend_options: backend-specific options.
+
+    """
+
+    def __init__(self, fn, *, workers=None, batched=None, reduce='mean',
+                 backend=None, backend_options=None, start_method='spawn'):
+        """Initialize a DataParallel and start the worker processes.
+
+        The workers are started with the given multiprocessing start
+        method. With 'spawn', fn must be defined at the top level of a
+        module.
+        """
+        if reduce not in ('mean', 'sum'):
+            raise ValueError(f'Invalid reduction: {reduce}')
+        if backend is None:
+            assert backend_options is None
+            backend, backend_options = parse_default()
+        self.fn = fn
+        self.workers = workers or os.cpu_count()
+        self.batched = batched
+        self.reduce = reduce
+        self.backend = backend
+        self.backend_options = backend_options
+        self._inputs = None
+        self._outputs = None
+
+        ctx = multiprocessing.get_context(start_method)
+        # Kept here so that it lives until the workers have started
+        self._barrier = barrier = ctx.Barrier(self.workers)
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._conns = []
+        self._procs = []
+        for i in range(self.workers):
+            conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(i, child_conn, fn, barrier, backend, backend_options,
+                      threads),
+                daemon=True,
+            )
+            proc.start()
+            self._conns.append(conn)
+            self._procs.append(proc)
+
+    def _buffer(self, buffer, size):
+        """Return buffer if it can hold size bytes, else a larger one."""
+        if buffer is not None and buffer.size >= size:
+            return buffer
+        if buffer is not None:
+            buffer.close()
+            buffer.unlink()
+        return _SharedBuffer(max(size, 2 * buffer.size if buffer else 0, 1))
+
+    def _shards(self, args):
+        """Return the rows of the batch given to each worker."""
+        batched = self.batched or [True] * len(args)
+        if len(batched) != len(args):
+            raise TypeError(f'Expected {len(batched)} arguments')
+        sizes = {len(arg) for arg, b in zip(args, batched) if b}
+        if len(sizes) != 1:
+            raise TypeError('The batched arguments must have the same size')
+        n, = sizes
+        return [(n * i // self.workers, n * (i + 1) // self.workers)
+                for i in range(self.workers)]
+
+    def _died(self, i):
+        """Stop the workers and raise an error for the death of worker i."""
+        self._procs[i].join(1)
+        code = self._procs[i].exitcode
+        self._terminate()
+        raise RuntimeError(f'Worker {i} died with exit code {code}')
+
+    def _send(self, i, msg):
+        """Send msg to worker i."""
+        try:
+            self._conns[i].send(msg)
+        except OSError:
+            self._died(i)
+
+    def _recv(self, i):
+        """Return the reply of worker i.
+
+        Raises a RuntimeError, after stopping the workers, if it died.
+        """
+        conn, proc = self._conns[i], self._procs[i]
+        while not conn.poll():
+            wait([conn, proc.sentinel])
+            if not conn.poll() and not proc.is_alive():
+                self._died(i)
+        try:
+            return conn.recv()
+        except (EOFError, OSError):
+            self._died(i)
+
+    def _cancel(self):
+        """Tell the workers that no reduction follows their results."""
+        for i in range(self.workers):
+            self._send(i, None)
+
+    def __call__(self, *args):
+        """Call the function on args, split across the workers."""
+        if not self._procs:
+            raise RuntimeError('The DataParallel is closed')
+        shards = self._shards(args)
+        batched = self.batched or [True] * len(args)
+        leaves = []
+        structs = []
+        rows = {}
+        for arg, b in zip(args, batched):
+            start = len(leaves)
+            structs.append(_flatten(arg, leaves))
+            if b:
+                if len(leaves) != start + 1 \
+                        or not isinstance(leaves[-1], np.ndarray):
+                    raise TypeError('Batched arguments must be arrays')
+                rows[start] = True
+        struct = ('tuple', structs)
+        layout, size = _layout(leaves)
+        self._inputs = self._buffer(self._inputs, size)
+        _write(self._inputs, layout, leaves)
+
+        for i, (start, stop) in enumerate(shards):
+            if start == stop:
+                self._send(i, (None,))
+            else:
+                self._send(i, ((self._inputs.path, self._inputs.size, struct,
+                                layout, {j: (start, stop) for j in rows}),))
+        replies = [self._recv(i) for i in range(self.workers)]
+        errors = [r for status, r in replies if status == 'error']
+        outs = [r for status, r in replies if status == 'ok' and r]
+        if errors or any(out != outs[0] for out in outs):
+            self._cancel()
+            if errors:
+                raise errors[0]
+            raise TypeError('The results of the workers do not match')
+
+        out_struct, out_layout = outs[0]
+        if self.reduce == 'mean' and any(np.dtype(dtype).kind != 'f'
+                                         for _, dtype, _, _ in out_layout):
+            self._cancel()
+            raise TypeError("reduce='mean' requires results of float types")
+        slot_size = _layout([np.empty(shape, dtype)
+                             for _, dtype, shape, _ in out_layout])[1]
+        slot_size += -slot_size % 16
+        self._outputs = self._buffer(self._outputs,
+                                     slot_size * (self.workers + 1))
+        total = sum(stop - start for start, stop in shards)
+        weights = [(stop - start) / total if self.reduce == 'mean'
+                   else int(stop > start) for start, stop in shards]
+        for i in range(self.workers):
+            self._send(i, (self._outputs.path, self._outputs.size, out_layout,
+                           slot_size, weights))
+        for i in range(self.workers):
+            self._recv(i)
+
+        result_layout = [(offset + self.workers * slot_size, *rest)
+                         for offset, *rest in out_layout]
+        res = [leaf.copy() if isinstance(leaf, np.ndarray) else leaf.item()
+               for leaf in _read(self._outputs, result_layout)]
+        return _unflatten(out_struct, res)
+
+    def close(self):
+        """Stop the worker processes and free the shared memory."""
+        for conn in self._conns:
+            conn.send(None)
+        for proc in self._procs:
+            proc.join()
+        self._free()
+
+    def _terminate(self):
+        """Kill the worker processes and free the shared memory."""
+        for proc in self._procs:
+            proc.terminate()
+        for proc in self._procs:
+            proc.join()
+        self._free()
+
+    def _free(self):
+        """Free the shared memory and forget the workers."""
+        for buffer in (self._inputs, self._outputs):
+            if buffer is not None:
+                buffer.close()
+                buffer.unlink()
+        self._inputs = self._outputs = None
+        self._conns = []
+        self._procs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
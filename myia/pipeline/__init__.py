@@ -9,6 +9,7 @@ from .pipeline import (  # noqa
     pipeline_function,
 )
 from .standard import (  # noqa
+    optimization_levels,
     scalar_debug_compile,
     scalar_debug_pipeline,
     scalar_parse,
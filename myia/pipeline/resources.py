@@ -66,6 +66,7 @@ scalar_object_map = {
     math.cos: P.scalar_cos,
     math.tan: P.scalar_tan,
     sum: C.sum,
+    range: M.range_,
     Exception: P.exception,
 }
 
@@ -139,6 +140,7 @@ standard_object_map = {
     np.tanh: C.tanh,
     np.sum: C.sum,
     sum: C.sum,
+    range: M.range_,
     Exception: P.exception,
 }
 
@@ -362,7 +364,8 @@ class InferenceResource(PipelineResource):
     def __init__(self,
                  pipeline_init,
                  constructors,
-                 context_class):
+                 context_class,
+                 max_contexts=None):
         """Initialize an InferenceResource."""
         super().__init__(pipeline_init)
         self.manager = self.resources.manager
@@ -372,6 +375,7 @@ class InferenceResource(PipelineResource):
             self.pipeline,
             constructors=self.constructors,
             context_class=self.context_class,
+            max_contexts=max_contexts,
         )
 
     def infer(self, graph, argspec, outspec=None, clear=False):
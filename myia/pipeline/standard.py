@@ -12,6 +12,7 @@ from ..pipeline.resources import (
     standard_object_map,
 )
 from ..prim import py_registry
+from ..utils import Reset
 from . import steps
 from .pipeline import PipelineDefinition
 
@@ -44,6 +45,7 @@ standard_pipeline = PipelineDefinition(
         infer=steps.step_infer,
         specialize=steps.step_specialize,
         simplify_types=steps.step_simplify_types,
+        mixed_precision=steps.step_mixed_precision,
         opt=steps.step_opt,
         opt2=steps.step_opt2,
         cconv=steps.step_cconv,
@@ -54,6 +56,23 @@ standard_pipeline = PipelineDefinition(
 )
 
 
+# Changes to standard_pipeline for each optimization level:
+# 0: Only what is required for correctness (fastest compile)
+# 1: Default optimizations
+# 2: Also incorporate getitem and calls across graph boundaries, and fuse
+#    elementwise operations into single kernels
+# 3: Also apply optimizations that may alter floating point rounding
+optimization_levels = {
+    0: {'opt': Reset(steps.step_opt_minimal),
+        'opt2': Reset(steps.step_opt2_minimal)},
+    1: {},
+    2: {'opt': Reset(steps.step_opt_extra),
+        'opt2': Reset(steps.step_opt2_fused)},
+    3: {'opt': Reset(steps.step_opt_max),
+        'opt2': Reset(steps.step_opt2_fused)},
+}
+
+
 scalar_pipeline = standard_pipeline.configure({
     'convert.object_map': scalar_object_map,
 })
@@ -67,6 +86,7 @@ standard_debug_pipeline = PipelineDefinition(
         infer=steps.step_infer,
         specialize=steps.step_specialize,
         simplify_types=steps.step_simplify_types,
+        mixed_precision=steps.step_mixed_precision,
         opt=steps.step_opt,
         opt2=steps.step_opt2,
         cconv=steps.step_cconv,
@@ -5,6 +5,7 @@ The steps are listed in roughly the same order they should be called.
 
 
 from itertools import count
+from threading import Lock
 
 import numpy as np
 
@@ -32,12 +33,14 @@ from ..opt import (
     CSE,
     DeadDataElimination,
     LocalPassOptimizer,
+    LowerArrayLoops,
     NodeMap,
     lib as optlib,
+    mixed_precision,
     simplify_types,
     type_to_tag,
 )
-from ..prim import vm_registry
+from ..prim import ops as P, vm_registry
 from ..utils import (
     Cons,
     Empty,
@@ -239,6 +242,54 @@ def step_simplify_types(self, graph, argspec, outspec):
             'simplify_types': True}
 
 
+###################
+# Mixed precision #
+###################
+
+
+class MixedPrecision(PipelineStep):
+    """Pipeline step to compute some operations in a lower precision.
+
+    This should be run on the typed graph, before the optimizations that
+    expand the gradients.
+
+    Inputs:
+        graph: The graph to transform.
+
+    Outputs:
+        graph: The transformed graph.
+    """
+
+    def __init__(self,
+                 pipeline_init,
+                 compute_type=None,
+                 operations=(P.dot, P.batch_dot, P.conv2d)):
+        """Initialize a MixedPrecision step.
+
+        Arguments:
+            compute_type: The type of the elements of the arrays given to
+                the operations, e.g. Float[16]. The graph is left unchanged
+                if it is None.
+            operations: The primitives to compute with compute_type.
+        """
+        super().__init__(pipeline_init)
+        self.compute_type = compute_type
+        self.operations = operations
+
+    def step(self, graph, argspec, outspec):
+        """Cast the inputs and outputs of the operations."""
+        if (self.compute_type is not None
+                and mixed_precision(graph, self.resources.manager,
+                                    self.compute_type, self.operations)):
+            graph = self.resources.inferrer.renormalize(
+                graph, argspec, outspec
+            )
+        return {'graph': graph}
+
+
+step_mixed_precision = MixedPrecision.partial()
+
+
 ############
 # Optimize #
 ############
@@ -263,6 +314,8 @@ step_debug_opt = Optimizer.partial(
         ],
         grad=[
             optlib.expand_J,
+            optlib.expand_jvp,
+            optlib.expand_vmap,
         ],
         renormalize='renormalize',
         cse=CSE.partial(report_changes=False),
@@ -353,6 +406,8 @@ step_opt = Optimizer.partial(
         ],
         grad=[
             optlib.expand_J,
+            optlib.expand_jvp,
+            optlib.expand_vmap,
         ],
         renormalize='renormalize',
         cse=CSE.partial(report_changes=False),
@@ -383,6 +438,101 @@ step_opt2 = Optimizer.partial(
             optlib.setitem_dead,
         ],
         cse=CSE.partial(report_changes=False),
+        loops=LowerArrayLoops.partial(),
+    )
+)
+
+
+# Keeps elementwise composites together and fuses chains of array_map, and
+# reductions over them, so that the backend can compute each chain with a
+# single kernel
+step_opt2_fused = Optimizer.partial(
+    phases=dict(
+        renormalize='renormalize',
+        dde=DeadDataElimination.partial(),
+        main=[
+            optlib.fuse_elementwise,
+            optlib.fuse_map_reduce,
+            optlib.getitem_tuple,
+            optlib.getitem_setitem_tuple,
+            optlib.setitem_tuple,
+            optlib.setitem_tuple_ct,
+            optlib.float_tuple_getitem_through_switch,
+            optlib.inline_trivial,
+            optlib.inline_unique_uses,
+            optlib.inline_inside_marked_caller,
+            optlib.inline_core,
+            optlib.combine_switches_array,
+            optlib.gadd_zero_l,
+            optlib.gadd_zero_r,
+            optlib.gadd_switch,
+            optlib.setitem_dead,
+        ],
+        cse=CSE.partial(report_changes=False),
+        loops=LowerArrayLoops.partial(),
+    )
+)
+
+
+# Only what is needed to produce a graph the backends can compile
+step_opt_minimal = Optimizer.partial(
+    phases=dict(
+        main=[
+            optlib.inline_core,
+            optlib.inline_inside_marked_caller,
+            optlib.simplify_partial,
+            optlib.simplify_array_map,
+            optlib.getitem_tuple,
+            optlib.elim_identity,
+            optlib.elim_j_jinv,
+            optlib.elim_jinv_j,
+        ],
+        grad=[
+            optlib.expand_J,
+            optlib.expand_jvp,
+            optlib.expand_vmap,
+        ],
+        renormalize='renormalize',
+        jelim=optlib.JElim.partial(),
+    )
+)
+
+
+step_opt2_minimal = Optimizer.partial(
+    phases=dict(
+        renormalize='renormalize',
+        main=[
+            optlib.unfuse_composite,
+            optlib.getitem_tuple,
+            optlib.getitem_setitem_tuple,
+            optlib.setitem_tuple,
+            optlib.setitem_tuple_ct,
+            optlib.inline_core,
+        ],
+    )
+)
+
+
+# The incorporate_* optimizations are slower, but they can eliminate calls
+# and tuple packing across graph boundaries
+step_opt_extra = step_opt.partial(
+    phases=dict(
+        main2=[
+            optlib.incorporate_getitem,
+            optlib.incorporate_env_getitem,
+            optlib.incorporate_call,
+        ],
+    )
+)
+
+
+# These may change the rounding of floating point results
+step_opt_max = step_opt_extra.partial(
+    phases=dict(
+        main=[
+            optlib.divdiv_to_mul,
+            optlib.divdiv_to_mul_map,
+        ],
     )
 )
 
@@ -583,6 +733,10 @@ def convert_arg(self, arg, orig_t: AbstractArray, backend):
     if isinstance(arg, np.ndarray):
         arg = backend.from_numpy(arg)
     backend.check_array(arg, et)
+    shape = orig_t.values[SHAPE]
+    if len(arg.shape) != len(shape) or any(
+            s is not ANYTHING and s != a for s, a in zip(shape, arg.shape)):
+        raise MyiaInputTypeError(f'Expected an array of shape {shape}')
     return arg
 
 
@@ -744,26 +898,44 @@ class Wrap(PipelineStep):
         orig_arg_t = orig_argspec or argspec
         orig_out_t = orig_outspec or outspec
         vm_out_t = graph.return_.abstract
+        # The VM keeps its state while it runs, so it can only run one call
+        # at a time
+        lock = Lock()
 
-        def wrapped(*args):
+        def get_backend():
+            steps = self.pipeline.steps
+            if hasattr(steps, 'compile'):
+                return steps.compile.backend
+            else:
+                return NumpyChecker()
+
+        def convert_args(args):
             if aliasspec:
                 alias_tracker, orig_aid_to_paths = aliasspec
                 _, aid_to_paths = find_aliases(args, alias_tracker)
                 if aid_to_paths != orig_aid_to_paths:
                     raise MyiaInputTypeError('Incompatible aliasing pattern.')
-            steps = self.pipeline.steps
-            if hasattr(steps, 'compile'):
-                backend = steps.compile.backend
-            else:
-                backend = NumpyChecker()
+            backend = get_backend()
             if len(args) != len(orig_arg_t):
                 raise MyiaInputTypeError('Wrong number of arguments.')
-            args = tuple(convert_arg(arg, ot, backend) for arg, ot in
+            return tuple(convert_arg(arg, ot, backend) for arg, ot in
                          zip(args, orig_arg_t))
-            res = fn(*args)
-            res = convert_result(res, orig_out_t, vm_out_t, backend,
-                                 self.return_backend)
-            return res
+
+        def run(args):
+            with lock:
+                return fn(*args)
+
+        def convert_res(res):
+            return convert_result(res, orig_out_t, vm_out_t, get_backend(),
+                                  self.return_backend)
+
+        def wrapped(*args):
+            return convert_res(run(convert_args(args)))
+
+        # The phases of a call, for MyiaFunction.call_async
+        wrapped.convert_args = convert_args
+        wrapped.run = run
+        wrapped.convert_result = convert_res
 
         return {'output': wrapped}
 
@@ -4,19 +4,24 @@ Each primitive is associated to an augmented function, which returns a pair of
 the (augmented) original primitive's output and a backpropagator function.
 """
 
+from collections.abc import MutableMapping
+
+from .. import operations
 from ..abstract import AbstractFunction, GraphFunction
 from ..composite import zeros_like
 from ..debug.label import short_labeler, short_relation_symbols as syms
 from ..info import About, NamedDebugInfo
 from ..ir import Constant, Graph, MetaGraph, clone, manage
 from ..pipeline import standard_pipeline
-from ..utils import Registry, newenv
+from ..utils import newenv
 from . import ops as primops
 from .py_implementations import (
     J,
     Jinv,
+    array_cast,
     array_reduce,
     array_to_scalar,
+    batch_dot,
     casttag,
     conv2d_input_grad,
     conv2d_weight_grad,
@@ -52,6 +57,40 @@ parse = standard_pipeline \
 _flags = {'ignore_values': True, 'core': True, 'reference': True}
 
 
+# Functions that only read metadata from their argument
+_metadata_functions = {shape, typeof}
+
+
+def _is_metadata_call(node):
+    """Check whether node is a call to one of `_metadata_functions`.
+
+    The backpropagators are only parsed, so the function is still a call to
+    `resolve` at this point.
+    """
+    if not node.is_apply() or len(node.inputs) != 2:
+        return False
+    fn = node.inputs[0]
+    if not fn.is_apply(operations.resolve):
+        return False
+    _, ns, name = fn.inputs
+    return (ns.is_constant() and name.is_constant()
+            and ns.value[name.value] in _metadata_functions)
+
+
+def _hoist_metadata(mng, outer, node):
+    """Compute in outer the metadata that the backpropagator needs on node.
+
+    If the backpropagator only needs e.g. the shape of an input, it will then
+    keep that shape rather than the input itself.
+    """
+    for user, _ in list(mng.uses[node]):
+        if user.graph is not outer and _is_metadata_call(user):
+            fn = user.inputs[0]
+            with About(user.debug, 'equiv'):
+                new_node = outer.apply(outer.apply(*fn.inputs), node)
+            mng.replace(user, new_node)
+
+
 def bprop_to_augm(prim, fn, flags):
     """Given a function for the bprop, make the augmented function."""
     info = NamedDebugInfo(prim=prim, name=prim.name)
@@ -84,6 +123,7 @@ def bprop_to_augm(prim, fn, flags):
         with About(p.debug, 'equiv'):
             transf_p = outer.apply(primops.Jinv, outer_p)
         mng.replace(p, transf_p)
+        _hoist_metadata(mng, outer, transf_p)
         transf_args.append(transf_p)
 
     with About(out_param.debug, 'equiv'):
@@ -106,30 +146,76 @@ def bprop_to_augm(prim, fn, flags):
     return clone(outer)
 
 
-augmented_graphs = Registry()
+class _AugmentedGraphs(MutableMapping):
+    """Registry of the augmented graphs, which are built on first use.
+
+    Parsing all the backpropagators would take most of the time needed to
+    import myia, so only the ones that are used are parsed. All the methods
+    of the mapping go through `__getitem__`, which builds the graphs.
+    """
+
+    def __init__(self):
+        """Initialize an _AugmentedGraphs."""
+        self._entries = {}
+
+    def __getitem__(self, prim):
+        g = self._entries[prim]
+        if not isinstance(g, (Graph, MetaGraph)):
+            g = g()
+            self._entries[prim] = g
+        return g
+
+    def __setitem__(self, prim, g):
+        self._entries[prim] = g
+
+    def __delitem__(self, prim):
+        del self._entries[prim]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def register(self, prim):
+        """Register a function that builds the augmented graph for prim."""
+        def deco(fn):
+            self[prim] = fn
+            return fn
+        return deco
+
+
+augmented_graphs = _AugmentedGraphs()
 register = augmented_graphs.register
 
 
 def register_bprop(prim, **flags):
     """Register an augmented function for prim, given a backpropagator."""
     def deco(fn):
-        g = bprop_to_augm(prim, fn, flags)
-        return register(prim)(g)
+        register(prim)(lambda: bprop_to_augm(prim, fn, flags))
+        return fn
     return deco
 
 
 def register_augm(prim):
     """Register an augmented function for prim."""
     def deco(fn):
-        g = parse(fn)
-        for g2 in manage(g, weak=True).graphs:
-            name = short_labeler.name(g2)
+        register(prim)(lambda: _augm(prim, fn))
+        return fn
+    return deco
+
+
+def _augm(prim, fn):
+    """Make the augmented function for prim from its definition."""
+    g = parse(fn)
+    for g2 in manage(g, weak=True).graphs:
+        name = short_labeler.name(g2)
+        if name is not None:
             name = name.replace('__fprop__', syms['grad_fprop'])
             g2.debug.name = name.replace('__bprop__', syms['grad_bprop'])
-            g2.flags.update(_flags)
-        g.transforms['primal'] = prim
-        return register(prim)(g)
-    return deco
+        g2.flags.update(_flags)
+    g.transforms['primal'] = prim
+    return g
 
 
 @register_bprop(primops.scalar_add)
@@ -264,6 +350,12 @@ def bprop_array_to_scalar(x, out, dout):
     return (scalar_to_array(dout, typeof(x)),)
 
 
+@register_bprop(primops.array_cast)
+def bprop_array_cast(x, t, out, dout):
+    """Backpropagator for primitive `array_cast`."""
+    return (array_cast(dout, typeof(x).element), t)
+
+
 @register_bprop(primops.dot)
 def bprop_dot(x, y, out, dout):
     """Backpropagator for primitive `dot`."""
@@ -271,6 +363,13 @@ def bprop_dot(x, y, out, dout):
             dot(transpose(x, (1, 0)), dout))
 
 
+@register_bprop(primops.batch_dot)
+def bprop_batch_dot(x, y, out, dout):
+    """Backpropagator for primitive `batch_dot`."""
+    return (batch_dot(dout, transpose(y, (0, 2, 1))),
+            batch_dot(transpose(x, (0, 2, 1)), dout))
+
+
 @register_bprop(primops.reshape, ignore_values=False)
 def bprop_reshape(xs, shp, out, dout):
     """Backpropagator for primitive `reshape`."""
@@ -497,3 +596,74 @@ class ArrayReduceGradient(MetaGraph):
 register(primops.array_reduce)(
     ArrayReduceGradient(name='array_reduce_gradient')
 )
+
+
+class MapReduceGradient(MetaGraph):
+    """Generate the gradient graph for map_reduce.
+
+    As for array_reduce, only a reduction over `scalar_add` is supported.
+    The sensitivity is distributed back to the shape of the inputs and then
+    backpropagated through the map:
+
+        map_reduce(scalar_add, f, shp, xs, ys, ...) =>
+
+        def fprop_map_reduce(jadd, jf, jshp, jxs, jys, ...):
+            ret = map_reduce(scalar_add, Jinv(jf), Jinv(jshp), Jinv(jxs), ...)
+
+            def bprop_map_reduce(dout):
+                d = distribute(dout, shape(Jinv(jxs)))
+                f_dxs = lambda d, jx, jy, ...: jf(jx, jy, ...)[1](d)[1]
+                dxs = array_map(f_dxs, d, Jinv(jxs), Jinv(jys), ...)
+                ...
+                return newenv, newenv, zeros_like(shp), dxs, dys, ...
+
+            return J(ret), bprop_map_reduce
+    """
+
+    def generate_graph(self, absargs):
+        """Generate the gradient graph."""
+        jr, *_ = absargs
+        assert isinstance(jr, AbstractFunction)
+        fn = jr.get_unique()
+        assert isinstance(fn, GraphFunction) and fn.graph.parent is None
+        assert fn.graph.transforms['primal'] is primops.scalar_add
+
+        g = Graph()
+        nargs = len(absargs) - 3
+        params = [g.add_parameter() for _ in range(nargs + 3)]
+        _, jf, _, *jargs = params
+        r, f, shp, *args = [g.apply(primops.Jinv, p) for p in params]
+        ret = g.apply(primops.map_reduce, r, f, shp, *args)
+
+        b = Graph()
+        dout = b.add_parameter()
+        dmapped = b.apply(primops.distribute, dout,
+                          b.apply(primops.shape, args[0]))
+
+        results = []
+
+        for i in range(nargs):
+            func = Graph()
+            fparams = [func.add_parameter() for _ in range(nargs + 1)]
+            fparams[0].debug.name = f'{syms["grad_sens"]}out'
+            fjparams = [func.apply(primops.J, p) for p in fparams]
+            call = func.apply(jf, *fjparams[1:])
+            bprop = func.apply(primops.tuple_getitem, call, 1)
+            sens = func.apply(bprop, fparams[0])
+            func.output = func.apply(primops.tuple_getitem, sens, i + 1)
+            result = b.apply(primops.array_map, func, dmapped, *args)
+            results.append(result)
+
+        b.output = b.apply(primops.make_tuple, newenv, newenv, newenv,
+                           b.apply(zeros_like, shp), *results)
+
+        ret = g.apply(primops.J, ret)
+        g.output = g.apply(primops.make_tuple, ret, b)
+
+        b.flags.update(_flags)
+        g.flags.update(_flags)
+
+        return g
+
+
+register(primops.map_reduce)(MapReduceGradient(name='map_reduce_gradient'))
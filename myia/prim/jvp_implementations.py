@@ -0,0 +1,601 @@
+"""Implementations of the primitives' tangents for forward mode.
+
+Each primitive is associated to a jvp function, which takes each argument of
+the primitive followed by its tangent, and returns a pair of the primitive's
+output and of the tangent of that output.
+"""
+
+from ..abstract import (
+    AbstractFunction,
+    GraphFunction,
+    JVPTransformedFunction,
+    PrimitiveFunction,
+)
+from ..composite import zeros_like
+from ..debug.label import short_relation_symbols as syms
+from ..info import About, NamedDebugInfo
+from ..ir import Graph, MetaGraph, clone
+from ..pipeline import standard_pipeline
+from ..utils import MyiaTypeError, Registry, newenv
+from . import ops as primops
+from .py_implementations import (
+    J,
+    Jinv,
+    array_cast,
+    array_to_scalar,
+    batch_dot,
+    casttag,
+    conv2d,
+    conv2d_input_grad,
+    conv2d_weight_grad,
+    distribute,
+    dot,
+    env_add,
+    env_getitem,
+    env_setitem,
+    reshape,
+    scalar_add,
+    scalar_cast,
+    scalar_cos,
+    scalar_div,
+    scalar_eq,
+    scalar_gt,
+    scalar_log,
+    scalar_max,
+    scalar_mul,
+    scalar_pow,
+    scalar_sin,
+    scalar_sub,
+    scalar_to_array,
+    scalar_usub,
+    switch,
+    tagged,
+    transpose,
+    tuple_getitem,
+    tuple_setitem,
+    unsafe_static_cast,
+)
+
+parse = standard_pipeline \
+    .select('parse') \
+    .make_transformer('input', 'graph')
+
+
+_flags = {'ignore_values': True, 'core': True, 'reference': True}
+
+
+def tangent_to_jvp(prim, fn, flags):
+    """Given a function for the tangent, make the jvp function.
+
+    The tangent function takes the primitive's arguments, its output, and
+    then the tangents of the arguments, in that order.
+    """
+    info = NamedDebugInfo(prim=prim, name=prim.name)
+
+    tangent = clone(parse(fn))
+    tangent.flags.update(_flags)
+    tangent.flags.update(flags)
+    tangent.debug.name = None
+    tangent.debug.about = About(info, 'jvp_tangent')  # type: ignore
+
+    nargs = (len(tangent.parameters) - 1) // 2
+    params = tangent.parameters[:nargs]
+    dparams = tangent.parameters[nargs + 1:]
+
+    with About(info, 'jvp'):
+        outer = Graph()
+        outer.flags.update(_flags)
+        outer.flags.update(flags)
+        outer.transforms['jvp_primal'] = prim
+
+    args = []
+    dargs = []
+    for p, dp in zip(params, dparams):
+        with About(p.debug, 'jvp'):
+            args.append(outer.add_parameter())
+        with About(dp.debug, 'jvp_tangent'):
+            dargs.append(outer.add_parameter())
+
+    out = outer.apply(prim, *args)
+    outer.output = outer.apply(
+        primops.make_tuple,
+        out,
+        outer.apply(tangent, *args, out, *dargs)
+    )
+    return clone(outer)
+
+
+jvp_graphs = Registry()
+register = jvp_graphs.register
+
+
+def register_tangent(prim, **flags):
+    """Register a jvp function for prim, given its tangent."""
+    def deco(fn):
+        g = tangent_to_jvp(prim, fn, flags)
+        return register(prim)(g)
+    return deco
+
+
+@register_tangent(primops.scalar_add)
+def tangent_scalar_add(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_add`."""
+    return scalar_add(dx, dy)
+
+
+@register_tangent(primops.scalar_sub)
+def tangent_scalar_sub(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_sub`."""
+    return scalar_sub(dx, dy)
+
+
+@register_tangent(primops.scalar_mul)
+def tangent_scalar_mul(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_mul`."""
+    return scalar_add(scalar_mul(dx, y), scalar_mul(x, dy))
+
+
+@register_tangent(primops.scalar_div)
+def tangent_scalar_div(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_div`."""
+    return scalar_div(scalar_sub(dx, scalar_mul(out, dy)), y)
+
+
+@register_tangent(primops.scalar_pow)
+def tangent_scalar_pow(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_pow`."""
+    return scalar_add(
+        scalar_mul(dx, scalar_mul(y, scalar_pow(x, scalar_sub(y, 1)))),
+        scalar_mul(dy, scalar_mul(scalar_log(x), out))
+    )
+
+
+@register_tangent(primops.scalar_exp)
+def tangent_scalar_exp(x, out, dx):
+    """Tangent for primitive `scalar_exp`."""
+    return dx * out
+
+
+@register_tangent(primops.scalar_log)
+def tangent_scalar_log(x, out, dx):
+    """Tangent for primitive `scalar_log`."""
+    return dx / x
+
+
+@register_tangent(primops.scalar_sin)
+def tangent_scalar_sin(x, out, dx):
+    """Tangent for primitive `scalar_sin`."""
+    return dx * scalar_cos(x)
+
+
+@register_tangent(primops.scalar_cos)
+def tangent_scalar_cos(x, out, dx):
+    """Tangent for primitive `scalar_cos`."""
+    return scalar_usub(dx * scalar_sin(x))
+
+
+@register_tangent(primops.scalar_tanh)
+def tangent_scalar_tanh(x, out, dx):
+    """Tangent for primitive `scalar_tanh`."""
+    return dx - dx * out * out
+
+
+@register_tangent(primops.scalar_uadd)
+def tangent_scalar_uadd(x, out, dx):
+    """Tangent for primitive `scalar_uadd`."""
+    return dx
+
+
+@register_tangent(primops.scalar_usub)
+def tangent_scalar_usub(x, out, dx):
+    """Tangent for primitive `scalar_usub`."""
+    return scalar_usub(dx)
+
+
+@register_tangent(primops.scalar_gt)
+def tangent_scalar_gt(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_gt`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.scalar_lt)
+def tangent_scalar_lt(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_lt`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.scalar_eq)
+def tangent_scalar_eq(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_eq`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.scalar_ne)
+def tangent_scalar_ne(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_ne`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.scalar_ge)
+def tangent_scalar_ge(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_ge`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.scalar_le)
+def tangent_scalar_le(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_le`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.scalar_max)
+def tangent_scalar_max(x, y, out, dx, dy):
+    """Tangent for primitive `scalar_max`."""
+    return switch(scalar_eq(x, y), scalar_max(dx, dy),
+                  switch(scalar_gt(x, y), dx, dy))
+
+
+@register_tangent(primops.scalar_cast)
+def tangent_scalar_cast(x, t, out, dx, dt):
+    """Tangent for primitive `scalar_cast`."""
+    return scalar_cast(dx, t)
+
+
+@register_tangent(primops.typeof)
+def tangent_typeof(x, out, dx):
+    """Tangent for primitive `typeof`."""
+    return out
+
+
+@register_tangent(primops.shape)
+def tangent_shape(arr, out, darr):
+    """Tangent for primitive `shape`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.broadcast_shape)
+def tangent_broadcast_shape(shp1, shp2, out, dshp1, dshp2):
+    """Tangent for primitive `broadcast_shape`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.tuple_getitem, ignore_values=False)
+def tangent_tuple_getitem(data, idx, out, ddata, didx):
+    """Tangent for primitive `tuple_getitem`."""
+    return tuple_getitem(ddata, idx)
+
+
+@register_tangent(primops.tuple_setitem, ignore_values=False)
+def tangent_tuple_setitem(data, idx, value, out, ddata, didx, dvalue):
+    """Tangent for primitive `tuple_setitem`."""
+    return tuple_setitem(ddata, idx, dvalue)
+
+
+@register_tangent(primops.identity)
+def tangent_identity(x, out, dx):
+    """Tangent for primitive `identity`."""
+    return dx
+
+
+@register_tangent(primops.switch)
+def tangent_switch(cond, tb, fb, out, dcond, dtb, dfb):
+    """Tangent for primitive `switch`."""
+    return switch(cond, dtb, dfb)
+
+
+@register_tangent(primops.scalar_to_array)
+def tangent_scalar_to_array(x, t, out, dx, dt):
+    """Tangent for primitive `scalar_to_array`."""
+    return scalar_to_array(dx, t)
+
+
+@register_tangent(primops.array_to_scalar)
+def tangent_array_to_scalar(x, out, dx):
+    """Tangent for primitive `array_to_scalar`."""
+    return array_to_scalar(dx)
+
+
+@register_tangent(primops.array_cast)
+def tangent_array_cast(x, t, out, dx, dt):
+    """Tangent for primitive `array_cast`."""
+    return array_cast(dx, t)
+
+
+@register_tangent(primops.dot)
+def tangent_dot(x, y, out, dx, dy):
+    """Tangent for primitive `dot`."""
+    return dot(dx, y) + dot(x, dy)
+
+
+@register_tangent(primops.batch_dot)
+def tangent_batch_dot(x, y, out, dx, dy):
+    """Tangent for primitive `batch_dot`."""
+    return batch_dot(dx, y) + batch_dot(x, dy)
+
+
+@register_tangent(primops.reshape, ignore_values=False)
+def tangent_reshape(xs, shp, out, dxs, dshp):
+    """Tangent for primitive `reshape`."""
+    return reshape(dxs, shp)
+
+
+@register_tangent(primops.transpose, ignore_values=False)
+def tangent_transpose(xs, perm, out, dxs, dperm):
+    """Tangent for primitive `transpose`."""
+    return transpose(dxs, perm)
+
+
+@register_tangent(primops.distribute, ignore_values=False)
+def tangent_distribute(arr, shp, out, darr, dshp):
+    """Tangent for primitive `distribute`."""
+    return distribute(darr, shp)
+
+
+@register_tangent(primops.conv2d, ignore_values=False)
+def tangent_conv2d(input, weight, stride, padding, dilation, groups, out,
+                   dinput, dweight, dstride, dpadding, ddilation, dgroups):
+    """Tangent for primitive `conv2d`."""
+    return (conv2d(dinput, weight, stride, padding, dilation, groups)
+            + conv2d(input, dweight, stride, padding, dilation, groups))
+
+
+@register_tangent(primops.conv2d_input_grad, ignore_values=False)
+def tangent_conv2d_input_grad(input_size, weight, grad_output, stride,
+                              padding, dilation, groups, out,
+                              dinput_size, dweight, dgrad_output, dstride,
+                              dpadding, ddilation, dgroups):
+    """Tangent for primitive `conv2d_input_grad`."""
+    return (conv2d_input_grad(input_size, dweight, grad_output, stride,
+                              padding, dilation, groups)
+            + conv2d_input_grad(input_size, weight, dgrad_output, stride,
+                                padding, dilation, groups))
+
+
+@register_tangent(primops.conv2d_weight_grad, ignore_values=False)
+def tangent_conv2d_weight_grad(input, weight_size, grad_output, stride,
+                               padding, dilation, groups, out,
+                               dinput, dweight_size, dgrad_output, dstride,
+                               dpadding, ddilation, dgroups):
+    """Tangent for primitive `conv2d_weight_grad`."""
+    return (conv2d_weight_grad(dinput, weight_size, grad_output, stride,
+                               padding, dilation, groups)
+            + conv2d_weight_grad(input, weight_size, dgrad_output, stride,
+                                 padding, dilation, groups))
+
+
+@register_tangent(primops.J)
+def tangent_J(x, out, dx):
+    """Tangent for primitive `J`."""
+    return J(dx)
+
+
+@register_tangent(primops.Jinv)
+def tangent_Jinv(x, out, dx):
+    """Tangent for primitive `Jinv`."""
+    return Jinv(dx)
+
+
+@register_tangent(primops.env_setitem, ignore_values=False)
+def tangent_env_setitem(env, key, x, out, denv, dkey, dx):
+    """Tangent for primitive `env_setitem`."""
+    return env_setitem(denv, key, dx)
+
+
+@register_tangent(primops.env_getitem, ignore_values=False)
+def tangent_env_getitem(env, key, dflt, out, denv, dkey, ddflt):
+    """Tangent for primitive `env_getitem`."""
+    return env_getitem(denv, key, ddflt)
+
+
+@register_tangent(primops.env_add)
+def tangent_env_add(env1, env2, out, denv1, denv2):
+    """Tangent for primitive `env_add`."""
+    return env_add(denv1, denv2)
+
+
+@register_tangent(primops.hastag, ignore_values=False)
+def tangent_hastag(x, t, out, dx, dt):
+    """Tangent for primitive `hastag`."""
+    return zeros_like(out)
+
+
+@register_tangent(primops.casttag, ignore_values=False)
+def tangent_casttag(x, t, out, dx, dt):
+    """Tangent for primitive `casttag`."""
+    return casttag(dx, t)
+
+
+@register_tangent(primops.tagged, ignore_values=False)
+def tangent_tagged(x, t, out, dx, dt):
+    """Tangent for primitive `tagged`."""
+    return tagged(dx, t)
+
+
+@register_tangent(primops.unsafe_static_cast, ignore_values=False)
+def tangent_unsafe_static_cast(x, t, out, dx, dt):
+    """Tangent for primitive `unsafe_static_cast`."""
+    return unsafe_static_cast(dx, t)
+
+
+def _jvp_primitive(fn):
+    """Return the primitive that fn is the jvp function of, if any."""
+    if isinstance(fn, JVPTransformedFunction):
+        fn = fn.fn
+        if isinstance(fn, PrimitiveFunction):
+            return fn.prim
+    elif isinstance(fn, GraphFunction):
+        return fn.graph.transforms.get('jvp_primal', None)
+    return None
+
+
+def _apply_jvp(jf, nargs, idx, tangents):
+    """Make a graph that returns element idx of jf(x, dx, y, dy, ...).
+
+    If tangents is True, the graph takes the arguments interleaved with their
+    tangents, otherwise it only takes the arguments and zero tangents are
+    used.
+    """
+    func = Graph()
+    func.flags.update(_flags)
+    args = []
+    for _ in range(nargs):
+        x = func.add_parameter()
+        if tangents:
+            dx = func.add_parameter()
+        else:
+            dx = func.apply(zeros_like, x)
+        args += [x, dx]
+    call = func.apply(jf, *args)
+    func.output = func.apply(primops.tuple_getitem, call, idx)
+    return func
+
+
+class MakeTupleJVP(MetaGraph):
+    """Generate the jvp graph for make_tuple."""
+
+    def generate_graph(self, args):
+        """Generate the jvp graph."""
+        g = Graph()
+        n = len(args) // 2
+        g.debug.name = f'{syms["jvp"]}make_tuple_{n}'
+        params = [g.add_parameter() for _ in args]
+        out = g.apply(primops.make_tuple, *params[::2])
+        dout = g.apply(primops.make_tuple, *params[1::2])
+        g.output = g.apply(primops.make_tuple, out, dout)
+        g.flags.update(_flags)
+        g.transforms['jvp_primal'] = primops.make_tuple
+        return g
+
+
+register(primops.make_tuple)(MakeTupleJVP(name='make_tuple_jvp'))
+
+
+class PartialJVP(MetaGraph):
+    """Generate the jvp graph for partial.
+
+    The function to partially apply is already transformed through jvp, so
+    the arguments are bound along with their tangents:
+
+        partial(f, x, y) => partial(jvp(f), x, dx, y, dy)
+    """
+
+    def generate_graph(self, args):
+        """Generate the jvp graph."""
+        g = Graph()
+        g.debug.name = f'{syms["jvp"]}partial'
+        jf, _, *params = [g.add_parameter() for _ in args]
+        out = g.apply(primops.partial, jf, *params)
+        g.output = g.apply(primops.make_tuple, out, newenv)
+        g.flags.update(_flags)
+        return g
+
+
+register(primops.partial)(PartialJVP(name='partial_jvp'))
+
+
+class ArrayMapJVP(MetaGraph):
+    """Generate the jvp graph for array_map.
+
+    Sketch of the transform:
+
+        array_map(f, xs, ys, ...) =>
+
+        def jvp_array_map(jf, df, xs, dxs, ys, dys, ...):
+            f = lambda x, y, ...: jf(x, zeros_like(x), y, zeros_like(y))[0]
+            df = lambda x, dx, y, dy, ...: jf(x, dx, y, dy, ...)[1]
+            return (array_map(f, xs, ys, ...),
+                    array_map(df, xs, dxs, ys, dys, ...))
+    """
+
+    def generate_graph(self, absargs):
+        """Generate the jvp graph."""
+        g = Graph()
+        g.debug.name = f'{syms["jvp"]}array_map'
+        jf, _, *params = [g.add_parameter() for _ in absargs]
+        args = params[::2]
+        fn = g.apply(primops.array_map,
+                     _apply_jvp(jf, len(args), 0, False), *args)
+        dfn = g.apply(primops.array_map,
+                      _apply_jvp(jf, len(args), 1, True), *params)
+        g.output = g.apply(primops.make_tuple, fn, dfn)
+        g.flags.update(_flags)
+        g.transforms['jvp_primal'] = primops.array_map
+        return g
+
+
+register(primops.array_map)(ArrayMapJVP(name='array_map_jvp'))
+
+
+def _check_sum(jr):
+    assert isinstance(jr, AbstractFunction)
+    if _jvp_primitive(jr.get_unique()) is not primops.scalar_add:
+        raise MyiaTypeError(
+            'The jvp of a reduction is only supported over scalar_add'
+        )
+
+
+class ArrayReduceJVP(MetaGraph):
+    """Generate the jvp graph for array_reduce.
+
+    As for the gradient, the jvp of array_reduce is only supported over the
+    `scalar_add` operation, which is linear:
+
+        array_reduce(scalar_add, xs, shp) =>
+
+        def jvp_array_reduce(jadd, dadd, xs, dxs, shp, dshp):
+            return (array_reduce(scalar_add, xs, shp),
+                    array_reduce(scalar_add, dxs, shp))
+    """
+
+    def generate_graph(self, absargs):
+        """Generate the jvp graph."""
+        _check_sum(absargs[0])
+        g = Graph()
+        g.debug.name = f'{syms["jvp"]}array_reduce'
+        _, _, xs, dxs, shp, _ = [g.add_parameter() for _ in absargs]
+        out = g.apply(primops.array_reduce, primops.scalar_add, xs, shp)
+        dout = g.apply(primops.array_reduce, primops.scalar_add, dxs, shp)
+        g.output = g.apply(primops.make_tuple, out, dout)
+        g.flags.update(_flags)
+        g.flags['ignore_values'] = False
+        g.transforms['jvp_primal'] = primops.array_reduce
+        return g
+
+
+register(primops.array_reduce)(ArrayReduceJVP(name='array_reduce_jvp'))
+
+
+class MapReduceJVP(MetaGraph):
+    """Generate the jvp graph for map_reduce.
+
+    Only a reduction over `scalar_add` is supported, so the tangent is the
+    sum of the tangents of the map:
+
+        map_reduce(scalar_add, f, shp, xs, ...) =>
+
+        def jvp_map_reduce(jadd, dadd, jf, df, shp, dshp, xs, dxs, ...):
+            f = lambda x, ...: jf(x, zeros_like(x), ...)[0]
+            df = lambda x, dx, ...: jf(x, dx, ...)[1]
+            return (map_reduce(scalar_add, f, shp, xs, ...),
+                    map_reduce(scalar_add, df, shp, xs, dxs, ...))
+    """
+
+    def generate_graph(self, absargs):
+        """Generate the jvp graph."""
+        _check_sum(absargs[0])
+        g = Graph()
+        g.debug.name = f'{syms["jvp"]}map_reduce'
+        _, _, jf, _, shp, _, *params = [g.add_parameter() for _ in absargs]
+        args = params[::2]
+        out = g.apply(primops.map_reduce, primops.scalar_add,
+                      _apply_jvp(jf, len(args), 0, False), shp, *args)
+        dout = g.apply(primops.map_reduce, primops.scalar_add,
+                       _apply_jvp(jf, len(args), 1, True), shp, *params)
+        g.output = g.apply(primops.make_tuple, out, dout)
+        g.flags.update(_flags)
+        g.flags['ignore_values'] = False
+        g.transforms['jvp_primal'] = primops.map_reduce
+        return g
+
+
+register(primops.map_reduce)(MapReduceJVP(name='map_reduce_jvp'))
@@ -13,6 +13,19 @@ from ..utils import Named
 class Primitive(Named):
     """Base class for primitives."""
 
+    def __reduce__(self):
+        # Primitives are pickled by name, and unpickled to the instance of
+        # this module with that name
+        return (_get_primitive, (self.name,))
+
+
+def _get_primitive(name):
+    """Return the primitive named name."""
+    for p in globals().values():
+        if isinstance(p, Primitive) and p.name == name:
+            return p
+    raise ValueError(f'Unknown primitive: {name}')
+
 
 ##############
 # Arithmetic #
@@ -99,16 +112,21 @@ array_len = Primitive('array_len')
 
 scalar_to_array = Primitive('scalar_to_array')
 array_to_scalar = Primitive('array_to_scalar')
+array_cast = Primitive('array_cast')
 broadcast_shape = Primitive('broadcast_shape')
 invert_permutation = Primitive('invert_permutation')
 shape = Primitive('shape')
 array_map = Primitive('array_map')
 array_scan = Primitive('array_scan')
+array_fold = Primitive('array_fold')
 array_reduce = Primitive('array_reduce')
+map_reduce = Primitive('map_reduce')
+array_map_group = Primitive('array_map_group')
 distribute = Primitive('distribute')
 reshape = Primitive('reshape')
 transpose = Primitive('transpose')
 dot = Primitive('dot')
+batch_dot = Primitive('batch_dot')
 
 conv2d = Primitive('conv2d')
 conv2d_input_grad = Primitive('conv2d_input_grad')
@@ -134,6 +152,8 @@ identity = Primitive('identity')
 partial = Primitive('partial')
 J = Primitive('J')
 Jinv = Primitive('Jinv')
+jvp = Primitive('jvp')
+vmap = Primitive('vmap')
 embed = Primitive('embed')
 env_setitem = Primitive('env_setitem')
 env_getitem = Primitive('env_getitem')
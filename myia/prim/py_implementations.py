@@ -6,7 +6,7 @@ from typing import Callable
 
 import numpy as np
 
-from .. import abstract, dtype as types
+from .. import dtype as types
 from ..dtype import Bool, Float, Number, pytype_to_myiatype
 from ..utils import Registry, TaggedValue
 from . import ops as primops
@@ -241,7 +241,8 @@ def bool_eq(x: Bool, y: Bool) -> Bool:
 @register(primops.typeof)
 def typeof(x):
     """Implement typeof."""
-    return abstract.from_value(x, broaden=True)
+    from ..abstract import from_value
+    return from_value(x, broaden=True)
 
 
 @register(primops.hastype)
@@ -409,6 +410,22 @@ def _array_scan_vm(vm, fn, init, array, axis):
     return array_scan(fn_, init, array, axis)
 
 
+@py_register(primops.array_fold)
+def array_fold(fn, init, array):
+    """Implement `array_fold`."""
+    state = init
+    for row in array:
+        state = fn(state, row)
+    return state
+
+
+@vm_register(primops.array_fold)
+def _array_fold_vm(vm, fn, init, array):
+    def fn_(state, row):
+        return vm.call(fn, [state, vm.convert(row)])
+    return array_fold(fn_, init, array)
+
+
 @py_register(primops.array_reduce)
 def array_reduce(fn, array, shp):
     """Implement `array_reduce`."""
@@ -452,6 +469,36 @@ def _array_reduce_vm(vm, fn, array, shp):
     return array_reduce(fn_, array, shp)
 
 
+@py_register(primops.map_reduce)
+def map_reduce(fn_reduce, fn_map, shp, *arrays):
+    """Implement `map_reduce`."""
+    return array_reduce(fn_reduce, array_map(fn_map, *arrays), shp)
+
+
+@vm_register(primops.map_reduce)
+def _map_reduce_vm(vm, fn_reduce, fn_map, shp, *arrays):
+    def fn_reduce_(a, b):
+        return vm.call(fn_reduce, [a, b])
+
+    def fn_map_(*args):
+        return vm.call(fn_map, args)
+    return map_reduce(fn_reduce_, fn_map_, shp, *arrays)
+
+
+@py_register(primops.array_map_group)
+def array_map_group(fn, arity, *arrays):
+    """Implement `array_map_group`."""
+    return tuple(array_map(fn, *arrays[i:i + arity])
+                 for i in range(0, len(arrays), arity))
+
+
+@vm_register(primops.array_map_group)
+def _array_map_group_vm(vm, fn, arity, *arrays):
+    def fn_(*args):
+        return vm.call(fn, args)
+    return array_map_group(fn_, arity, *arrays)
+
+
 @register(primops.distribute)
 def distribute(v, shape):
     """Implement `distribute`."""
@@ -476,6 +523,12 @@ def dot(a, b):
     return np.dot(a, b)
 
 
+@register(primops.batch_dot)
+def batch_dot(a, b):
+    """Implement `batch_dot`."""
+    return np.matmul(a, b)
+
+
 @register(primops.conv2d)
 def conv2d(input, weight, stride, padding, dilation, groups):
     """Implement 2d_convolution."""
@@ -520,10 +573,10 @@ def exception(x):
 @register(primops.scalar_cast)
 def scalar_cast(x, t):
     """Implement `scalar_cast`."""
-    from ..abstract import type_to_abstract
+    from ..abstract import TYPE, AbstractScalar, type_to_abstract
     t = type_to_abstract(t)
-    assert isinstance(t, abstract.AbstractScalar)
-    t = t.values[abstract.TYPE]
+    assert isinstance(t, AbstractScalar)
+    t = t.values[TYPE]
     assert issubclass(t, types.Number)
     dtype = types.type_to_np_dtype(t)
     return getattr(np, dtype)(x)
@@ -569,6 +622,17 @@ def array_to_scalar(x):
     return x.item()
 
 
+@register(primops.array_cast)
+def array_cast(x, t):
+    """Implement `array_cast`."""
+    from ..abstract import TYPE, AbstractScalar, type_to_abstract
+    t = type_to_abstract(t)
+    assert isinstance(t, AbstractScalar)
+    t = t.values[TYPE]
+    assert issubclass(t, types.Number)
+    return x.astype(types.type_to_np_dtype(t))
+
+
 @register(primops.broadcast_shape)
 def broadcast_shape(shpx, shpy):
     """Implement `broadcast_shape`."""
@@ -639,6 +703,18 @@ def Jinv(x):
     raise NotImplementedError()
 
 
+@py_register(primops.jvp)
+def jvp(x):
+    """Implement `jvp`."""
+    raise NotImplementedError()
+
+
+@py_register(primops.vmap)
+def vmap(x, in_axes, size):
+    """Implement `vmap`."""
+    raise NotImplementedError()
+
+
 @register(primops.embed)
 def embed(node):
     """Placeholder for the implementation of `embed`."""
@@ -0,0 +1,169 @@
+"""Run the programs exported by myia.export.
+
+Loading a program only imports the VM and the backend it was compiled for,
+not the parser, the inference engine or the optimizer, and nothing is
+compiled again:
+
+    predict = myia.runtime.load('predict.myia')
+    y = predict(w, x)
+"""
+
+import pickle
+from threading import Lock
+
+import numpy as np
+
+from . import dtype
+from .compile.backends import load_backend
+from .compile.vm import FinalVM
+from .utils import MyiaInputTypeError
+
+# Version of the format of the files written by myia.export and read by load
+EXPORT_VERSION = 1
+
+
+def _scalar_type(np_dtype):
+    return dtype.Nil if np_dtype is None else dtype.np_dtype_to_type(np_dtype)
+
+
+def _convert_arg(arg, spec, backend):
+    """Convert an argument to the format of the VM, as described by spec."""
+    kind = spec[0]
+    if kind == 'tuple':
+        if not isinstance(arg, tuple):
+            raise MyiaInputTypeError('Expected tuple')
+        if len(arg) != len(spec[1]):
+            raise MyiaInputTypeError(f'Expected {len(spec[1])} elements')
+        return tuple(_convert_arg(x, s, backend)
+                     for x, s in zip(arg, spec[1]))
+    elif kind == 'dict':
+        _, keys, specs = spec
+        if not isinstance(arg, dict):
+            raise MyiaInputTypeError('Expected dict')
+        if set(arg.keys()) != set(keys):
+            raise MyiaInputTypeError('Mismatched keys for input dictionary.')
+        return tuple(_convert_arg(arg[k], s, backend)
+                     for k, s in zip(keys, specs))
+    elif kind == 'class':
+        _, cls, _, attrs, specs = spec
+        if not isinstance(arg, cls):
+            raise MyiaInputTypeError(f'Expected {cls.__qualname__}')
+        return tuple(_convert_arg(getattr(arg, attr), s, backend)
+                     for attr, s in zip(attrs, specs))
+    elif kind == 'array':
+        _, np_dtype, shape = spec
+        if isinstance(arg, np.ndarray):
+            if arg.dtype != np_dtype:
+                raise MyiaInputTypeError('Wrong dtype')
+            arg = backend.from_numpy(arg)
+        backend.check_array(arg, dtype.np_dtype_to_type(np_dtype))
+        if tuple(arg.shape) != shape:
+            raise MyiaInputTypeError(f'Expected an array of shape {shape}')
+        return arg
+    else:
+        assert kind == 'scalar'
+        np_dtype = spec[1]
+        if np_dtype is None:
+            if arg is not None:
+                raise MyiaInputTypeError('Expected None')
+        elif np_dtype == 'bool':
+            if not isinstance(arg, bool):
+                raise MyiaInputTypeError('Expected bool')
+        elif np_dtype.startswith('float'):
+            if not isinstance(arg, (float, np.floating)):
+                raise MyiaInputTypeError('Expected float')
+        elif not isinstance(arg, (int, np.integer)):
+            raise MyiaInputTypeError('Expected int')
+        return backend.from_scalar(arg, _scalar_type(np_dtype))
+
+
+def _convert_result(res, spec, backend):
+    """Convert a result of the VM, as described by spec."""
+    kind = spec[0]
+    if kind == 'tuple':
+        return tuple(_convert_result(x, s, backend)
+                     for x, s in zip(res, spec[1]))
+    elif kind == 'dict':
+        _, keys, specs = spec
+        return dict(zip(keys, (_convert_result(x, s, backend)
+                               for x, s in zip(res, specs))))
+    elif kind == 'class':
+        _, _, constructor, attrs, specs = spec
+        if not isinstance(res, tuple):
+            res = tuple(getattr(res, attr) for attr in attrs)
+        return constructor(*(_convert_result(x, s, backend)
+                             for x, s in zip(res, specs)))
+    elif kind == 'array':
+        return backend.to_numpy(res)
+    else:
+        assert kind == 'scalar'
+        return backend.to_scalar(res)
+
+
+class _Unpickler(pickle.Unpickler):
+    """Rebuild the kernels of a backend from their recipe."""
+
+    def __init__(self, file, backend):
+        super().__init__(file)
+        self.backend = backend
+
+    def persistent_load(self, pid):
+        if pid == 'backend':
+            return self.backend
+        factory, data = pid
+        return factory(*data)
+
+
+class Program:
+    """A program exported by myia.export.
+
+    Attributes:
+        backend: The backend the program runs on.
+        argspec: Description of the arguments of the program.
+        outspec: Description of the result of the program.
+
+    """
+
+    def __init__(self, code, backend, argspec, outspec):
+        """Initialize a Program."""
+        self.backend = backend
+        self.argspec = argspec
+        self.outspec = outspec
+        self._vm = FinalVM(code, backend)
+        # The VM keeps its state while it runs, so it can only run one call
+        # at a time
+        self._lock = Lock()
+
+    def __call__(self, *args):
+        """Run the program on the given args."""
+        if len(args) != len(self.argspec):
+            raise MyiaInputTypeError('Wrong number of arguments.')
+        args = tuple(_convert_arg(arg, spec, self.backend)
+                     for arg, spec in zip(args, self.argspec))
+        with self._lock:
+            res = self._vm(*args)
+        return _convert_result(res, self.outspec, self.backend)
+
+
+def load(path, backend_options=None):
+    """Load a program written by myia.export.
+
+    Warning: the file is unpickled, which can create arbitrary objects and
+    call arbitrary callables. Only load files from trusted sources.
+
+    Arguments:
+        path: The file to read.
+        backend_options: Options for the backend, to use instead of the
+            ones given to export, e.g. to run the program on another device.
+    """
+    with open(path, 'rb') as f:
+        header = pickle.load(f)
+        if header.get('version') != EXPORT_VERSION:
+            raise ValueError(f'{path} was not written by a compatible '
+                             f'version of myia.export')
+        if backend_options is None:
+            backend_options = header['backend_options']
+        backend = load_backend(header['backend'], backend_options)
+        program = _Unpickler(f, backend).load()
+    return Program(program['code'], backend,
+                   program['argspec'], program['outspec'])
@@ -0,0 +1,247 @@
+"""Serve a function compiled by Myia, batching the requests.
+
+Each call to a compiled function pays the cost of converting the arguments
+and of running the VM, which dominates for small inputs. BatchServer
+gathers the requests that arrive within a short delay, stacks their
+arguments along a new batch axis and makes a single call for all of them:
+
+    @myia
+    def predict(w, x):
+        return dot(x, w)
+
+    async with BatchServer(predict, batched=[False, True]) as server:
+        y = await server(w, x)
+
+Batches are padded to a power of two, so that only a few specializations
+of the function are compiled.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class BatchMetrics:
+    """Statistics on the requests answered by a BatchServer.
+
+    Attributes:
+        requests: Number of requests answered.
+        batches: Number of calls to the function.
+        queue_time: Total time spent by the requests before their batch ran.
+        latency: Total time between the requests and their answers.
+        max_queue_size: Largest number of requests waiting in the queue.
+
+    """
+
+    requests: int = 0
+    batches: int = 0
+    queue_time: float = 0.0
+    latency: float = 0.0
+    max_queue_size: int = 0
+
+    @property
+    def mean_batch_size(self):
+        """Average number of requests in a batch."""
+        return self.requests / self.batches if self.batches else 0.0
+
+    @property
+    def mean_queue_time(self):
+        """Average time spent by a request before its batch ran."""
+        return self.queue_time / self.requests if self.requests else 0.0
+
+    @property
+    def mean_latency(self):
+        """Average time to answer a request."""
+        return self.latency / self.requests if self.requests else 0.0
+
+
+@dataclass(eq=False)
+class _Request:
+    args: tuple
+    key: tuple
+    future: asyncio.Future
+    time: float
+
+
+def _unbatch(res, i):
+    """Return the result of the i-th request in the result of a batch."""
+    if isinstance(res, tuple):
+        return tuple(_unbatch(r, i) for r in res)
+    elif isinstance(res, np.ndarray):
+        return res[i]
+    else:
+        raise TypeError(f'Cannot split a result of type {type(res)}')
+
+
+class BatchServer:
+    """Serve a function compiled by Myia, batching the requests.
+
+    Attributes:
+        fn: The MyiaFunction to call. It receives the batched arguments with
+            a leading batch axis, and must return arrays, or tuples of
+            arrays, with a leading batch axis.
+        batched: Whether each argument is batched. The arguments that are
+            not, e.g. the weights of a model, are given as is to fn, and
+            only requests with the same ones are batched together. All the
+            arguments are batched by default.
+        max_batch_size: Largest number of requests in a batch.
+        max_latency: Longest time in seconds to wait for more requests
+            after the first one of a batch.
+        metrics: BatchMetrics for the requests answered so far.
+
+    """
+
+    def __init__(self, fn, *, batched=None, max_batch_size=32,
+                 max_latency=0.002):
+        """Initialize a BatchServer."""
+        self.fn = fn
+        self.batched = batched
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.metrics = BatchMetrics()
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        """Start answering requests."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._serve())
+
+    async def stop(self):
+        """Answer the pending requests, then stop."""
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        await self.stop()
+
+    def _key(self, args):
+        """Return a key that is equal for requests that can be batched."""
+        batched = self.batched or [True] * len(args)
+        if len(batched) != len(args):
+            raise TypeError(f'Expected {len(batched)} arguments')
+        key = []
+        for arg, b in zip(args, batched):
+            if not b:
+                # Other arguments, e.g. models holding arrays, may not be
+                # comparable. The requests keep them alive while they wait,
+                # so their id is not reused.
+                key.append(arg if isinstance(arg, (bool, int, float, str))
+                           or arg is None else id(arg))
+            elif isinstance(arg, np.ndarray):
+                key.append((arg.shape, arg.dtype))
+            else:
+                raise TypeError('Batched arguments must be arrays')
+        return tuple(key)
+
+    async def __call__(self, *args):
+        """Return the result of fn for a single request."""
+        if self._task is None:
+            raise RuntimeError('The BatchServer is not started')
+        future = asyncio.get_event_loop().create_future()
+        request = _Request(args, self._key(args), future, time.perf_counter())
+        await self._queue.put(request)
+        self.metrics.max_queue_size = max(self.metrics.max_queue_size,
+                                          self._queue.qsize())
+        return await future
+
+    async def _serve(self):
+        """Gather the requests in batches and run them."""
+        pending = []
+        stopping = False
+        while pending or not stopping:
+            if not pending:
+                request = await self._queue.get()
+                if request is None:
+                    break
+                pending.append(request)
+
+            try:
+                batch, pending, stopping = \
+                    await self._next_batch(pending, stopping)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Fail the pending requests rather than the server
+                for r in pending:
+                    if not r.future.done():
+                        r.future.set_exception(exc)
+                pending = []
+                continue
+            await self._run(batch)
+
+    async def _next_batch(self, pending, stopping):
+        """Take the requests to batch with the first pending one.
+
+        Returns the batch, the requests left pending and whether the server
+        is stopping.
+        """
+        key = pending[0].key
+        size = sum(r.key == key for r in pending)
+        deadline = pending[0].time + self.max_latency
+        while not stopping and size < self.max_batch_size:
+            # The requests already in the queue are taken even after the
+            # deadline
+            timeout = deadline - time.perf_counter()
+            try:
+                if not self._queue.empty() or timeout <= 0:
+                    request = self._queue.get_nowait()
+                else:
+                    request = await asyncio.wait_for(self._queue.get(),
+                                                     timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if request is None:
+                stopping = True
+            else:
+                pending.append(request)
+                size += request.key == key
+
+        batch = [r for r in pending if r.key == key]
+        batch = batch[:self.max_batch_size]
+        pending = [r for r in pending if r not in batch]
+        return batch, pending, stopping
+
+    async def _run(self, batch):
+        """Call fn on a batch of requests and give them their result."""
+        start = time.perf_counter()
+        n = len(batch)
+        size = min(1 << (n - 1).bit_length(), self.max_batch_size)
+        requests = batch + [batch[-1]] * (size - n)
+        batched = self.batched or [True] * len(batch[0].args)
+        args = [np.stack(column) if b else column[0]
+                for column, b in zip(zip(*[r.args for r in requests]),
+                                     batched)]
+        try:
+            # A new size of batch is compiled in call_async, which must not
+            # block the other requests
+            loop = asyncio.get_event_loop()
+            future = await loop.run_in_executor(None, self.fn.call_async,
+                                                *args)
+            res = await future
+            results = [_unbatch(res, i) for i in range(n)]
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            for r in batch:
+                if not r.future.done():
+                    r.future.set_exception(exc)
+        else:
+            for r, result in zip(batch, results):
+                if not r.future.done():
+                    r.future.set_result(result)
+
+        end = time.perf_counter()
+        m = self.metrics
+        m.requests += n
+        m.batches += 1
+        m.queue_time += sum(start - r.time for r in batch)
+        m.latency += sum(end - r.time for r in batch)
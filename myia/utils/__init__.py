@@ -16,6 +16,7 @@ from .errors import (  # noqa
 from .intern import (  # noqa
     Atom,
     AttrEK,
+    DeepKey,
     EqKey,
     IncompleteException,
     Interned,
@@ -2,8 +2,8 @@
 
 from contextvars import ContextVar
 
-infer_trace = ContextVar('infer_trace')
-infer_trace.set({})
+# With a default, so that functions can also be compiled in other threads
+infer_trace = ContextVar('infer_trace', default={})
 
 
 class InferenceError(Exception):
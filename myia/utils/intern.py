@@ -101,6 +101,38 @@ class IncompleteException(Exception):
     """Raised when a data structure is incomplete."""
 
 
+class DeepKey(tuple):
+    """Key returned by deep_eqkey, which caches its hash.
+
+    A DeepKey is a pair of a type and of the keys of the object's elements.
+    The keys of the elements that are cached themselves are reused as-is, so
+    the hash of a key is computed in time proportional to its number of
+    direct elements, and the comparison of two keys that share elements stops
+    at those elements, which are identical.
+    """
+
+    def __hash__(self):
+        h = self.__dict__.get('_hash')
+        if h is None:
+            h = self._hash = tuple.__hash__(self)
+        return h
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, DeepKey):
+            return NotImplemented
+        h1 = self.__dict__.get('_hash')
+        h2 = other.__dict__.get('_hash')
+        if h1 is not None and h2 is not None and h1 != h2:
+            return False
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        rval = self.__eq__(other)
+        return rval if rval is NotImplemented else not rval
+
+
 def deep_eqkey(obj, path=frozenset()):
     """Return a key for equality tests for non-recursive structures."""
     cachable = getattr(obj, '__cache_eqkey__', False)
@@ -119,12 +151,12 @@ def deep_eqkey(obj, path=frozenset()):
 
     key = eqkey(obj)
     if isinstance(key, ElementsBase):
-        dk = key.type, type(key.values)(
+        dk = DeepKey((key.type, type(key.values)(
             deep_eqkey(x, path | {oid}) for x in key.values
-        )
+        )))
     else:
         assert isinstance(key, Atom)
-        dk = key.type, key.value
+        dk = DeepKey((key.type, key.value))
 
     if cachable:
         obj._eqkey_deepkey = dk
@@ -226,17 +258,29 @@ def eq(obj1, obj2):
 
 
 class Wrapper:
-    """Wraps an object and uses eq/hash for equality."""
+    """Wraps an object and uses eq/hash for equality.
+
+    The hash is computed once, when the Wrapper is created, so that the entry
+    for an object can still be found and removed from the intern pool after
+    that object dies.
+    """
 
     def __init__(self, obj):
         """Initialize a Wrapper."""
         self._obj = weakref.ref(obj)
+        self._hash = hash(obj)
 
     def __eq__(self, other):
-        return eq(self._obj(), other._obj())
+        if self is other:
+            return True
+        obj1 = self._obj()
+        obj2 = other._obj()
+        if obj1 is None or obj2 is None:
+            return False
+        return eq(obj1, obj2)
 
     def __hash__(self):
-        return hash(self._obj())
+        return self._hash
 
 
 class InternedMC(type):
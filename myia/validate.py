@@ -98,16 +98,20 @@ whitelist = frozenset({
     P.array_len,
     P.scalar_to_array,
     P.array_to_scalar,
+    P.array_cast,
     P.broadcast_shape,
     P.invert_permutation,
     P.shape,
     P.array_map,
     P.array_scan,
+    P.array_fold,
     P.array_reduce,
+    P.map_reduce,
     P.distribute,
     P.reshape,
     P.transpose,
     P.dot,
+    P.batch_dot,
     P.switch,
     P.return_,
     # P.make_list,
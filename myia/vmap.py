@@ -0,0 +1,615 @@
+"""Generate the graphs for batched (vectorized) execution.
+
+The vmap transform on a graph produces a graph that computes the original
+graph on a whole batch of arguments at once. Batched values carry an extra
+leading dimension: a batch of scalars is an array of shape `(size,)`, and a
+batch of arrays of shape `S` is an array of shape `(size, *S)`. Tuples and
+Envs are batched element-wise.
+
+Each node of the original graph is either batched, if it depends on a
+batched argument, or shared by the whole batch. Applications of primitives
+on batched values are rewritten according to the rules in `batching_rules`,
+e.g.:
+
+    array_map(f, xs, y)      => array_map(f, xs, broadcast(y))
+    array_reduce(f, xs, shp) => array_reduce(f, xs, (size, *shp))
+    dot(xs, w)               => reshape(dot(reshape(xs, ...), w), ...)
+
+Calls to graphs are redirected to a batched version of these graphs that is
+specialized for which arguments are batched. Branches may only depend on
+values that are shared by the whole batch.
+
+Because the rules depend on the types and shapes of the original nodes, the
+optimizer only expands vmap once the graph is fully typed and all the
+functions it calls are known.
+"""
+
+from .abstract import (
+    ANYTHING,
+    SHAPE,
+    TYPE,
+    VALUE,
+    AbstractArray,
+    AbstractFunction,
+    AbstractJTagged,
+    AbstractScalar,
+    AbstractTuple,
+    build_value,
+)
+from .dtype import Bool, EnvType, Number
+from .graph_utils import EXCLUDE, FOLLOW, toposort
+from .info import About
+from .ir import ANFNode, Constant, Graph, succ_incoming
+from .prim import Primitive, ops as P
+from .utils import MyiaShapeError, MyiaTypeError
+
+batching_rules = {}
+
+_array_type = AbstractArray(ANYTHING, {SHAPE: ANYTHING})
+
+
+def register_batching_rule(*prims):
+    """Register a batching rule for the given primitives.
+
+    The rule is called with the BatchedGraph, the original node and a
+    `(new_node, is_batched)` pair for each argument, and it must return a
+    `(new_node, is_batched)` pair for the result.
+    """
+    def deco(fn):
+        for prim in prims:
+            batching_rules[prim] = fn
+        return fn
+    return deco
+
+
+def _abstract(node):
+    if node.abstract is None:
+        # New nodes are typed by the next renormalization of the graph
+        raise NotImplementedError(f'{node} must be typed before vmap')
+    return node.abstract
+
+
+def _is_number(a):
+    return (isinstance(a, AbstractScalar)
+            and issubclass(a.values[TYPE], (Number, Bool)))
+
+
+def _batchable(a):
+    """Return whether a value of type a has a batched version."""
+    if isinstance(a, AbstractScalar):
+        return _is_number(a) or a.values[TYPE] is EnvType
+    elif isinstance(a, AbstractArray):
+        return True
+    elif isinstance(a, AbstractTuple):
+        return any(_batchable(e) for e in a.elements)
+    elif isinstance(a, AbstractJTagged):
+        return _batchable(a.element)
+    else:
+        return False
+
+
+def _shape(a):
+    shp = a.values[SHAPE]
+    if any(s is ANYTHING for s in shp):
+        raise MyiaShapeError(f'vmap requires known shapes, not {shp}')
+    return shp
+
+
+class Batcher:
+    """Generate batched versions of graphs for a given batch size.
+
+    Attributes:
+        size: The size of the batch.
+        graphs: Batched versions of closed graphs, indexed by the original
+            graph, which of its parameters are batched, and whether its
+            output must be batched.
+
+    """
+
+    def __init__(self, size):
+        """Initialize a Batcher."""
+        self.size = size
+        self.graphs = {}
+
+    def batched_graph(self, g, pattern, out_batched, ctx=None):
+        """Return the batched version of g.
+
+        Arguments:
+            g: The graph to batch.
+            pattern: Whether each parameter of g is batched.
+            out_batched: Whether the output must be batched.
+            ctx: The BatchedGraph in which g is used. Closures are
+                transformed in the context of their parent, so that they
+                can refer to the batched nodes of their parent.
+        """
+        parent = ctx
+        while parent is not None and parent.graph is not g.parent:
+            parent = parent.parent
+        cache = self.graphs if parent is None else parent.closures
+        key = (g, pattern, out_batched)
+        if key not in cache:
+            bg = BatchedGraph(self, g, pattern, out_batched, parent)
+            # Register the graph first, for recursive calls
+            cache[key] = bg.new_graph
+            bg.run()
+        return cache[key]
+
+
+class BatchedGraph:
+    """Batched version of a graph.
+
+    Attributes:
+        batcher: The Batcher this graph belongs to.
+        graph: The original graph.
+        new_graph: The batched graph.
+        parent: The BatchedGraph for the parent of graph, if graph is a
+            closure.
+        repl: Map each node of graph to a `(new_node, is_batched)` pair.
+        closures: Batched versions of the closures of graph.
+
+    """
+
+    def __init__(self, batcher, graph, pattern, out_batched, parent):
+        """Initialize a BatchedGraph."""
+        self.batcher = batcher
+        self.size = batcher.size
+        self.graph = graph
+        self.out_batched = out_batched
+        self.parent = parent
+        self.repl = {}
+        self.closures = {}
+        self.new_graph = graph.make_new('vmap')
+        self.new_graph.transforms = {}
+        for p, batched in zip(graph.parameters, pattern):
+            with About(p.debug, 'vmap'):
+                new_p = self.new_graph.add_parameter()
+            self.repl[p] = (new_p, batched)
+
+    def run(self):
+        """Generate the nodes of the batched graph."""
+        out = self.graph.output
+        new_out, batched = self.get(out)
+        if self.out_batched and not batched:
+            new_out = self.broadcast(new_out, _abstract(out))
+        self.new_graph.output = new_out
+
+    def apply(self, *inputs):
+        """Create an Apply node in the batched graph."""
+        return self.new_graph.apply(*inputs)
+
+    def get(self, node):
+        """Return the `(new_node, is_batched)` pair for node."""
+        ctx = self
+        while ctx is not None:
+            if node.graph is ctx.graph:
+                if node not in ctx.repl:
+                    ctx.convert(node)
+                new_node, batched = ctx.repl[node]
+                if new_node is None:
+                    raise NotImplementedError(
+                        f'vmap does not support the function {node} here'
+                    )
+                return new_node, batched
+            ctx = ctx.parent
+        if node.is_constant_graph():
+            return self.function(node.value), False
+        # Constants and free variables from outside of the transformed scope
+        # are shared by the whole batch
+        return node, False
+
+    def convert(self, node):
+        """Generate the batched nodes for node and its dependencies."""
+        def include(n):
+            if n.graph is not self.graph or n in self.repl:
+                return EXCLUDE
+            return FOLLOW
+
+        for n in toposort(node, succ_incoming, include):
+            # Closures may have converted n in the meantime
+            if n not in self.repl:
+                self.repl[n] = self.convert_apply(n)
+
+    def convert_apply(self, node):
+        """Generate the batched node for an Apply node."""
+        fn, *args = node.inputs
+        if isinstance(_abstract(node), AbstractFunction):
+            # Functions are generated where they are called, when we know
+            # which of their arguments are batched
+            return None, False
+        elif fn.is_constant(Primitive):
+            return self.apply_primitive(node, fn.value, args)
+        else:
+            return self.call(node, fn, args)
+
+    def apply_primitive(self, node, prim, args):
+        """Apply a primitive, using its batching rule if needed."""
+        new_args = [self.get(arg) for arg in args]
+        if not any(batched for _, batched in new_args):
+            return self.apply(prim, *[arg for arg, _ in new_args]), False
+        rule = batching_rules.get(prim, None)
+        if rule is None:
+            raise MyiaTypeError(f'vmap is not supported for {prim}')
+        return rule(self, node, *new_args)
+
+    def closes_over_batched(self, g):
+        """Return whether g has a batched free variable."""
+        return any(self.get(fv)[1] for fv in g.free_variables_total
+                   if isinstance(fv, ANFNode))
+
+    def function(self, g):
+        """Return a function that is shared by the whole batch."""
+        if g.parent is None:
+            return Constant(g)
+        if self.closes_over_batched(g):
+            raise MyiaTypeError(
+                f'vmap does not support {g} here, because it depends on'
+                f' batched values'
+            )
+        pattern = (False,) * len(g.parameters)
+        return Constant(self.batcher.batched_graph(g, pattern, False, self))
+
+    def call(self, node, fn, args):
+        """Call the batched version of a graph."""
+        new_args = [self.get(arg) for arg in args]
+        pattern = tuple(batched for _, batched in new_args)
+        if fn.is_constant_graph():
+            cond = None
+            graphs = [fn.value]
+        elif (fn.is_apply(P.switch)
+                and all(x.is_constant_graph() for x in fn.inputs[2:])):
+            cond, batched = self.get(fn.inputs[1])
+            if batched:
+                raise MyiaTypeError(
+                    'vmap does not support branches that depend on'
+                    ' batched values'
+                )
+            graphs = [x.value for x in fn.inputs[2:]]
+        else:
+            raise NotImplementedError(f'vmap cannot call {fn}')
+
+        out_batched = _batchable(_abstract(node)) and (
+            any(pattern) or any(self.closes_over_batched(g) for g in graphs)
+        )
+        new_fns = [
+            Constant(self.batcher.batched_graph(g, pattern, out_batched, self))
+            for g in graphs
+        ]
+        if cond is None:
+            new_fn, = new_fns
+        else:
+            new_fn = self.apply(P.switch, cond, *new_fns)
+        return self.apply(new_fn, *[arg for arg, _ in new_args]), out_batched
+
+    def batched(self, pair, a):
+        """Return the batched version of a value of type a."""
+        node, batched = pair
+        return node if batched else self.broadcast(node, a)
+
+    def broadcast(self, node, a):
+        """Broadcast a value of type a to the whole batch."""
+        size = self.size
+        if isinstance(a, AbstractScalar):
+            if _is_number(a):
+                arr = self.apply(P.scalar_to_array, node, _array_type)
+                return self.apply(P.distribute, arr, (size,))
+            elif a.values[TYPE] is EnvType and not node.is_constant():
+                raise MyiaTypeError('vmap cannot broadcast an Env')
+            return node
+        elif isinstance(a, AbstractArray):
+            shp = _shape(a)
+            arr = self.apply(P.reshape, node, (1, *shp))
+            return self.apply(P.distribute, arr, (size, *shp))
+        elif isinstance(a, AbstractTuple):
+            return self.apply(P.make_tuple, *[
+                self.broadcast(self.apply(P.tuple_getitem, node, i), e)
+                for i, e in enumerate(a.elements)
+            ])
+        elif isinstance(a, AbstractJTagged):
+            inner = self.broadcast(self.apply(P.Jinv, node), a.element)
+            return self.apply(P.J, inner)
+        else:
+            return node
+
+    def prepend_size(self, pair, orig):
+        """Prepend the size of the batch to a shape that is not batched."""
+        shp, batched = pair
+        if batched:
+            raise MyiaTypeError('vmap does not support batched shapes')
+        a = _abstract(orig)
+        value = build_value(a, default=ANYTHING)
+        if value is not ANYTHING:
+            return Constant((self.size, *value))
+        return self.apply(P.make_tuple, self.size, *[
+            self.apply(P.tuple_getitem, shp, i)
+            for i in range(len(a.elements))
+        ])
+
+
+#################
+# Batching rules #
+#################
+
+
+@register_batching_rule(P.scalar_add, P.scalar_sub, P.scalar_mul,
+                        P.scalar_div, P.scalar_mod, P.scalar_pow,
+                        P.scalar_trunc, P.scalar_floor, P.scalar_max,
+                        P.scalar_uadd, P.scalar_usub, P.scalar_exp,
+                        P.scalar_log, P.scalar_sin, P.scalar_cos,
+                        P.scalar_tan, P.scalar_tanh, P.scalar_eq,
+                        P.scalar_lt, P.scalar_gt, P.scalar_ne, P.scalar_le,
+                        P.scalar_ge, P.bool_not, P.bool_and, P.bool_or,
+                        P.bool_eq, P.scalar_cast)
+def _batch_scalar_op(bg, node, *args):
+    """A scalar operation on a batch is an array_map over the batch."""
+    prim, *orig_args = node.inputs
+    if all(_is_number(_abstract(arg)) for arg in orig_args):
+        fn = prim
+        inputs = args
+    else:
+        # Arguments such as types stay out of the array_map
+        with About(node.debug, 'vmap'):
+            g = Graph()
+        g.set_flags('core', 'reference')
+        elem_args = []
+        inputs = []
+        for pair, arg in zip(args, orig_args):
+            if _is_number(_abstract(arg)):
+                elem_args.append(g.add_parameter())
+                inputs.append(pair)
+            else:
+                elem_args.append(pair[0])
+        g.output = g.apply(prim, *elem_args)
+        fn = Constant(g)
+    arrays = [bg.batched(pair, _abstract(arg))
+              for pair, arg in zip(inputs, orig_args)
+              if _is_number(_abstract(arg))]
+    return bg.apply(P.array_map, fn, *arrays), True
+
+
+@register_batching_rule(P.array_map)
+def _batch_array_map(bg, node, fn, *arrays):
+    _, _, *orig_arrays = node.inputs
+    new_arrays = [bg.batched(pair, _abstract(arr))
+                  for pair, arr in zip(arrays, orig_arrays)]
+    return bg.apply(P.array_map, fn[0], *new_arrays), True
+
+
+def _reduce(bg, reduce, orig_array, shp, orig_shp):
+    """Generate a reduction of a batch of arrays to orig_shp."""
+    if shp[1]:
+        raise MyiaTypeError('vmap does not support batched shapes')
+    rank = len(_shape(_abstract(orig_array)))
+    target = build_value(_abstract(orig_shp))
+    delta = rank - len(target)
+    if delta == 0:
+        return reduce((bg.size, *target))
+    # Reductions align the shape to the right, so we must keep the batch
+    # dimension explicitly
+    res = reduce((bg.size, *((1,) * delta), *target))
+    return bg.apply(P.reshape, res, (bg.size, *target))
+
+
+@register_batching_rule(P.array_reduce)
+def _batch_array_reduce(bg, node, fn, array, shp):
+    _, _, orig_array, orig_shp = node.inputs
+    return _reduce(
+        bg,
+        lambda new_shp: bg.apply(P.array_reduce, fn[0], array[0], new_shp),
+        orig_array, shp, orig_shp
+    ), True
+
+
+@register_batching_rule(P.map_reduce)
+def _batch_map_reduce(bg, node, fn_reduce, fn_map, shp, *arrays):
+    _, _, _, orig_shp, *orig_arrays = node.inputs
+    new_arrays = [bg.batched(pair, _abstract(arr))
+                  for pair, arr in zip(arrays, orig_arrays)]
+    return _reduce(
+        bg,
+        lambda new_shp: bg.apply(P.map_reduce, fn_reduce[0], fn_map[0],
+                                 new_shp, *new_arrays),
+        orig_arrays[0], shp, orig_shp
+    ), True
+
+
+@register_batching_rule(P.distribute)
+def _batch_distribute(bg, node, array, shp):
+    _, orig_array, orig_shp = node.inputs
+    a_shp = _shape(_abstract(orig_array))
+    new_shp = bg.prepend_size(shp, orig_shp)
+    delta = len(_abstract(orig_shp).elements) - len(a_shp)
+    arr = array[0]
+    if delta > 0:
+        # Align the dimensions of the array to the right of the batch
+        arr = bg.apply(P.reshape, arr, (bg.size, *((1,) * delta), *a_shp))
+    return bg.apply(P.distribute, arr, new_shp), True
+
+
+@register_batching_rule(P.reshape)
+def _batch_reshape(bg, node, array, shp):
+    new_shp = bg.prepend_size(shp, node.inputs[2])
+    return bg.apply(P.reshape, array[0], new_shp), True
+
+
+@register_batching_rule(P.transpose)
+def _batch_transpose(bg, node, array, perm):
+    perm = build_value(_abstract(node.inputs[2]))
+    new_perm = (0, *[p + 1 for p in perm])
+    return bg.apply(P.transpose, array[0], new_perm), True
+
+
+@register_batching_rule(P.dot)
+def _batch_dot(bg, node, x, y):
+    _, orig_x, orig_y = node.inputs
+    b = bg.size
+    n, m = _shape(_abstract(orig_x))
+    _, k = _shape(_abstract(orig_y))
+    (x, xb), (y, yb) = x, y
+    if xb and not yb:
+        # Multiply all the rows of the batch at once
+        res = bg.apply(P.dot, bg.apply(P.reshape, x, (b * n, m)), y)
+        return bg.apply(P.reshape, res, (b, n, k)), True
+    elif yb and not xb:
+        # Multiply with all the columns of the batch at once
+        y = bg.apply(P.transpose, y, (1, 0, 2))
+        res = bg.apply(P.dot, x, bg.apply(P.reshape, y, (m, b * k)))
+        res = bg.apply(P.reshape, res, (n, b, k))
+        return bg.apply(P.transpose, res, (1, 0, 2)), True
+    else:
+        return bg.apply(P.batch_dot, x, y), True
+
+
+@register_batching_rule(P.batch_dot)
+def _batch_batch_dot(bg, node, x, y):
+    # Merge the batch of vmap with the batch of batch_dot
+    b = bg.size
+    args = []
+    for pair, orig in zip((x, y), node.inputs[1:]):
+        c, *rest = _shape(_abstract(orig))
+        arr = bg.batched(pair, _abstract(orig))
+        args.append(bg.apply(P.reshape, arr, (b * c, *rest)))
+    res = bg.apply(P.batch_dot, *args)
+    return bg.apply(P.reshape, res, (b, *_shape(_abstract(node)))), True
+
+
+@register_batching_rule(P.conv2d)
+def _batch_conv2d(bg, node, input, weight, *args):
+    if weight[1] or any(batched for _, batched in args):
+        raise MyiaTypeError('vmap only supports conv2d on a batch of inputs')
+    b = bg.size
+    n, *rest = _shape(_abstract(node.inputs[1]))
+    inp = bg.apply(P.reshape, input[0], (b * n, *rest))
+    res = bg.apply(P.conv2d, inp, weight[0], *[arg for arg, _ in args])
+    return bg.apply(P.reshape, res, (b, *_shape(_abstract(node)))), True
+
+
+@register_batching_rule(P.shape)
+def _batch_shape(bg, node, array):
+    return Constant(_shape(_abstract(node.inputs[1]))), False
+
+
+@register_batching_rule(P.typeof)
+def _batch_typeof(bg, node, x):
+    return Constant(_abstract(node).values[VALUE]), False
+
+
+@register_batching_rule(P.scalar_to_array, P.array_to_scalar)
+def _batch_array_scalar(bg, node, x, *_):
+    # A batch of scalars and a batch of arrays of shape () are the same
+    return x[0], True
+
+
+@register_batching_rule(P.make_tuple)
+def _batch_make_tuple(bg, node, *elems):
+    new_elems = [bg.batched(pair, _abstract(elem))
+                 for pair, elem in zip(elems, node.inputs[1:])]
+    return bg.apply(P.make_tuple, *new_elems), True
+
+
+@register_batching_rule(P.tuple_getitem)
+def _batch_tuple_getitem(bg, node, tup, idx):
+    if idx[1]:
+        raise MyiaTypeError('vmap does not support batched indices')
+    res = bg.apply(P.tuple_getitem, tup[0], idx[0])
+    return res, _batchable(_abstract(node))
+
+
+@register_batching_rule(P.tuple_setitem)
+def _batch_tuple_setitem(bg, node, tup, idx, value):
+    _, orig_tup, _, orig_value = node.inputs
+    if idx[1]:
+        raise MyiaTypeError('vmap does not support batched indices')
+    res = bg.apply(P.tuple_setitem,
+                   bg.batched(tup, _abstract(orig_tup)),
+                   idx[0],
+                   bg.batched(value, _abstract(orig_value)))
+    return res, True
+
+
+def _select(bg, cond, x, y, a):
+    """Select between x and y for each element of the batch."""
+    if _is_number(a):
+        return bg.apply(P.array_map, P.switch, cond, x, y)
+    elif isinstance(a, AbstractArray):
+        shp = _shape(a)
+        cond = bg.apply(P.reshape, cond, (bg.size, *((1,) * len(shp))))
+        cond = bg.apply(P.distribute, cond, (bg.size, *shp))
+        return bg.apply(P.array_map, P.switch, cond, x, y)
+    elif isinstance(a, AbstractTuple):
+        return bg.apply(P.make_tuple, *[
+            _select(bg, cond,
+                    bg.apply(P.tuple_getitem, x, i),
+                    bg.apply(P.tuple_getitem, y, i),
+                    e)
+            for i, e in enumerate(a.elements)
+        ])
+    else:
+        raise MyiaTypeError(f'vmap cannot select between values of type {a}')
+
+
+@register_batching_rule(P.switch)
+def _batch_switch(bg, node, cond, x, y):
+    _, _, orig_x, orig_y = node.inputs
+    a = _abstract(node)
+    x = bg.batched(x, _abstract(orig_x))
+    y = bg.batched(y, _abstract(orig_y))
+    if cond[1]:
+        return _select(bg, cond[0], x, y, a), True
+    return bg.apply(P.switch, cond[0], x, y), True
+
+
+@register_batching_rule(P.identity, P.J, P.Jinv)
+def _batch_identity(bg, node, x):
+    prim = node.inputs[0].value
+    return bg.apply(prim, x[0]), x[1] and _batchable(_abstract(node))
+
+
+@register_batching_rule(P.embed)
+def _batch_embed(bg, node, x):
+    # Keys are not batched, but they are typed after the batched value
+    return bg.apply(P.embed, x[0]), False
+
+
+@register_batching_rule(P.env_setitem)
+def _batch_env_setitem(bg, node, env, key, value):
+    _, orig_env, _, orig_value = node.inputs
+    res = bg.apply(P.env_setitem,
+                   bg.batched(env, _abstract(orig_env)),
+                   key[0],
+                   bg.batched(value, _abstract(orig_value)))
+    return res, True
+
+
+@register_batching_rule(P.env_getitem)
+def _batch_env_getitem(bg, node, env, key, default):
+    if not env[1]:
+        raise MyiaTypeError('vmap cannot batch the default of env_getitem')
+    default = bg.batched(default, _abstract(node.inputs[3]))
+    return bg.apply(P.env_getitem, env[0], key[0], default), True
+
+
+@register_batching_rule(P.env_add)
+def _batch_env_add(bg, node, env1, env2):
+    _, orig_env1, orig_env2 = node.inputs
+    res = bg.apply(P.env_add,
+                   bg.batched(env1, _abstract(orig_env1)),
+                   bg.batched(env2, _abstract(orig_env2)))
+    return res, True
+
+
+def vmap(graph, in_axes, size, resources):
+    """Return the batched version of graph.
+
+    Arguments:
+        graph: The Graph to batch.
+        in_axes: 0 for each batched argument, None for each argument that
+            is shared by the whole batch.
+        size: The size of the batch.
+        resources: The pipeline resources.
+    """
+    if not isinstance(graph, Graph):
+        name = type(graph).__qualname__
+        raise NotImplementedError(f'vmap(::{name}) not implemented')
+    resources.manager.add_graph(graph)
+    pattern = tuple(ax == 0 for ax in in_axes)
+    return Batcher(size).batched_graph(graph, pattern, True)
@@ -8,18 +8,26 @@ from myia import dtype
 from myia.abstract import from_value
 from myia.api import to_device
 from myia.compile.backends import (
+    Backend,
     LoadingError,
     UnknownBackend,
     load_backend,
     parse_default,
 )
-from myia.pipeline import standard_pipeline
+from myia.compile.transform import group_array_maps
+from myia.pipeline import optimization_levels, standard_pipeline
+from myia.prim import ops as P
 from myia.prim.py_implementations import (
+    array_cast,
+    array_fold,
     array_reduce,
+    batch_dot,
     distribute,
     dot,
+    map_reduce,
     reshape,
     scalar_add,
+    scalar_mul,
     scalar_to_array,
     transpose,
 )
@@ -48,17 +56,23 @@ class BackendOption:
             load_backend(backend)
         except LoadingError as e:
             pytest.skip(f"Can't load {backend}: {e.__cause__}")
-        self.pip = standard_pipeline.configure({
+        self.pip = self.make_pipeline(backend, backend_options)
+        self.fused_pip = self.make_pipeline(backend, backend_options,
+                                            **optimization_levels[2])
+        self.backend = load_backend(backend, backend_options)
+
+    def make_pipeline(self, backend, backend_options, **changes):
+        return standard_pipeline.configure({
+            **changes,
             'compile.backend': backend,
             'compile.backend_options': backend_options
         }).make()
-        self.backend = load_backend(backend, backend_options)
 
     def convert_args(self, args):
         return tuple(to_device(arg, self.backend) for arg in args)
 
 
-def parse_compare(*tests, justeq=False):
+def parse_compare(*tests, justeq=False, fused=False):
     """Decorate a function to run it against pure python.
 
     This will run and compare the function using all available backends.
@@ -69,7 +83,8 @@ def parse_compare(*tests, justeq=False):
                 args = (args,)
             ref_result = fn(*map(copy, args))
             argspec = tuple(from_value(arg, broaden=True) for arg in args)
-            res = backend_opt.pip(input=fn, argspec=argspec)
+            pip = backend_opt.fused_pip if fused else backend_opt.pip
+            res = pip(input=fn, argspec=argspec)
             myia_fn = res['output']
             myia_args = backend_opt.convert_args(args)
             myia_result = myia_fn(*myia_args)
@@ -146,6 +161,20 @@ def test_check_array_errors(backend_opt):
         backend.check_array(bv, dtype.Float[32])
 
 
+def test_array_rows(backend_opt):
+    backend = backend_opt.pip.steps.compile.backend
+    for v in (MA(4, 3), MA(4, 3)[0]):
+        bv = backend.from_numpy(v)
+        # The default implementation goes through numpy
+        for rows in (backend.array_rows(bv), Backend.array_rows(backend, bv)):
+            assert len(rows) == len(v)
+            for row, expected in zip(rows, v):
+                if v.ndim == 1:
+                    assert backend.to_scalar(row) == expected
+                else:
+                    assert (backend.to_numpy(row) == expected).all()
+
+
 @parse_compare((2, 3))
 def test_add(x, y):
     return x + y
@@ -303,6 +332,21 @@ def test_dot(x, y):
     return dot(x, y)
 
 
+@parse_compare((MA(6, 3).reshape((2, 3, 3)), MB(6, 4).reshape((2, 3, 4))))
+def test_batch_dot(x, y):
+    return batch_dot(x, y)
+
+
+@parse_compare(MA(2, 3))
+def test_array_cast(x):
+    return array_cast(x, dtype.f32)
+
+
+@parse_compare(MA(2, 3))
+def test_array_cast2(x):
+    return array_cast(x * 10, dtype.i64)
+
+
 @parse_compare((MA(2, 3), MB(2, 3)),
                (MA(1, 3), MB(2, 3)),
                (MA(2, 1), MB(2, 3)))
@@ -372,3 +416,106 @@ def test_False_assign(_x):
 @parse_compare((np.array(2),))
 def test_array_to_scalar(x):
     return x.item()
+
+
+@parse_compare((MA(2, 3), MB(2, 3)), fused=True)
+def test_fused_array_map(x, y):
+    return np.tanh(x * y + 1.0) - x
+
+
+@parse_compare((MA(2, 3),), fused=True)
+def test_fused_array_map_reduce(x):
+    return array_reduce(scalar_add, -(x * x), (1, 3))
+
+
+@parse_compare((MA(2, 3), MB(2, 3)))
+def test_map_reduce(x, y):
+    return map_reduce(scalar_add, scalar_mul, (2, 1), x, y)
+
+
+@parse_compare((MA(2, 3), MB(2, 3)), fused=True)
+def test_fused_map_reduce_dot(x, y):
+    return array_reduce(scalar_add, x * y, ())
+
+
+def _update(ws, dws):
+    w1, w2, w3, w4 = ws
+    dw1, dw2, dw3, dw4 = dws
+    return (w1 - dw1 * 0.5, w2 - dw2 * 0.5, w3 - dw3 * 0.5, w4 - dw4 * 0.5)
+
+
+_small_params = ((MA(2, 3), MB(2, 3), MA(2, 3) * 2, MB(2, 3) * 3),
+                 (MB(2, 3), MA(2, 3), MB(2, 3) * 3, MA(2, 3) * 4))
+_large_params = ((MA(70, 70), MB(70, 70), MA(70, 70) * 2, MB(70, 70)),
+                 (MB(70, 70), MA(70, 70), MB(70, 70) * 3, MA(70, 70)))
+
+
+@parse_compare(_small_params, _large_params)
+def test_array_map_group(ws, dws):
+    return _update(ws, dws)
+
+
+@parse_compare(_small_params, _large_params, fused=True)
+def test_fused_array_map_group(ws, dws):
+    return _update(ws, dws)
+
+
+def test_group_array_maps():
+    def f(ws, dws):
+        w1, w2, w3 = ws
+        dw1, dw2, dw3 = dws
+        return (w1 - dw1 * 0.5, w2 - dw2 * 0.5, w3 - dw3)
+
+    argspec = tuple(from_value(arg, broaden=True) for arg in (
+        (MA(2, 3), MA(2, 3), MA(3, 2)), (MB(2, 3), MB(2, 3), MB(3, 2))
+    ))
+    pip = standard_pipeline.configure(optimization_levels[2]) \
+        .select('parse', 'resolve', 'infer', 'specialize', 'simplify_types',
+                'opt', 'opt2', 'validate')
+    g = pip.run(input=f, argspec=argspec)['graph']
+    group_array_maps(g)
+    mng = g.manager
+    group, = [node for node in mng.all_nodes
+              if node.is_apply(P.array_map_group)]
+    # The third update has a different shape and function
+    assert len(group.inputs) == 3 + 2 * 2
+    assert sum(node.is_apply(P.array_map) for node in mng.all_nodes) == 1
+
+
+@parse_compare((MA(1, 3), MB(4, 3)))
+def test_array_loop(h, xs):
+    for x in xs:
+        h = np.tanh(h * 0.5 + x)
+    return h
+
+
+@parse_compare((MA(1, 3), MB(4, 3)), fused=True)
+def test_fused_array_loop(h, xs):
+    for x in xs:
+        h = np.tanh(h * 0.5 + x)
+    return h
+
+
+@parse_compare((MA(3, 3), MA(1, 3), MB(4, 3)))
+def test_array_fold(w, h, xs):
+    def step(h, x):
+        return np.tanh(dot(h, w) + x)
+
+    return array_fold(step, h, xs)
+
+
+@parse_compare((2.0, MB(4, 3)[0]))
+def test_array_fold_scalar_rows(h, xs):
+    def step(h, x):
+        return h * 0.5 + x
+
+    return array_fold(step, h, xs)
+
+
+@parse_compare((MA(1, 3), MB(4, 3)))
+def test_array_while_loop(h, xs):
+    i = 1
+    while i < len(xs):
+        h = h * xs[i]
+        i = i + 1
+    return h
@@ -3,6 +3,7 @@ import numpy as np
 import pytest
 
 from myia import myia, value_and_grad
+from myia.abstract import from_value
 from myia.api import to_device
 from myia.frontends import activate_frontend
 from myia.utils import MyiaTypeError
@@ -369,6 +370,74 @@ def test_module_2_layer_mlp_update__to_device(_backend_fixture):
         assert torch.allclose(p, ep)
 
 
+def test_module_update_no_copy():
+    torch.manual_seed(123)
+
+    inp = torch.Tensor(MA(2, 4, dtype=args.dtype))
+    model = MLP_2_Layers(4, 2, 3)
+    orig_params = [p.clone() for p in model.parameters()]
+
+    @myia(backend='pytorch')
+    def step(model, inp):
+        return model - model
+
+    model2 = step(model, inp)
+    model3 = step(model, inp)
+
+    assert model2 is not model and model3 is not model2
+    assert model2.f1 is not model.f1
+    for p, op in zip(model.parameters(), orig_params):
+        assert torch.equal(p, op)
+    for p, p3 in zip(model2.parameters(), model3.parameters()):
+        assert isinstance(p, nn.Parameter)
+        assert torch.equal(p, torch.zeros_like(p))
+        assert p.data_ptr() != p3.data_ptr()
+
+    # The parameters are given to the new module by reference
+    W = torch.ones(4, 3)
+    new_model = from_value(Tiny(4, 3)).constructor(W)
+    assert isinstance(new_model, Tiny)
+    assert isinstance(new_model.W, nn.Parameter)
+    assert new_model.W.data_ptr() == W.data_ptr()
+
+
+def test_module_shell_independent():
+    model = MLP_2_Layers(4, 2, 3)
+
+    @myia(backend='pytorch')
+    def step(model):
+        return model - model
+
+    model2 = step(model)
+
+    # Hooks and training flags of the new module are its own
+    calls = []
+    model2.register_forward_hook(lambda *_: calls.append(2))
+    model2.f1.register_forward_hook(lambda *_: calls.append(1))
+    model(torch.ones(2, 4))
+    assert calls == []
+    model2(torch.ones(2, 4))
+    assert calls == [1, 2]
+
+    model2.eval()
+    assert not model2.training and not model2.f1.training
+    assert model.training and model.f1.training
+    assert all(m.training for m in model.modules())
+
+
+def test_tensor_no_copy():
+    @myia(backend='pytorch')
+    def f(x, y):
+        return x, x * y
+
+    x = nn.Parameter(torch.ones(1000, 10))
+    y = torch.ones(1000, 10)
+    x2, xy = f(x, y)
+    assert x2.data_ptr() == x.data_ptr()
+    assert not x2.requires_grad
+    assert torch.equal(xy, y)
+
+
 def test_pytorch_inference_errors(_backend_fixture):
     backend = _backend_fixture
     backend_options = get_backend_options(args, backend)
@@ -1,6 +1,7 @@
 
 import pytest
 
+from myia.info import About, DebugInherit, NamedDebugInfo, NoDebugInfo
 from myia.ir.anf import PARAMETER, Apply, Constant, Graph, Parameter
 from myia.prim import ops as primops
 
@@ -74,9 +75,46 @@ def test_str_coverage():
     """
     g = Graph()
     p = Parameter(g)
-    p.name = 'param'
+    p.debug.name = 'param'
     objects = [g, Apply([], g), p, Parameter(g), Constant(0), Constant(g)]
     for o in objects:
         str(o)
         repr(o)
         o.debug.debug_name
+
+
+def test_node_slots():
+    node = Apply([], Graph())
+    assert not hasattr(node, '__dict__')
+    with pytest.raises(AttributeError):
+        node.xyz = 1
+
+
+def test_lazy_debug():
+    a = NamedDebugInfo(name='a')
+    with About(a, 'copy'):
+        node = Constant(1)
+    assert not isinstance(node._debug, NamedDebugInfo)
+    assert node.debug.about.debug is a
+    assert node.debug.obj is node
+    assert node.debug is node.debug
+
+
+def test_lazy_debug_trace():
+    with DebugInherit(save_trace=True):
+        node = Constant(1)
+    assert isinstance(node._debug, NamedDebugInfo)
+    assert node.debug.trace is not None
+
+
+def test_no_debug_info():
+    a = NamedDebugInfo(name='a')
+    with NoDebugInfo():
+        with About(a, 'copy'):
+            g = Graph()
+            p = Parameter(g)
+            node = Constant(1)
+    assert node._debug is None
+    assert node.debug.about is None
+    assert g.debug.about.debug is a
+    assert p.debug.about.debug is a
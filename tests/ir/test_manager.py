@@ -4,9 +4,9 @@ from collections import Counter
 import pytest
 
 from myia.debug.label import short_labeler
-from myia.ir import GraphCloner, GraphManager, ManagerError, manage
+from myia.ir import Graph, GraphCloner, GraphManager, ManagerError, manage
 from myia.pipeline import scalar_parse as parse
-from myia.prim import Primitive
+from myia.prim import Primitive, ops as P
 from myia.utils import OrderedSet
 
 swap1 = Primitive('swap1')
@@ -814,3 +814,58 @@ def test_graph_properties():
         assert g.children is mng.children[g]
         assert g.scope is mng.scopes[g]
         assert g.recursive is mng.recursive[g]
+
+
+def _nested_graphs(depth, width):
+    # Generate width ** depth closures, each one using a free variable from
+    # the graph that encloses it.
+    def build(parent_param, d):
+        g = Graph()
+        y = g.add_parameter()
+        out = g.apply(P.scalar_add, parent_param, y)
+        if d > 1:
+            for _ in range(width):
+                child = build(y, d - 1)
+                out = g.apply(P.scalar_add, out, g.apply(child, y))
+        g.output = out
+        return g
+
+    root = Graph()
+    x = root.add_parameter()
+    out = x
+    for _ in range(width):
+        out = root.apply(P.scalar_add, out, root.apply(build(x, depth), x))
+    root.output = out
+    return root
+
+
+def test_incremental_nesting():
+    root = _nested_graphs(3, 8)
+    mng = GraphManager(root)
+    mng.free_variables_total
+
+    # Count the graphs whose dependencies or parent are recomputed
+    recomputed = []
+    for stat in (mng.graph_dependencies_total, mng.parents):
+        def _compute(g, _compute=stat._compute):
+            recomputed.append(g)
+            return _compute(g)
+        stat._compute = _compute
+
+    leaves = [g for g in mng.graphs if not mng.children[g]]
+    for leaf in leaves:
+        recomputed.clear()
+        # Make the leaf closed, which moves it to the top level
+        add = leaf.output
+        mng.set_edge(add, 1, leaf.parameters[0])
+        assert mng.parents[leaf] is None
+        assert mng.free_variables_total[leaf] == {}
+        # Only the graphs affected by a change should be recomputed
+        assert len(recomputed) < len(mng.graphs) / 20
+
+    ref = GraphManager(root, manage=False)
+    for g in mng.graphs:
+        assert mng.parents[g] is ref.parents[g]
+        assert mng.children[g] == ref.children[g]
+        assert mng.scopes[g] == ref.scopes[g]
+        assert mng.free_variables_total[g] == ref.free_variables_total[g]
@@ -10,6 +10,7 @@ from myia.prim.py_implementations import (
     env_getitem,
     env_setitem,
     identity,
+    map_reduce,
     partial,
     scalar_add,
     scalar_mul,
@@ -453,6 +454,76 @@ def test_unfuse_composite_constant():
                argspec=[af64_of(2, 3)])
 
 
+def test_fuse_elementwise():
+
+    def before(xs, ys):
+        a = array_map(scalar_mul, xs, ys)
+        b = array_map(scalar_add, a,
+                      distribute(scalar_to_array(1, AA), (2, 3)))
+        return array_map(scalar_usub, b)
+
+    def after(xs, ys):
+        def fused(x, y):
+            return scalar_usub(scalar_add(scalar_mul(x, y), 1))
+        return array_map(fused, xs, ys)
+
+    _check_opt(before, after,
+               lib.fuse_elementwise,
+               argspec=[af64_of(2, 3), af64_of(2, 3)])
+
+
+def test_fuse_elementwise_composite():
+
+    def before(xs, ys):
+        def f(x, y):
+            return x * y + x
+        return array_map(scalar_usub, array_map(f, xs, ys))
+
+    def after(xs, ys):
+        def fused(x, y):
+            return scalar_usub(scalar_add(scalar_mul(x, y), x))
+        return array_map(fused, xs, ys)
+
+    _check_opt(before, after,
+               lib.fuse_elementwise,
+               argspec=[af64_of(2, 3), af64_of(2, 3)])
+
+
+def test_fuse_elementwise_shared():
+
+    def before(xs, ys):
+        a = array_map(scalar_mul, xs, ys)
+        return array_map(scalar_add, a, a), a
+
+    _check_opt(before, before,
+               lib.fuse_elementwise,
+               argspec=[af64_of(2, 3), af64_of(2, 3)])
+
+
+def test_fuse_map_reduce():
+
+    def before(xs, ys):
+        return array_reduce(scalar_add, array_map(scalar_mul, xs, ys), (2, 1))
+
+    def after(xs, ys):
+        return map_reduce(scalar_add, scalar_mul, (2, 1), xs, ys)
+
+    _check_opt(before, after,
+               lib.fuse_map_reduce,
+               argspec=[af64_of(2, 3), af64_of(2, 3)])
+
+
+def test_fuse_map_reduce_shared():
+
+    def before(xs, ys):
+        a = array_map(scalar_mul, xs, ys)
+        return array_reduce(scalar_add, a, ()), a
+
+    _check_opt(before, before,
+               lib.fuse_map_reduce,
+               argspec=[af64_of(2, 3), af64_of(2, 3)])
+
+
 ######################
 # Branch elimination #
 ######################
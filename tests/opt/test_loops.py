@@ -0,0 +1,106 @@
+
+
+from myia.abstract import from_value
+from myia.macros import MAX_RANGE_UNROLL
+from myia.pipeline import standard_debug_pipeline
+from myia.prim import ops as P
+
+from ..common import MA, MB
+
+optimize_pipeline = standard_debug_pipeline \
+    .select('parse', 'resolve', 'infer', 'specialize', 'simplify_types',
+            'opt', 'opt2')
+
+
+def _optimize(fn, *args):
+    argspec = [from_value(arg, broaden=True) for arg in args]
+    g = optimize_pipeline.run(input=fn, argspec=argspec)['graph']
+    return g, g.manager
+
+
+def _folds(mng):
+    return [node for node in mng.all_nodes if node.is_apply(P.array_fold)]
+
+
+def test_lower_for_loop():
+    def f(h, xs):
+        for x in xs:
+            h = h * 0.5 + x
+        return h
+
+    g, mng = _optimize(f, MA(1, 3), MB(4, 3))
+    fold, = _folds(mng)
+    assert not any(node.is_apply(P.switch) for node in mng.all_nodes)
+    # The step function receives the rows of the array
+    step = fold.inputs[1].value
+    assert not any(node.is_apply(P.array_getitem)
+                   for node in mng.nodes[step])
+
+
+def test_lower_loop_with_free_variables():
+    def f(w, h, xs):
+        for x in xs:
+            h = h * w + x
+        return h
+
+    _, mng = _optimize(f, MA(1, 3), MA(1, 3), MB(4, 3))
+    assert len(_folds(mng)) == 1
+
+
+def test_no_lower_wrong_start():
+    def f(h, xs):
+        i = 1
+        while i < len(xs):
+            h = h * xs[i]
+            i = i + 1
+        return h
+
+    _, mng = _optimize(f, MA(1, 3), MB(4, 3))
+    assert _folds(mng) == []
+
+
+def test_no_lower_wrong_step():
+    def f(h, xs):
+        i = 0
+        while i < len(xs):
+            h = h * xs[i]
+            i = i + 2
+        return h
+
+    _, mng = _optimize(f, MA(1, 3), MB(4, 3))
+    assert _folds(mng) == []
+
+
+def test_unroll_tuple_loop():
+    def f(h, ws):
+        for w in ws:
+            h = h * w
+        return h
+
+    g, mng = _optimize(f, MA(1, 3), (MB(1, 3), MB(1, 3), MB(1, 3)))
+    assert list(mng.graphs) == [g]
+    assert not any(node.is_apply(P.switch) for node in mng.all_nodes)
+
+
+def test_unroll_range_loop():
+    def f(h):
+        for i in range(4):
+            h = h * i + 1
+        return h
+
+    g, mng = _optimize(f, MA(1, 3))
+    assert list(mng.graphs) == [g]
+    assert not any(node.is_apply(P.switch) for node in mng.all_nodes)
+
+
+def test_long_range_loop():
+    def f(h):
+        for i in range(10000):
+            h = h * i + 1
+        return h
+
+    # The loop is not unrolled, so the graph stays small
+    g, mng = _optimize(f, MA(1, 3))
+    assert len(mng.graphs) > 1
+    assert any(node.is_apply(P.switch) for node in mng.all_nodes)
+    assert len(mng.all_nodes) < MAX_RANGE_UNROLL * 10
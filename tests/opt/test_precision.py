@@ -0,0 +1,138 @@
+
+import numpy as np
+import pytest
+
+from myia.abstract import from_value
+from myia.api import myia
+from myia.dtype import f16, f32, f64
+from myia.macros import grad
+from myia.pipeline import standard_debug_pipeline
+from myia.prim import ops as P
+from myia.prim.py_implementations import array_reduce, conv2d, dot, scalar_add
+
+from ..common import MA, MB
+
+mixed_pipeline = standard_debug_pipeline.configure({
+    'mixed_precision.compute_type': f16,
+})
+
+
+def _run(fn, *args):
+    argspec = [from_value(arg, broaden=True) for arg in args]
+    res = mixed_pipeline.run(input=fn, argspec=argspec)
+    return res['output'](*args), res['graph'].manager
+
+
+def _types(mng, prim):
+    """Return the types of the arrays given to and returned by prim."""
+    return [tuple(i.abstract.element.dtype() for i in node.inputs[1:]
+                  if hasattr(i.abstract, 'element'))
+            + (node.abstract.element.dtype(),)
+            for node in mng.all_nodes if node.is_apply(prim)]
+
+
+def test_dot():
+    def f(x, w):
+        return dot(x, w)
+
+    x = MA(2, 3).astype('float32')
+    w = MB(3, 4).astype('float32')
+    res, mng = _run(f, x, w)
+    assert res.dtype == np.float32
+    np.testing.assert_allclose(res, x @ w, rtol=1e-2)
+    assert _types(mng, P.dot) == [(f16, f16, f16)]
+    casts = _types(mng, P.array_cast)
+    assert casts.count((f32, f16)) == 2
+    assert casts.count((f16, f32)) == 1
+
+
+def test_reduction_stays_wide():
+    def f(x, w):
+        return array_reduce(scalar_add, dot(x, w), ())
+
+    x = MA(2, 3).astype('float32')
+    w = MB(3, 4).astype('float32')
+    res, mng = _run(f, x, w)
+    np.testing.assert_allclose(res, (x @ w).sum(), rtol=1e-2)
+    assert _types(mng, P.array_reduce) == [(f32, f32)]
+
+
+def test_conv2d():
+    def f(x, w):
+        return conv2d(x, w, (1, 1), (0, 0), (1, 1), 1)
+
+    # The debug VM has no implementation of conv2d
+    argspec = [from_value(np.ones((1, 2, 4, 4), 'float32'), broaden=True),
+               from_value(np.ones((3, 2, 2, 2), 'float32'), broaden=True)]
+    g = mixed_pipeline['opt'].run(input=f, argspec=argspec)['graph']
+    mng = g.manager
+    assert _types(mng, P.conv2d) == [(f16, f16, f16)]
+
+
+def test_grad():
+    def loss(x, w):
+        return array_reduce(scalar_add, np.tanh(dot(x, w)), ())
+
+    def f(x, w):
+        return grad(loss, 'w')(x, w)
+
+    def f_scaled(x, w):
+        return grad(loss, 'w', loss_scale=1024)(x, w)
+
+    x = MA(2, 3).astype('float32')
+    w = MB(3, 4).astype('float32') * 0.1
+    expected = x.T @ (1 - np.tanh(x @ w) ** 2)
+    for fn in (f, f_scaled):
+        dw, mng = _run(fn, x, w)
+        np.testing.assert_allclose(dw, expected, rtol=1e-2, atol=1e-2)
+        # The backward pass also computes its products in float16
+        assert all(t == (f16, f16, f16) for t in _types(mng, P.dot))
+        assert len(_types(mng, P.dot)) == 2
+
+
+def test_unchanged():
+    def f(x, w):
+        return dot(x, w)
+
+    # Already narrow enough
+    _, mng = _run(f, MA(2, 3).astype('float16'), MB(3, 4).astype('float16'))
+    assert _types(mng, P.array_cast) == []
+
+    # Not floats
+    _, mng = _run(f, MA(2, 3).astype('int64'), MB(3, 4).astype('int64'))
+    assert _types(mng, P.array_cast) == []
+
+    # No compute type
+    argspec = [from_value(MA(2, 3), broaden=True),
+               from_value(MB(3, 4), broaden=True)]
+    res = standard_debug_pipeline.run(input=f, argspec=argspec)
+    assert _types(res['graph'].manager, P.dot) == [(f64, f64, f64)]
+
+
+def test_myia_compute_type():
+    # Half precision products are not implemented on the CPU by pytorch,
+    # so this uses float32 for inputs of float64
+    @myia(backend='pytorch', compute_type=f32)
+    def f(x, w):
+        return dot(x, w)
+
+    x, w = MA(2, 3), MB(3, 4)
+    res = f(x, w)
+    assert res.dtype == np.float64
+    np.testing.assert_allclose(res, x @ w, rtol=1e-6)
+    g = f.specialize((x, w))['graph']
+    assert _types(g.manager, P.dot) == [(f32, f32, f32)]
+
+
+@pytest.mark.gpu
+def test_myia_cuda():
+    @myia(backend='pytorch', backend_options={'device': 'cuda'},
+          compute_type=f16)
+    def f(x, w):
+        return dot(x, w)
+
+    x = MA(2, 3).astype('float32')
+    w = MB(3, 4).astype('float32')
+    res = f(x, w)
+    assert res.dtype == np.float32
+    np.testing.assert_allclose(res, x @ w, rtol=1e-2)
@@ -7,12 +7,16 @@ import pytest
 from myia.pipeline import scalar_debug_pipeline
 from myia.prim.py_implementations import (
     _assert_scalar,
+    array_cast,
+    array_fold,
     array_getitem,
     array_map,
+    array_map_group,
     array_reduce,
     array_scan,
     array_setitem,
     array_to_scalar,
+    batch_dot,
     bool_eq,
     broadcast_shape,
     dict_getitem,
@@ -25,6 +29,7 @@ from myia.prim.py_implementations import (
     env_setitem,
     identity,
     make_record,
+    map_reduce,
     partial as myia_partial,
     record_setitem,
     reshape,
@@ -252,6 +257,15 @@ def test_prim_array_scan():
     assert (v2 == vref).all()
 
 
+def test_prim_array_fold():
+    v = np.arange(6).reshape((3, 2))
+
+    def f(s, row):
+        return s * 10 + row
+
+    assert (array_fold(f, np.zeros(2), v) == [24, 135]).all()
+
+
 def test_prim_array_reduce():
     def add(a, b):
         return a + b
@@ -280,6 +294,33 @@ def test_prim_array_reduce():
         assert (res == value).all()
 
 
+def test_prim_map_reduce():
+    def add(a, b):
+        return a + b
+
+    def mul(a, b):
+        return a * b
+
+    v1 = np.ones((2, 3, 7)) * 2
+    v2 = np.ones((2, 3, 7)) * 3
+    res = map_reduce(add, mul, (1, 3, 1), v1, v2)
+    assert res.shape == (1, 3, 1)
+    assert (res == 84).all()
+
+
+def test_prim_array_map_group():
+    def sub(a, b):
+        return a - b
+
+    v1 = np.ones((2, 3)) * 2
+    v2 = np.ones((2, 3)) * 3
+    v3 = np.ones((4,))
+    res1, res2 = array_map_group(sub, 2, v1, v2, v3 * 5, v3)
+    assert (res1 == -1).all()
+    assert res2.shape == (4,)
+    assert (res2 == 4).all()
+
+
 def test_prim_dict_getitem():
     assert dict_getitem({'x': 2}, 'x') == 2
 
@@ -314,6 +355,14 @@ def test_prim_dot():
     assert (res == ref).all()
 
 
+def test_prim_batch_dot():
+    a = np.arange(24.0).reshape((2, 3, 4))
+    b = np.arange(40.0).reshape((2, 4, 5))
+    res = batch_dot(a, b)
+    for x, y, r in zip(a, b, res):
+        assert (r == np.dot(x, y)).all()
+
+
 @parse_compare((40,),)
 def test_prim_partial(x):
     def f(a, b):
@@ -368,6 +417,13 @@ def test_array_to_scalar():
     assert b == 1.5
 
 
+def test_array_cast():
+    a = array_cast(np.array([1.5, 2.5]), f16)
+    assert a.dtype == np.float16
+    assert (a == [1.5, 2.5]).all()
+    assert array_cast(np.array([1.5, -2.5]), i64).tolist() == [1, -2]
+
+
 def test_broadcast_shape():
     tests = [
         ((2, 3), (2, 3), (2, 3)),
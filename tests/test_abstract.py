@@ -35,9 +35,11 @@ from myia.abstract import (
     find_coherent_result_sync,
     listof,
     macro,
+    memo_statistics,
     to_abstract,
     type_to_abstract,
 )
+from myia.abstract.infer import _concrete_argkey
 from myia.ir import Constant
 from myia.prim import ops as P
 from myia.utils import (
@@ -315,6 +317,29 @@ def test_broaden_recursive():
     assert broaden(tb) is tb
 
 
+def test_memoized_transforms():
+    memo_statistics(reset=True)
+    sa = S(t=ty.Int[64])
+    assert broaden(S(1)) is sa
+    assert broaden(S(1)) is sa
+    assert memo_statistics()['broaden'] == (1, 1)
+
+    # Options are part of the key
+    assert amerge(S(1), S(2)) is sa
+    assert amerge(S(1), S(2)) is sa
+    with pytest.raises(MyiaTypeError):
+        amerge(S(1), S(2), forced=True)
+    assert memo_statistics()['amerge'] == (1, 2)
+
+    # Values with a Pending are not memoized
+    loop = asyncio.new_event_loop()
+    p = Pending(loop=loop, resolve=None, priority=None)
+    sp = S(t=p)
+    assert broaden(sp) is sp
+    assert memo_statistics(reset=True)['broaden'] == (1, 1)
+    assert memo_statistics()['broaden'] == (0, 0)
+
+
 def test_find_coherent_result_sync():
     def fn(x):
         if x == 0:
@@ -342,6 +367,56 @@ def test_find_coherent_result_sync():
     assert find_coherent_result_sync(-10, fn) is False
 
 
+def test_concrete_argkey():
+    loop = asyncio.new_event_loop()
+    p = Pending(loop=loop, resolve=None, priority=None)
+    args = (S(1), T([S(t=ty.Int[64]), S(t=p)]))
+    assert _concrete_argkey(args) is None
+    p.set_result(ty.Int[64])
+    assert _concrete_argkey(args) == (S(1), T([S(t=ty.Int[64])] * 2))
+
+
+def test_inference_loop():
+    loop = InferenceLoop(errtype=InferenceError)
+    order = []
+
+    def callback(fut):
+        order.append(fut.result())
+        if fut.result() == 'error':
+            raise InferenceError('oops')
+
+    fut = loop.create_future()
+    fut.add_done_callback(callback)
+    fut.set_result('error')
+    assert order == []
+
+    p1 = loop.create_pending_from_list([1, 2], 1, lambda: 0)
+    p2 = loop.create_pending_from_list([1, 2], 2, lambda: 1)
+    p3 = loop.create_pending(resolve=(lambda: 3), priority=(lambda: None))
+    for p in (p1, p2, p3):
+        p.add_done_callback(callback)
+    loop.run_forever()
+
+    # Callbacks are run in order and the Pendings with the highest priority
+    # are forced first. Those without a priority cannot be forced.
+    assert order == ['error', 2, 1]
+    assert not p3.done()
+    errors = loop.collect_errors()
+    assert len(errors) == 1
+    assert isinstance(errors[0], InferenceError)
+
+
+def test_inference_loop_call_soon():
+    loop = InferenceLoop(errtype=InferenceError)
+    order = []
+    h1 = loop.call_soon(order.append, 1)
+    h2 = loop.call_soon(order.append, 2)
+    assert isinstance(h1, asyncio.Handle)
+    h2.cancel()
+    loop.run_forever()
+    assert order == [1]
+
+
 def test_type_to_abstract():
     assert type_to_abstract(int) is S(t=ty.Int[64])
     assert type_to_abstract(float) is S(t=ty.Float[64])
@@ -1,14 +1,18 @@
+import asyncio
+import time
+from concurrent.futures import Future
 from dataclasses import dataclass
 
 import numpy as np
 import pytest
 
 from myia.abstract import ArrayWrapper
-from myia.api import myia, to_device
+from myia.api import MyiaFuture, Prefetcher, myia, to_device
 from myia.cconv import closure_convert
 from myia.compile import LoadingError, load_backend
 from myia.dtype import Bool, EnvType
 from myia.ir import clone
+from myia.macros import grad
 from myia.pipeline import (
     scalar_debug_compile as compile,
     scalar_parse as parse,
@@ -77,6 +81,79 @@ def test_myia_return_backend():
     assert f(10, 20) is not None
 
 
+def test_myia_call_async():
+    @myia
+    def f(x, y):
+        return x * y
+
+    x = np.ones((2, 3))
+    futures = [f.call_async(x, i * x) for i in range(5)]
+    # Synchronous calls can be mixed with asynchronous ones
+    assert (f(x, x) == x).all()
+    for i, fut in enumerate(futures):
+        assert (fut.result() == i * x).all()
+        assert fut.done()
+
+    async def run():
+        return await f.call_async(x, 2 * x)
+
+    res = asyncio.get_event_loop().run_until_complete(run())
+    assert (res == 2 * x).all()
+
+    with pytest.raises(InferenceError):
+        f.call_async(x)
+
+
+def test_myia_future():
+    fut = Future()
+    mfut = MyiaFuture(fut, lambda x: x * 2)
+    assert not mfut.done()
+    fut.set_result(10)
+    assert mfut.done()
+    assert mfut.result() == 20
+    assert mfut.result() == 20
+
+    fut = Future()
+    fut.set_exception(ValueError('error'))
+    with pytest.raises(ValueError):
+        MyiaFuture(fut, lambda x: x * 2).result()
+
+
+@pytest.mark.parametrize('opt_level', [0, 1, 2, 3])
+def test_myia_opt_level(opt_level):
+    def f(x, y):
+        return x * y + x / y
+
+    @myia(opt_level=opt_level)
+    def df(x, y):
+        return grad(f)(x, y)
+
+    assert df.opt_level == opt_level
+    assert df(4.0, 2.0) == 2.5
+
+    mf = myia(f, opt_level=opt_level)
+    x = np.ones((2, 2))
+    assert (mf(x, 2 * x) == 2.5 * x).all()
+
+
+def test_myia_bad_opt_level():
+    with pytest.raises(ValueError):
+        myia(lambda x: x, opt_level=4)
+
+
+def test_myia_no_debug_info():
+    def mul(x, y):
+        return x * y
+
+    @myia(debug_info=False)
+    def f(x, y):
+        return grad(mul)(x, y)
+
+    assert f(2.0, 3.0) == 3.0
+    with pytest.raises(InferenceError):
+        f(2.0, (1, 2))
+
+
 def test_myia_struct_arg():
     @myia
     def f(pt):
@@ -476,3 +553,65 @@ def test__convert_arg_init_AbstractScalar(backend_opt):
 
 
 #####################################################
+
+
+def test_prefetcher(backend_opt):
+    b = backend_opt
+    data = [(MA(2, 3) * i, MA(2, 3) + i) for i in range(5)]
+    batches = list(Prefetcher(data, b))
+    assert len(batches) == len(data)
+    for (x, y), (mx, my) in zip(batches, data):
+        assert isinstance(x, ArrayWrapper)
+        assert isinstance(y, ArrayWrapper)
+        np.testing.assert_allclose(b.to_numpy(x.array), mx)
+        np.testing.assert_allclose(b.to_numpy(y.array), my)
+
+
+def test_prefetcher_depth():
+    taken = []
+
+    def batches():
+        for i in range(10):
+            taken.append(i)
+            yield MA(2, 3) * i
+
+    def wait_until(cond, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not cond():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    with Prefetcher(batches(), 'pytorch', depth=3) as pf:
+        next(pf)
+        # One batch given, three converted ahead and one waiting for room
+        wait_until(lambda: pf._queue.full() and len(taken) == 5)
+        assert len(taken) == 5
+        next(pf)
+        wait_until(lambda: pf._queue.full() and len(taken) == 6)
+    pf._thread.join(1)
+    assert not pf._thread.is_alive()
+    with pytest.raises(StopIteration):
+        next(pf)
+
+
+def test_prefetcher_error():
+    def batches():
+        yield MA(2, 3)
+        raise ValueError('bad batch')
+
+    pf = Prefetcher(batches(), 'pytorch')
+    next(pf)
+    with pytest.raises(ValueError):
+        next(pf)
+    with pytest.raises(StopIteration):
+        next(pf)
+
+
+def test_myia_new_shape():
+    @myia
+    def f(x):
+        return sum(x * x)
+
+    # The function is compiled again for the new shape
+    np.testing.assert_allclose(f(MA(4, 3)), (MA(4, 3) ** 2).sum())
+    np.testing.assert_allclose(f(MA(2, 3)), (MA(2, 3) ** 2).sum())
@@ -207,3 +207,17 @@ def test_tagged(c, x, y, z):
         return tagged(y)
     else:
         return tagged(z)
+
+
+@parse_compare((np.ones(3),))
+def test_for_range(h):
+    for i in range(3):
+        h = h * i + 1
+    return h
+
+
+@parse_compare(((1.0, 2.0, 3.0), 2.0))
+def test_for_range_len(xs, h):
+    for i in range(len(xs)):
+        h = h * xs[i]
+    return h
@@ -9,6 +9,8 @@ from pytest import mark
 from myia.abstract import AbstractJTagged, from_value, ndarray_aliasable
 from myia.api import myia
 from myia.debug.finite_diff import GradTester, NoTestGrad, clean_args
+from myia.grad import J as Jimpl, checkpoint
+from myia.ir import Graph, MetaGraph, manage
 from myia.macros import GradOperation, grad
 from myia.pipeline import (
     PipelineDefinition,
@@ -20,20 +22,25 @@ from myia.pipeline import (
 )
 from myia.pipeline.steps import Validator
 from myia.prim import ops as P
+from myia.prim.grad_implementations import augmented_graphs
 from myia.prim.py_implementations import (
     J,
+    array_cast,
     array_map,
     array_reduce,
     array_to_scalar,
+    batch_dot,
     distribute,
     dot,
     hastype,
+    map_reduce,
     py_registry as pyi,
     reshape,
     scalar_add,
     scalar_cast,
     scalar_div,
     scalar_mul,
+    scalar_tanh,
     scalar_to_array,
     transpose,
 )
@@ -47,6 +54,7 @@ from .common import (
     Point3D,
     U,
     countdown,
+    f32,
     f64,
     make_tree,
     reducetree,
@@ -492,6 +500,12 @@ def test_array_operations_reshape(xs, ys):
     return array_to_scalar(sm)
 
 
+@grad_test((MA(2, 3), MB(2, 3)),)
+def test_map_reduce(xs, ys):
+    sm = map_reduce(scalar_add, scalar_div, (), xs, ys)
+    return array_to_scalar(sm)
+
+
 @grad_test((MA(2, 3), MB(2, 3)),)
 def test_array_operations_std(xs, ys):
     div = xs / ys
@@ -506,6 +520,13 @@ def test_dot(x, y):
     return array_to_scalar(sm)
 
 
+@grad_test((MA(6, 4).reshape((2, 3, 4)), MB(8, 5).reshape((2, 4, 5))),)
+def test_batch_dot(x, y):
+    d = batch_dot(x, y)
+    sm = array_reduce(scalar_add, d, ())
+    return array_to_scalar(sm)
+
+
 @grad_test((MA(3, 4), MB(2, 3)),)
 def test_transpose(x, y):
     xt = transpose(x, (1, 0))
@@ -564,6 +585,53 @@ def _runwith(f, *args):
     return res['output'](*args)
 
 
+@checkpoint
+def _checkpointed_step(x, h):
+    a = x * h
+    return scalar_tanh(a * a + x)
+
+
+@grad_test((0.3, 0.7),)
+def test_checkpoint(x, h):
+    h = _checkpointed_step(x, h)
+    h = _checkpointed_step(x, h)
+    return _checkpointed_step(x, h)
+
+
+def test_checkpoint_bprop_closure():
+    pip = grad_pipeline.select('parse').make()
+    g = pip(input=_checkpointed_step)['graph']
+    fprop = Jimpl(g, pip.resources)
+    assert Jimpl(g, pip.resources) is fprop
+    assert fprop.transforms['primal'] is g
+    pip.resources.manager.add_graph(fprop)
+    bprop = fprop.output.inputs[2].value
+    # The backpropagator only keeps the arguments
+    assert set(bprop.free_variables_total) == set(fprop.parameters)
+
+
+def test_bprop_keeps_metadata_only():
+    g = augmented_graphs[P.reshape]
+    mng = manage(g, weak=True)
+    xs, shp = g.parameters
+    bprop = g.output.inputs[2].value
+    fvs = mng.free_variables_total[bprop]
+    # bprop_reshape only needs the shape of xs
+    assert not any(xs in fv.inputs for fv in fvs)
+    assert any(shp in fv.inputs for fv in fvs)
+
+
+def test_augmented_graphs_lazy():
+    assert isinstance(augmented_graphs.get(P.scalar_mul), Graph)
+    assert augmented_graphs.get(object()) is None
+    assert P.scalar_mul in augmented_graphs
+    for prim, g in augmented_graphs.items():
+        assert isinstance(g, (Graph, MetaGraph))
+        assert augmented_graphs[prim] is g
+    assert all(isinstance(g, (Graph, MetaGraph))
+               for g in augmented_graphs.values())
+
+
 def test_freevar_outside_grad():
 
     def f(x, y):
@@ -746,6 +814,47 @@ def test_aliasing_list():
         print(f([a, b, c, d], a))
 
 
+def test_grad_array_cast():
+    # Finite differences are not precise enough through a cast to float32
+    def f(x, y):
+        prod = array_cast(x, f32) * array_cast(y, f32)
+        return sum(array_cast(prod, f64))
+
+    @myia
+    def grads(x, y):
+        return grad(f, 'x', 'y')(x, y)
+
+    x, y = MA(2, 3), MB(2, 3)
+    dx, dy = grads(x, y)
+    assert dx.dtype == dy.dtype == np.float64
+    np.testing.assert_allclose(dx, y, rtol=1e-6)
+    np.testing.assert_allclose(dy, x, rtol=1e-6)
+
+
+def test_grad_loss_scale():
+    def f(x, y):
+        return array_to_scalar(array_reduce(scalar_add, dot(x, y), ())) * 1e-3
+
+    @myia
+    def grads(x, y):
+        return (grad(f, 'x', 'y')(x, y),
+                grad(f, 'x', 'y', loss_scale=1024)(x, y),
+                grad(f, 'x', loss_scale=0.5)(x, y, dout=2.0))
+
+    @myia
+    def gradbad(x, y):
+        return grad(f, loss_scale=x)(x, y)
+
+    x, y = MA(2, 3), MB(3, 4)
+    (dx, dy), (sdx, sdy), sdx2 = grads(x, y)
+    np.testing.assert_allclose(sdx, dx)
+    np.testing.assert_allclose(sdy, dy)
+    np.testing.assert_allclose(sdx2, dx * 2)
+
+    with pytest.raises(InferenceError):
+        gradbad(1.0, x)
+
+
 def test_aliasing_other():
 
     def _chk(x, y):
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+
+import pytest
+
+# Budget for the time spent in `import myia`, in seconds
+IMPORT_BUDGET = 0.05
+
+
+def _run(code):
+    """Run code in a fresh interpreter with -X importtime.
+
+    Returns the output of the code and the cumulative import time of each
+    module, in seconds.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1e6
+    return proc.stdout, times
+
+
+@pytest.mark.parametrize('stmt,unloaded', [
+    ('import myia', ['myia.abstract', 'myia.api', 'myia.compile',
+                     'myia.pipeline', 'numpy']),
+    ('import myia.frontends', ['myia.pipeline', 'torch']),
+    ('import myia.compile', ['myia.pipeline', 'torch']),
+    # These must not depend on another module being imported first
+    ('import myia.ir', ['myia.pipeline']),
+    ('import myia.ir.anf', ['myia.pipeline']),
+    ('import myia.prim', ['myia.pipeline']),
+    ('from myia.prim import ops', ['myia.pipeline']),
+    ('import myia.parser', ['myia.pipeline']),
+    ('import myia.cconv', ['myia.pipeline']),
+])
+def test_import_is_lazy(stmt, unloaded):
+    out, _ = _run(f'{stmt}; import sys; print(*sys.modules)')
+    loaded = set(out.split())
+    for mod in unloaded:
+        assert mod not in loaded
+
+
+def test_import_time():
+    # Keep the best of a few runs, since the machine may be busy
+    times = [_run('import myia')[1]['myia'] for _ in range(3)]
+    assert min(times) < IMPORT_BUDGET
+
+
+def test_lazy_attributes():
+    import myia
+    import myia.grad
+    import myia.jvp
+    from myia.macros import grad, jvp
+    assert myia.grad is grad
+    assert myia.jvp is jvp
+    assert 'value_and_grad' in dir(myia)
+    with pytest.raises(AttributeError):
+        myia.nope
@@ -42,9 +42,11 @@ from myia.prim import Primitive, ops as P
 from myia.prim.py_implementations import (
     J,
     Jinv,
+    array_cast,
     array_map,
     array_reduce,
     array_to_scalar,
+    batch_dot,
     bool_and,
     bool_or,
     broadcast_shape,
@@ -59,6 +61,7 @@ from myia.prim.py_implementations import (
     hastype,
     identity,
     make_record,
+    map_reduce,
     partial as myia_partial,
     record_setitem,
     reshape,
@@ -353,6 +356,48 @@ def test_for(xs, y):
     return rval
 
 
+@infer((i64, i64))
+def test_for_range(x):
+    for i in range(1, 7, 2):
+        x = x * i
+    return x
+
+
+@infer(
+    (i64, i64),
+    (f64, InferenceError),
+)
+def test_range_not_constant(n):
+    rval = 0
+    for i in range(n):
+        rval = rval + i
+    return rval
+
+
+def _scale(w, x):
+    return x * w
+
+
+def _scale_four(x):
+    return _scale(1, x) + _scale(2, x) + _scale(3, x) + _scale(4, x)
+
+
+@pytest.mark.parametrize('max_contexts,widened', [
+    (None, 0),
+    (4, 0),
+    (2, 2),
+])
+def test_context_widening(max_contexts, widened):
+    pip = infer_pipeline_std.configure({
+        'inferrer.max_contexts': max_contexts
+    }).make()
+    res = pip(input=_scale_four, argspec=(to_abstract_test(i64),))
+    assert res['outspec'] == to_abstract_test(i64)
+    report = pip.resources.inferrer.engine.widening_report()
+    assert sum(report.values()) == widened
+    assert all(str(g) == '_scale' for g in report)
+
+
 @infer((i64, f64, (i64, f64)))
 def test_nullary_closure(x, y):
     def make(z):
@@ -1369,6 +1414,16 @@ def test_dot(a, b):
     return dot(a, b)
 
 
+@infer(
+    (af64_of(5, 2, 3), af64_of(5, 3, 4), af64_of(5, 2, 4)),
+    (af64_of(5, 2, 3), af64_of(4, 3, 4), InferenceError),
+    (af64_of(5, 2, 3), af64_of(5, 2, 4), InferenceError),
+    (af64_of(2, 3), af64_of(3, 4), InferenceError),
+)
+def test_batch_dot(a, b):
+    return batch_dot(a, b)
+
+
 @infer(
     (ai32_of(4), Shp(2, 4), ai32_of(2, 4)),
     (ai32_of(4), (u64, u64), ai32_of(ANYTHING, ANYTHING)),
@@ -1487,6 +1542,21 @@ def test_array_reduce(ary, shp):
     return array_reduce(f, ary, shp)
 
 
+@infer(
+    (af32_of(3, 4), af32_of(3, 4), af32_of()),
+    (ai64_of(3, 4), ai64_of(3, 4), ai64_of()),
+    (af32_of(3, 4), af32_of(3, 7), InferenceError),
+    (i64, af32_of(3, 4), InferenceError),
+)
+def test_map_reduce(ary1, ary2):
+    def f(v1, v2):
+        return v1 * v2
+
+    def add(a, b):
+        return a + b
+    return map_reduce(add, f, (), ary1, ary2)
+
+
 @infer((i64, i64))
 def test_partial_1(x):
     def f(a, b):
@@ -1627,6 +1697,17 @@ def test_array_to_scalar(x):
     return array_to_scalar(x)
 
 
+@infer(
+    (af64_of(2, 3), Ty(to_abstract_test(f16)), af16_of(2, 3)),
+    (ai64_of(4), Ty(to_abstract_test(f32)), af32_of(4)),
+    (af32_of(2, 3), Ty(ANYTHING), InferenceError),
+    (af32_of(2, 3), Ty(to_abstract_test(B)), InferenceError),
+    (f32, Ty(to_abstract_test(f16)), InferenceError),
+)
+def test_array_cast(x, t):
+    return array_cast(x, t)
+
+
 @infer(
     ((u64,), (u64,), (u64,)),
     ((u64, u64), (u64,), (u64, u64)),
@@ -1,6 +1,14 @@
 from threading import Thread
 
-from myia.info import About, DebugInfo, DebugInherit, NamedDebugInfo
+from myia.info import (
+    About,
+    DebugInfo,
+    DebugInherit,
+    NamedDebugInfo,
+    NoDebugInfo,
+    capture_info,
+    make_debug_info,
+)
 
 
 def test_nested_info():
@@ -70,3 +78,25 @@ def test_info_thread():
     t.join()
     if exc:
         raise exc
+
+
+def test_make_debug_info():
+    """Test that debug information can be created outside of its context."""
+    a = NamedDebugInfo()
+    with About(a, 'thing'):
+        top = capture_info()
+    b = make_debug_info(None, top)
+    assert b.about.debug is a
+    assert b.about.relation == 'thing'
+    assert make_debug_info(None, None).about is None
+
+
+def test_no_debug_info():
+    a = NamedDebugInfo()
+    with NoDebugInfo():
+        with About(a, 'thing'):
+            assert capture_info() is None
+            with DebugInherit(save_trace=True):
+                assert capture_info() is None
+    with About(a, 'thing'):
+        assert capture_info().about.debug is a
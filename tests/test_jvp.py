@@ -0,0 +1,202 @@
+
+import numpy as np
+import pytest
+
+from myia import grad, hvp, jvp, myia
+from myia.prim.py_implementations import (
+    array_map,
+    array_reduce,
+    batch_dot,
+    conv2d,
+    distribute,
+    dot,
+    reshape,
+    scalar_add,
+    scalar_tanh,
+    shape,
+    transpose,
+)
+from myia.utils import MyiaTypeError
+
+
+def _finite_diff(fn, args, tangents, eps=1e-6):
+    plus = fn(*[x + eps * dx for x, dx in zip(args, tangents)])
+    minus = fn(*[x - eps * dx for x, dx in zip(args, tangents)])
+    return (plus - minus) / (2 * eps)
+
+
+def _tangents(args):
+    rng = np.random.RandomState(1234)
+    return tuple(0 if isinstance(a, int)
+                 else np.float64(rng.uniform(-1, 1)) if isinstance(a, float)
+                 else rng.uniform(-1, 1, a.shape)
+                 for a in args)
+
+
+def _run_jvp(fn, args, tangents):
+    if len(args) == 1:
+        @myia
+        def run(x, dx):
+            return jvp(fn)(x, dx)
+    else:
+        @myia
+        def run(x, y, dx, dy):
+            return jvp(fn)(x, y, dx, dy)
+    return run(*args, *tangents)
+
+
+def jvp_test(*tests, rel_error=1e-4):
+    """Decorate a function to check its jvp against finite differences."""
+
+    def decorate(fn):
+        def test(args):
+            if not isinstance(args, tuple):
+                args = (args,)
+            tangents = _tangents(args)
+            out, dout = _run_jvp(fn, args, tangents)
+            expected = _finite_diff(fn, args, tangents)
+            assert np.allclose(out, fn(*args))
+            assert np.allclose(dout, expected, rtol=rel_error)
+
+        m = pytest.mark.parametrize('args', list(tests))(test)
+        m.__orig__ = fn
+        return m
+    return decorate
+
+
+@jvp_test((3.0, 4.0), (-1.5, 0.5))
+def test_arithmetic(x, y):
+    return x * y + x ** 3 / y - y
+
+
+@jvp_test((0.7, 2.0), (-0.7, 2.0))
+def test_if(x, y):
+    if x > 0:
+        return scalar_tanh(x * y)
+    else:
+        return x - y
+
+
+@jvp_test((1.1, 3))
+def test_while(x, n):
+    while n > 0:
+        x = x * x + 0.5
+        n = n - 1
+    return x
+
+
+@jvp_test((1.5, 2.0))
+def test_closure(x, y):
+    def mul(z):
+        return x * z
+
+    def apply(f, z):
+        return f(z) + f(y)
+
+    return apply(mul, x * y)
+
+
+@jvp_test((np.array([0.5, -1.0, 2.0]), np.array([1.0, 3.0, -0.5])))
+def test_array_map(xs, ys):
+    return array_map(lambda x, y: scalar_tanh(x) * y * y, xs, ys)
+
+
+@jvp_test((np.arange(6.0).reshape((2, 3)) / 7,
+           np.arange(12.0).reshape((3, 4)) / 5))
+def test_dot(x, w):
+    y = dot(x, w)
+    return array_reduce(scalar_add, y * y, (1, 4))
+
+
+@jvp_test((np.arange(12.0).reshape((2, 2, 3)) / 7,
+           np.arange(24.0).reshape((2, 3, 4)) / 5))
+def test_batch_dot(x, w):
+    y = batch_dot(x, w)
+    return array_reduce(scalar_add, y * y, (1, 1, 4))
+
+
+@jvp_test(np.arange(6.0).reshape((2, 3)) / 3)
+def test_array_operations(x):
+    t = transpose(reshape(x, (3, 2)), (1, 0))
+    s = array_reduce(scalar_add, t, (2, 1))
+    return distribute(s, shape(x)) * x
+
+
+def test_tuple_output():
+    def f(x, y):
+        return x * y, x + y
+
+    (a, b), (da, db) = _run_jvp(f, (2.0, 3.0), (1.0, 0.0))
+    assert (a, b) == (6.0, 5.0)
+    assert (da, db) == (3.0, 1.0)
+
+
+def test_conv2d():
+    torch = pytest.importorskip('torch')
+
+    def f(i, w):
+        return conv2d(i, w, (1, 1), (0, 0), (1, 1), 1)
+
+    rng = np.random.RandomState(1234)
+    i = rng.uniform(-1, 1, (2, 3, 5, 5))
+    w = rng.uniform(-1, 1, (4, 3, 3, 3))
+    di, dw = _tangents((i, w))
+    out, dout = _run_jvp(f, (i, w), (di, dw))
+
+    def tconv(i, w):
+        return torch.nn.functional.conv2d(
+            torch.from_numpy(i), torch.from_numpy(w)
+        ).numpy()
+
+    assert np.allclose(out, tconv(i, w))
+    # conv2d is bilinear in its input and weight
+    assert np.allclose(dout, tconv(di, w) + tconv(i, dw))
+
+
+def test_hvp():
+    def f(x):
+        return x * x * x
+
+    def g(x):
+        return array_reduce(scalar_add, array_map(scalar_tanh, x) * x, ())
+
+    @myia
+    def run(x, v, xs, vs):
+        return hvp(f)(x, v), hvp(g)(xs, vs)
+
+    xs = np.array([0.5, -1.0, 2.0])
+    vs = np.array([1.0, 2.0, -1.0])
+    hf, hg = run(2.0, 3.0, xs, vs)
+    assert hf == 36.0
+
+    def dg(x):
+        t = np.tanh(x)
+        return t + x * (1 - t * t)
+
+    assert np.allclose(hg, _finite_diff(dg, (xs,), (vs,)), rtol=1e-4)
+
+
+def test_jvp_of_grad():
+    def f(x, y):
+        return x ** 3 * y
+
+    @myia
+    def run(x, y, dx, dy):
+        return jvp(grad(f, 'x', 'y'))(x, y, dx, dy), hvp(f)(x, y, dx, dy)
+
+    (g, dg), h = run(2.0, 3.0, 1.0, 0.0)
+    assert g == (36.0, 8.0)
+    assert dg == (36.0, 12.0)
+    assert h == dg
+
+
+def test_jvp_missing_tangent():
+    def f(x):
+        return x * x
+
+    @myia
+    def run(x):
+        return jvp(f)(x)
+
+    with pytest.raises(MyiaTypeError):
+        run(2.0)
@@ -124,6 +124,9 @@ specialize_std = specializer_decorator(specialize_pipeline_std)
 specialize_no_validate = specializer_decorator(
     specialize_pipeline.configure(validate=False)
 )
+specialize_widen = specializer_decorator(
+    specialize_pipeline_std.configure({'inferrer.max_contexts': 2})
+)
 
 
 int1 = 13
@@ -696,3 +699,12 @@ def test_reference_bug():
         if z != 1:
             shp = shp + (z,)
     return shp
+
+
+def _scale(w, x):
+    return x * w
+
+
+@specialize_widen((int1,), (int2,))
+def test_widened_contexts(x):
+    return _scale(1, x) + _scale(2, x) + _scale(3, x) + _scale(4, x)
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+from myia import ArithmeticData, myia, value_and_grad
+from myia.parallel import DataParallel, _error_reply, _flatten, _unflatten
+from myia.prim.py_implementations import dot
+
+from .common import MA, MB
+
+
+@dataclass(frozen=True)
+class Linear(ArithmeticData):
+    W: object
+    b: object
+
+    def apply(self, x):
+        return dot(x, self.W) + self.b
+
+
+def cost(model, x, y):
+    diff = np.tanh(model.apply(x)) - y
+    return sum(diff * diff)
+
+
+def grads(model, x, y):
+    return value_and_grad(cost, 'model')(model, x, y)
+
+
+def shard_mean(x):
+    return sum(x) / 4.0
+
+
+def shard_sum(x):
+    return sum(x)
+
+
+@pytest.fixture(scope='module')
+def dp():
+    with DataParallel(grads, workers=2, batched=[False, True, True],
+                      reduce='sum', backend='pytorch') as dp:
+        yield dp
+
+
+def test_flatten():
+    model = Linear(MA(2, 3), MB(1, 3))
+    value = (model, [1, 2.0], {'a': None, 'b': MA(1, 1)}, True)
+    leaves = []
+    struct = _flatten(value, leaves)
+    assert len(leaves) == 5
+    assert _unflatten(struct, leaves) == value
+
+
+def test_data_parallel(dp):
+    model = Linear(MA(4, 3), MB(1, 3))
+    single = myia(grads, backend='pytorch')
+    for n in (8, 7, 1):
+        x, y = MA(n, 4), MB(n, 3)
+        c, dmodel = dp(model, x, y)
+        expected_c, expected_dmodel = single(model, x, y)
+        assert isinstance(dmodel, Linear)
+        np.testing.assert_allclose(c, expected_c)
+        np.testing.assert_allclose(dmodel.W, expected_dmodel.W)
+        np.testing.assert_allclose(dmodel.b, expected_dmodel.b)
+
+
+def test_data_parallel_mean():
+    x = MA(8, 3)
+    with DataParallel(shard_mean, workers=2, backend='pytorch') as dp:
+        # Each worker gets 4 rows, so the mean of the results is the mean of
+        # the rows
+        np.testing.assert_allclose(dp(x), x.sum() / 8)
+
+
+def test_data_parallel_errors(dp):
+    model = Linear(MA(4, 3), MB(1, 3))
+    with pytest.raises(TypeError):
+        dp(model, MA(8, 4))
+    with pytest.raises(TypeError):
+        dp(model, MA(8, 4), MB(7, 3))
+    # The workers still work after an error
+    c, _ = dp(model, MA(8, 4), MB(8, 3))
+    assert c > 0
+
+
+def test_data_parallel_mean_ints():
+    with DataParallel(shard_sum, workers=2, backend='pytorch') as dp:
+        for _ in range(2):
+            with pytest.raises(TypeError, match='float'):
+                dp(np.ones((8, 3), dtype='int64'))
+
+
+def test_error_reply():
+    class Unpicklable(Exception):
+        pass
+
+    status, exc = _error_reply(ValueError('x'))
+    assert status == 'error'
+    assert isinstance(exc, ValueError)
+    status, exc = _error_reply(Unpicklable('x'))
+    assert status == 'error'
+    assert isinstance(exc, RuntimeError)
+    assert 'Unpicklable' in str(exc)
+
+
+def test_data_parallel_dead_worker():
+    dp = DataParallel(shard_mean, workers=2, backend='pytorch')
+    x = MA(8, 3)
+    np.testing.assert_allclose(dp(x), x.sum() / 8)
+    dp._procs[1].terminate()
+    with pytest.raises(RuntimeError):
+        dp(x)
+    with pytest.raises(RuntimeError):
+        dp(x)
+    dp.close()
@@ -0,0 +1,143 @@
+import os
+import pickle
+import subprocess
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+from myia import ArithmeticData, export, myia, value_and_grad
+from myia.prim import Primitive, ops as P
+from myia.prim.py_implementations import dot
+from myia.runtime import Program, load
+from myia.utils import MyiaInputTypeError, MyiaTypeError
+
+from .common import MA, MB
+
+
+@dataclass(frozen=True)
+class Linear(ArithmeticData):
+    W: object
+    b: object
+
+    def apply(self, x):
+        return dot(x, self.W) + self.b
+
+
+def cost(model, x, y):
+    diff = np.tanh(model.apply(x)) - y
+    return sum(diff * diff)
+
+
+def step(model, x, y, lr):
+    _cost, dmodel = value_and_grad(cost, 'model')(model, x, y)
+    return _cost, model - dmodel * lr
+
+
+def mlp(w1, b1, w2, b2, x):
+    return dot(np.tanh(dot(x, w1) + b1), w2) + b2
+
+
+def scale(x, a, n):
+    return x * a, {'n': n + 1, 'none': None}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'program.myia')
+
+
+def test_export_load(path):
+    args = (MA(2, 3), MB(1, 3), MA(3, 4), MB(1, 4), MA(5, 2))
+    export(mlp, args, path, backend='pytorch')
+    program = load(path)
+    assert isinstance(program, Program)
+    expected = myia(mlp, backend='pytorch')(*args)
+    np.testing.assert_allclose(program(*args), expected)
+    # The program can be called again, on other values
+    args2 = tuple(arg * 2 for arg in args)
+    np.testing.assert_allclose(program(*args2),
+                               myia(mlp, backend='pytorch')(*args2))
+
+
+def test_export_structures(path):
+    x = MA(2, 3).astype('float32')
+    export(scale, (x, np.float32(2.0), 3), path, backend='pytorch')
+    res, d = load(path)(x, np.float32(3.0), 4)
+    np.testing.assert_allclose(res, x * 3)
+    assert d == {'n': 5, 'none': None}
+
+
+def test_export_model(path):
+    model = Linear(MA(4, 3), MB(1, 3))
+    x, y = MA(8, 4), MB(8, 3)
+    lr = 0.1
+    export(step, (model, x, y, lr), path, backend='pytorch')
+    c, new_model = load(path)(model, x, y, lr)
+    expected_c, expected_model = myia(step, backend='pytorch')(model, x, y,
+                                                               lr)
+    assert isinstance(new_model, Linear)
+    np.testing.assert_allclose(c, expected_c)
+    np.testing.assert_allclose(new_model.W, expected_model.W)
+    np.testing.assert_allclose(new_model.b, expected_model.b)
+
+
+def test_load_wrong_args(path):
+    export(scale, (MA(2, 3), 2.0, 3), path, backend='pytorch')
+    program = load(path)
+    with pytest.raises(MyiaInputTypeError):
+        program(MA(2, 3), 2.0)
+    with pytest.raises(MyiaInputTypeError):
+        program(MA(3, 3), 2.0, 3)
+    with pytest.raises(MyiaInputTypeError):
+        program(MA(2, 3).astype('float32'), 2.0, 3)
+    with pytest.raises(MyiaInputTypeError):
+        program(MA(2, 3), 2, 3)
+
+
+def test_pickle_primitives():
+    prims = [p for p in vars(P).values() if isinstance(p, Primitive)]
+    assert P.return_ in prims and P.raise_ in prims
+    for p in prims:
+        assert pickle.loads(pickle.dumps(p)) is p
+
+
+def test_export_unsupported(path):
+    def first(xs):
+        return xs[0]
+
+    with pytest.raises(MyiaTypeError):
+        export(first, ([1.0, 2.0],), path, backend='pytorch')
+    assert not os.path.exists(path)
+
+    # A failed export leaves the previous program in place
+    export(scale, (MA(2, 3), 2.0, 3), path, backend='pytorch')
+    with pytest.raises(MyiaTypeError):
+        export(first, ([1.0, 2.0],), path, backend='pytorch')
+    assert not os.path.exists(path + '.tmp')
+    assert load(path)(MA(2, 3), 2.0, 3)[1] == {'n': 4, 'none': None}
+
+
+def test_load_wrong_version(path):
+    export(scale, (MA(2, 3), 2.0, 3), path, backend='pytorch')
+    with open(path, 'r+b') as f:
+        data = f.read().replace(b'version', b'nversio')
+        f.seek(0)
+        f.write(data)
+    with pytest.raises(ValueError):
+        load(path)
+
+
+def test_load_imports(path):
+    export(mlp, (MA(2, 3), MB(1, 3), MA(3, 4), MB(1, 4), MA(5, 2)), path,
+           backend='pytorch')
+    code = ('import sys; from myia.runtime import load; '
+            f'load({path!r}); print(*sys.modules)')
+    out = subprocess.run([sys.executable, '-c', code], check=True,
+                         stdout=subprocess.PIPE,
+                         universal_newlines=True).stdout
+    loaded = set(out.split())
+    assert 'myia.compile.backends.pytorch' in loaded
+    for mod in ['myia.api', 'myia.opt', 'myia.pipeline']:
+        assert mod not in loaded
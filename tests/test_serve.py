@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+from myia import ArithmeticData, myia
+from myia.prim.py_implementations import dot
+from myia.serve import BatchServer
+from myia.utils import MyiaShapeError, MyiaTypeError
+
+
+@myia
+def predict(w, x):
+    return dot(x, w)
+
+
+@myia
+def predict2(x, y):
+    return x * y, x + y
+
+
+@dataclass(frozen=True)
+class Linear(ArithmeticData):
+    w: object
+    b: object
+
+
+@myia
+def predict_model(model, x):
+    return dot(x, model.w) + model.b
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_batch_server():
+    w = np.arange(6.0).reshape((3, 2))
+    xs = [np.full((3,), float(i)) for i in range(20)]
+
+    async def run():
+        async with BatchServer(predict, batched=[False, True],
+                               max_batch_size=8) as server:
+            results = await asyncio.gather(*[server(w, x) for x in xs])
+        return server, results
+
+    server, results = _run(run())
+    for x, res in zip(xs, results):
+        assert res.shape == (2,)
+        assert (res == x @ w).all()
+
+    m = server.metrics
+    assert m.requests == 20
+    assert m.batches == 3
+    assert m.mean_batch_size == 20 / 3
+    assert m.max_queue_size == 20
+    assert 0 < m.mean_queue_time <= m.mean_latency
+
+
+def test_batch_server_tuple():
+    xs = [np.full((2,), float(i)) for i in range(5)]
+
+    async def run():
+        async with BatchServer(predict2, max_latency=0.01) as server:
+            return await asyncio.gather(*[server(x, x) for x in xs])
+
+    for x, (prod, total) in zip(xs, _run(run())):
+        assert (prod == x * x).all()
+        assert (total == x + x).all()
+
+
+def test_batch_server_incompatible():
+    w = np.ones((3, 2))
+    w2 = np.ones((3, 2)) * 2
+
+    async def run():
+        async with BatchServer(predict, batched=[False, True]) as server:
+            res = await asyncio.gather(server(w, np.ones(3)),
+                                       server(w2, np.ones(3)),
+                                       server(w, np.ones(3)))
+        return server, res
+
+    server, (r1, r2, r3) = _run(run())
+    assert (r1 == 3).all() and (r2 == 6).all() and (r3 == 3).all()
+    assert server.metrics.batches == 2
+
+
+def test_batch_server_models():
+    # Models holding arrays cannot be compared with ==
+    m1 = Linear(np.ones((3, 2)), np.zeros((1, 2)))
+    m2 = Linear(np.ones((3, 2)) * 2, np.ones((1, 2)))
+
+    async def run():
+        async with BatchServer(predict_model, batched=[False, True],
+                               max_latency=0.01) as server:
+            res = await asyncio.wait_for(
+                asyncio.gather(server(m1, np.ones(3)),
+                               server(m2, np.ones(3)),
+                               server(m1, np.ones(3))),
+                timeout=60)
+        return server, res
+
+    server, (r1, r2, r3) = _run(run())
+    assert (r1 == 3).all() and (r2 == 7).all() and (r3 == 3).all()
+    assert server.metrics.batches == 2
+
+
+def test_batch_server_errors():
+    async def run():
+        server = BatchServer(predict)
+        with pytest.raises(RuntimeError):
+            await server(np.ones((3, 2)), np.ones(3))
+        async with server:
+            with pytest.raises(TypeError):
+                await server(np.ones((3, 2)), 1)
+            with pytest.raises(MyiaTypeError):
+                await server(np.ones((3, 2)))
+            # The batched w is 3-dimensional, which dot does not support
+            with pytest.raises(MyiaShapeError, match='dot needs matrix'):
+                await server(np.ones((3, 2)), np.ones(3))
+
+    _run(run())
+
+
+def test_batch_server_compile_in_background():
+    threads = []
+
+    class Scale:
+        # call_async compiles the function for new types of arguments
+        def call_async(self, *args):
+            threads.append(threading.get_ident())
+            return predict2.call_async(*args)
+
+    async def run():
+        async with BatchServer(Scale()) as server:
+            return await server(np.ones(3), np.ones(3))
+
+    prod, _ = _run(run())
+    assert (prod == 1.0).all()
+    assert threads and threading.get_ident() not in threads
@@ -3,6 +3,7 @@ import numpy as np
 from myia.composite import list_reduce
 from myia.pipeline import scalar_debug_compile as compile
 from myia.prim.py_implementations import (
+    array_fold,
     array_map,
     array_reduce,
     array_scan,
@@ -89,6 +90,17 @@ def test_vm_array_scan():
     assert (res == a.cumsum(axis=1)).all()
 
 
+def test_vm_array_fold():
+    @compile
+    def f(h, xs):
+        def step(s, row):
+            return s * 0.5 + row
+
+        return array_fold(step, h, xs)
+
+    assert f(0.0, np.ones(3)) == 1.75
+
+
 def test_vm_array_reduce():
     @compile
     def f(x):
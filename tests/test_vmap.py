@@ -0,0 +1,232 @@
+
+import numpy as np
+import pytest
+
+from myia import grad, myia, vmap
+from myia.abstract import SHAPE, AbstractArray
+from myia.prim import ops as P
+from myia.prim.py_implementations import (
+    array_map,
+    array_reduce,
+    conv2d,
+    distribute,
+    dot,
+    reshape,
+    scalar_add,
+    scalar_tanh,
+    shape,
+    switch,
+    transpose,
+)
+from myia.utils import MyiaTypeError
+
+
+def _stack(fn, *args, in_axes=None):
+    """Apply fn on each element of the batch, in Python."""
+    in_axes = in_axes or (0,) * len(args)
+    size = [len(a) for a, ax in zip(args, in_axes) if ax == 0][0]
+    results = [fn(*[a if ax is None else a[i]
+                    for a, ax in zip(args, in_axes)])
+               for i in range(size)]
+    if isinstance(results[0], tuple):
+        return tuple(np.stack(r) for r in zip(*results))
+    return np.stack(results)
+
+
+def _run_vmap(fn, args, in_axes=None):
+    axes = in_axes or ()
+    if len(args) == 1:
+        @myia
+        def run(x):
+            return vmap(fn, *axes)(x)
+    else:
+        @myia
+        def run(x, y):
+            return vmap(fn, *axes)(x, y)
+    return run(*args)
+
+
+def vmap_test(*tests, in_axes=None):
+    """Decorate a function to check its vmap against a Python loop."""
+
+    def decorate(fn):
+        def test(args):
+            if not isinstance(args, tuple):
+                args = (args,)
+            res = _run_vmap(fn, args, in_axes)
+            expected = _stack(fn, *args, in_axes=in_axes)
+            if isinstance(expected, tuple):
+                for r, e in zip(res, expected):
+                    assert np.allclose(r, e)
+            else:
+                assert np.allclose(res, expected)
+
+        m = pytest.mark.parametrize('args', list(tests))(test)
+        m.__orig__ = fn
+        return m
+    return decorate
+
+
+_rng = np.random.RandomState(1234)
+_xs = _rng.uniform(-1, 1, (5, 3))
+_ys = _rng.uniform(-1, 1, (5, 3))
+_mats = _rng.uniform(-1, 1, (5, 2, 3))
+_w = _rng.uniform(-1, 1, (3, 4))
+_ws = _rng.uniform(-1, 1, (5, 3, 4))
+
+
+@vmap_test((np.arange(4.0), np.arange(4.0) + 1))
+def test_scalar_arithmetic(x, y):
+    return x * y + scalar_tanh(x) - 1.0
+
+
+@vmap_test((_xs, _ys))
+def test_array_map(xs, ys):
+    return array_map(lambda x, y: scalar_tanh(x) * y, xs, ys)
+
+
+@vmap_test((_xs, 2.0), in_axes=(0, None))
+def test_shared_argument(xs, y):
+    return xs * y + y
+
+
+@vmap_test(_mats)
+def test_array_operations(x):
+    t = transpose(reshape(x, (3, 2)), (1, 0))
+    s = array_reduce(scalar_add, t, (2, 1))
+    return distribute(s, shape(x)) * x
+
+
+@vmap_test((_mats, _w), in_axes=(0, None))
+def test_dot_batched_input(x, w):
+    return dot(x, w)
+
+
+@vmap_test((_w.T, _ws), in_axes=(None, 0))
+def test_dot_batched_weight(x, w):
+    return dot(x, w)
+
+
+@vmap_test((_mats, _ws),
+           (_rng.uniform(-1, 1, (4, 6, 7)), _rng.uniform(-1, 1, (4, 7, 5))))
+def test_dot_both_batched(x, w):
+    return dot(x, w)
+
+
+def _dot(x, w):
+    return dot(x, w)
+
+
+def test_dot_both_batched_graph():
+    def f(x, w):
+        return vmap(_dot)(x, w)
+
+    x = _rng.uniform(-1, 1, (4, 6, 7))
+    w = _rng.uniform(-1, 1, (4, 7, 5))
+    g = myia(f).specialize((x, w))['graph']
+    # A single batched product, without an intermediate of shape (4, 6, 7, 5)
+    assert [node for node in g.manager.all_nodes
+            if node.is_apply(P.batch_dot)]
+    assert all(len(node.abstract.values[SHAPE]) <= 3
+               for node in g.manager.all_nodes
+               if isinstance(node.abstract, AbstractArray))
+
+
+def _batched_dot(x, w):
+    return vmap(_dot)(x, w)
+
+
+def test_nested_dot():
+    def f(x, w):
+        return vmap(_batched_dot)(x, w)
+
+    x = _rng.uniform(-1, 1, (2, 3, 4, 5))
+    w = _rng.uniform(-1, 1, (2, 3, 5, 6))
+    res = myia(f)(x, w)
+    assert np.allclose(res, np.matmul(x, w))
+
+
+@vmap_test((np.array([1.0, -2.0, 3.0]), np.array([-1.0, 4.0, 0.5])))
+def test_select(x, y):
+    return switch(x > y, x, y * 2.0)
+
+
+@vmap_test(np.array([1.0, 0.5, -0.25]))
+def test_loop(x):
+    n = 3
+    while n > 0:
+        x = x * x + 0.5
+        n = n - 1
+    return x
+
+
+@vmap_test((_xs, 2.0), in_axes=(0, None))
+def test_branch_on_shared(xs, y):
+    if y > 0:
+        return xs * y
+    else:
+        return xs
+
+
+@vmap_test((_xs, _ys))
+def test_closure_and_tuple(xs, ys):
+    def f(z):
+        return z * xs
+
+    return f(ys), array_reduce(scalar_add, f(xs), ())
+
+
+def test_conv2d():
+    torch = pytest.importorskip('torch')
+
+    def f(i, w):
+        return conv2d(i, w, (1, 1), (0, 0), (1, 1), 1)
+
+    rng = np.random.RandomState(1234)
+    i = rng.uniform(-1, 1, (3, 2, 3, 5, 5))
+    w = rng.uniform(-1, 1, (4, 3, 3, 3))
+    res = _run_vmap(f, (i, w), (0, None))
+
+    expected = np.stack([
+        torch.nn.functional.conv2d(
+            torch.from_numpy(x), torch.from_numpy(w)
+        ).numpy()
+        for x in i
+    ])
+    assert np.allclose(res, expected)
+
+
+def test_per_example_grad():
+    def loss(w, x):
+        return array_reduce(scalar_add, array_map(scalar_tanh, dot(x, w)), ())
+
+    @myia
+    def per_example(w, xs):
+        return vmap(grad(loss), None, 0)(w, xs)
+
+    @myia
+    def one(w, x):
+        return grad(loss)(w, x)
+
+    res = per_example(_w, _mats)
+    assert res.shape == (5, 3, 4)
+    assert np.allclose(res, np.stack([one(_w, x) for x in _mats]))
+
+
+def test_branch_on_batched():
+    def f(x):
+        if x > 0:
+            return x
+        else:
+            return -x
+
+    with pytest.raises(MyiaTypeError):
+        _run_vmap(f, (np.array([1.0, -1.0]),))
+
+
+def test_batch_size_mismatch():
+    def f(x, y):
+        return x * y
+
+    with pytest.raises(Exception):
+        _run_vmap(f, (np.zeros(3), np.zeros(4)))
@@ -1,12 +1,15 @@
 
+import gc
 from dataclasses import dataclass
 
 import pytest
 
 from myia.utils import (
     AttrEK,
+    DeepKey,
     IncompleteException,
     Interned,
+    deep_eqkey,
     eq,
     eqrec,
     hash as hsh,
@@ -135,3 +138,48 @@ def test_canonical():
     assert p1 is p2
     assert p1.x is p3.x
     assert p2.x is p3.x
+
+
+@dataclass
+class CachedPoint(Interned):
+    __cache_eqkey__ = True
+
+    x: object
+    y: object
+
+    def __eqkey__(self):
+        return AttrEK(self, ('x', 'y'))
+
+
+def test_deep_key():
+    p1 = CachedPoint(1, 2)
+    p2 = CachedPoint([p1, p1], 3)
+    p3 = CachedPoint.new([p1, p1], 3)
+
+    k1 = deep_eqkey(p1)
+    k2 = deep_eqkey(p2)
+    k3 = deep_eqkey(p3)
+    assert isinstance(k2, DeepKey)
+    assert k2 is not k3
+    assert k2 == k3
+    assert hsh(p2) == hsh(p3)
+    # The keys of cached elements are shared between the keys that use them
+    assert k2[1][0][1] == (k1, k1)
+    assert k2[1][0][1][0] is k1
+    assert k3[1][0][1][0] is k1
+    assert deep_eqkey(p2) is k2
+    assert p3.intern() is p2
+    assert deep_eqkey(CachedPoint.new([p1, p1], 4)) != k2
+
+
+def test_pool_cleanup():
+    from myia.utils.intern import _intern_pool
+
+    gc.collect()
+    n = len(_intern_pool)
+    p = Point(1234, 5678)
+    assert len(_intern_pool) == n + 1
+    del p
+    gc.collect()
+    assert len(_intern_pool) == n
+    assert Point(1234, 5678).x == 1234